@@ -1,9 +1,70 @@
 """Agente Evaluador - Analiza el nivel y comprensión del estudiante - CORREGIDO"""
 
 import re
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from .base_agent import BaseAgent
 from config.settings import settings
+from utils.text_analysis import analyze, contains_phrase
+from utils.fuzzy_match import TrigramIndex
+
+# Mapeo de palabras clave a temas (en orden de prioridad: frases específicas primero)
+TOPIC_KEYWORDS = {
+    "producto de matrices": "multiplicacion_matrices",
+    "multiplicacion de matrices": "multiplicacion_matrices",
+    "multiplicar matrices": "multiplicacion_matrices",
+    "producto matriz": "multiplicacion_matrices",
+    "producto punto": "producto_punto",
+    "producto escalar": "producto_punto",
+    "dot product": "producto_punto",
+    "determinante": "determinantes",
+    "det": "determinantes",
+    "matriz inversa": "matriz_inversa",
+    "inversa": "matriz_inversa",
+    "transpuesta": "matriz_transpuesta",
+    "vector": "vectores",
+    "vectores": "vectores",
+    "matriz": "matrices",
+    "matrices": "matrices",
+    "sistema": "sistemas_lineales",
+    "ecuaciones": "sistemas_lineales",
+    "lineal": "sistemas_lineales",
+    "suma": "operaciones_basicas",
+    "resta": "operaciones_basicas",
+    "magnitud": "magnitud_vectores",
+    "norma": "magnitud_vectores",
+    "unitario": "vectores_unitarios",
+    "ortogonal": "ortogonalidad",
+    "perpendicular": "ortogonalidad",
+    "base": "espacios_vectoriales",
+    "dimension": "espacios_vectoriales",
+    "independencia": "independencia_lineal"
+}
+
+# Frases ya analizadas (acentos, plurales, stopwords) para comparar contra el input analizado
+_ANALYZED_TOPIC_KEYWORDS = [(analyze(keyword), topic) for keyword, topic in TOPIC_KEYWORDS.items()]
+
+# Palabras frecuentes en los turnos que no son temas: nunca se "corrigen" hacia uno
+# ("respuesta" quedaría a pocas ediciones de "resta")
+_COMMON_WORDS = analyze(
+    "respuesta respuestas resultado resultados ejemplo ejercicio pregunta problema solución "
+    "paso pasos valor número números explicación entonces igual correcto incorrecto"
+)
+
+# Vocabulario de las palabras clave para tolerar errores de tipeo ("determinnte", "matris")
+_TOPIC_VOCABULARY = TrigramIndex(
+    (term for terms, _ in _ANALYZED_TOPIC_KEYWORDS for term in terms),
+    known_words=_COMMON_WORDS
+)
+
+
+def match_topic_keywords(text: str) -> Optional[str]:
+    """Tema por palabras clave (sin LLM): una pasada del analizador, con corrección de tipeo"""
+    input_terms = _TOPIC_VOCABULARY.correct_all(analyze(text))
+    for keyword_terms, topic in _ANALYZED_TOPIC_KEYWORDS:
+        if contains_phrase(input_terms, keyword_terms):
+            return topic
+    return None
+
 
 class AssessorAgent(BaseAgent):
     """Agente que evalúa el nivel de comprensión del estudiante"""
@@ -49,46 +110,10 @@ class AssessorAgent(BaseAgent):
     async def _identify_specific_topic(self, student_input: str) -> str:
         """Identifica el tema específico de la pregunta"""
         
-        # Búsqueda por palabras clave específicas
-        input_lower = student_input.lower()
-        
-        # Mapeo específico de palabras clave a temas
-        keyword_mapping = {
-            "producto de matrices": "multiplicacion_matrices",
-            "multiplicacion de matrices": "multiplicacion_matrices", 
-            "multiplicar matrices": "multiplicacion_matrices",
-            "producto matriz": "multiplicacion_matrices",
-            "producto punto": "producto_punto",
-            "producto escalar": "producto_punto",
-            "dot product": "producto_punto",
-            "determinante": "determinantes",
-            "det": "determinantes",
-            "matriz inversa": "matriz_inversa",
-            "inversa": "matriz_inversa",
-            "transpuesta": "matriz_transpuesta",
-            "vector": "vectores",
-            "vectores": "vectores",
-            "matriz": "matrices",
-            "matrices": "matrices",
-            "sistema": "sistemas_lineales",
-            "ecuaciones": "sistemas_lineales",
-            "lineal": "sistemas_lineales",
-            "suma": "operaciones_basicas",
-            "resta": "operaciones_basicas",
-            "magnitud": "magnitud_vectores",
-            "norma": "magnitud_vectores",
-            "unitario": "vectores_unitarios",
-            "ortogonal": "ortogonalidad",
-            "perpendicular": "ortogonalidad",
-            "base": "espacios_vectoriales",
-            "dimension": "espacios_vectoriales",
-            "independencia": "independencia_lineal"
-        }
-        
-        # Buscar coincidencias específicas
-        for keyword, topic in keyword_mapping.items():
-            if keyword in input_lower:
-                return topic
+        # Búsqueda por palabras clave antes de caer en la llamada al LLM
+        topic = match_topic_keywords(student_input)
+        if topic:
+            return topic
         
         # Si no encuentra coincidencia específica, usar LLM
         prompt = f"""
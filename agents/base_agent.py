@@ -1,11 +1,13 @@
 """Clase base para todos los agentes del sistema"""
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.prompts import ChatPromptTemplate
 from config.settings import settings, AGENT_CONFIGS
+from utils.llm_scheduler import estimate_tokens, get_llm_scheduler
+from .response_cache import get_response_cache, make_response_key
 
 class BaseAgent(ABC):
     """Clase base abstracta para todos los agentes"""
@@ -15,6 +17,11 @@ class BaseAgent(ABC):
         self.llm = llm
         self.config = AGENT_CONFIGS.get(agent_type, {})
         self.conversation_history = []
+        # Caché de respuestas compartida; se usa si el agente la activa ("cache_responses")
+        # o si la llamada la pide con use_cache=True
+        self.response_cache = get_response_cache()
+        # Planificador compartido: concurrencia, límites por minuto y reintentos del proveedor
+        self.scheduler = get_llm_scheduler()
         
     @abstractmethod
     async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -34,16 +41,85 @@ class BaseAgent(ABC):
         if len(self.conversation_history) > max_history:
             self.conversation_history = self.conversation_history[-max_history:]
     
-    async def generate_response(self, prompt: str, context: Optional[Dict] = None) -> str:
-        """Genera respuesta usando el LLM"""
-        messages = [
+    def _response_key(self, prompt: str) -> str:
+        """Clave de caché para este agente, modelo y temperatura"""
+        model = getattr(self.llm, "model_name", None) or getattr(self.llm, "model", None) or type(self.llm).__name__
+        temperature = getattr(self.llm, "temperature", self.config.get("temperature"))
+        return make_response_key(self.agent_type, model, temperature, self.get_system_message(), prompt)
+    
+    async def _cache_lookup(self, prompt: str, use_cache: Optional[bool]) -> Tuple[Optional[str], Optional[str]]:
+        """(clave, respuesta cacheada); la clave es None si esta llamada no usa caché"""
+        if use_cache is None:
+            use_cache = self.config.get("cache_responses", False)
+        if not use_cache or self.response_cache is None:
+            return None, None
+        
+        key = self._response_key(prompt)
+        try:
+            return key, await self.response_cache.aget(key)
+        except Exception as e:
+            print(f"⚠️ Caché de respuestas no disponible: {e}")
+            return key, None
+    
+    async def _cache_store(self, key: Optional[str], content: str):
+        # Los errores no llegan hasta aquí: solo se guardan respuestas reales
+        if key is None or not content:
+            return
+        try:
+            await self.response_cache.aset(key, self.agent_type, content, ttl=self.config.get("cache_ttl"))
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar la respuesta en caché: {e}")
+    
+    def _estimated_tokens(self, prompt: str) -> int:
+        """Tokens que consumirá la llamada: prompts más el máximo de salida del agente"""
+        return estimate_tokens(self.get_system_message() + prompt) + self.config.get("max_tokens", 0)
+    
+    def _messages(self, prompt: str) -> List:
+        return [
             SystemMessage(content=self.get_system_message()),
             HumanMessage(content=prompt)
         ]
+    
+    async def generate_response(self, prompt: str, context: Optional[Dict] = None,
+                                use_cache: Optional[bool] = None) -> str:
+        """Genera respuesta usando el LLM (o la caché, para prompts repetidos)"""
+        key, cached = await self._cache_lookup(prompt, use_cache)
+        if cached is not None:
+            return cached
+        
+        try:
+            response = await self.scheduler.run(
+                self.llm.ainvoke, self._messages(prompt), tokens=self._estimated_tokens(prompt)
+            )
+            content = response.content.strip()
+        except Exception as e:
+            print(f"Error en {self.agent_type}: {e}")
+            return "Lo siento, ha ocurrido un error procesando tu solicitud."
+        
+        await self._cache_store(key, content)
+        return content
+    
+    async def astream(self, prompt: str, use_cache: Optional[bool] = None) -> AsyncIterator[str]:
+        """Genera la respuesta por fragmentos, a medida que llegan del LLM"""
+        key, cached = await self._cache_lookup(prompt, use_cache)
+        if cached is not None:
+            yield cached
+            return
         
+        messages = self._messages(prompt)
+        chunks = []
         try:
-            response = await self.llm.ainvoke(messages)
-            return response.content.strip()
+            async for chunk in self.scheduler.stream(
+                lambda: self.llm.astream(messages), tokens=self._estimated_tokens(prompt)
+            ):
+                if chunk.content:
+                    chunks.append(chunk.content)
+                    yield chunk.content
         except Exception as e:
             print(f"Error en {self.agent_type}: {e}")
-            return "Lo siento, ha ocurrido un error procesando tu solicitud."
\ No newline at end of file
+            # Si ya se mostró parte de la respuesta, se corta ahí sin agregar el mensaje de error
+            if not chunks:
+                yield "Lo siento, ha ocurrido un error procesando tu solicitud."
+            return
+        
+        await self._cache_store(key, "".join(chunks).strip())
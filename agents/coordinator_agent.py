@@ -1,7 +1,9 @@
 """Agente Coordinador - Orquesta la interacción entre agentes - CORREGIDO"""
 
 from typing import Dict, Any
+from config.settings import settings
 from .base_agent import BaseAgent
+from .interaction_classifier import INTERACTION_TYPES, get_interaction_classifier
 
 class CoordinatorAgent(BaseAgent):
     """Agente coordinador que orquesta el flujo de trabajo"""
@@ -37,22 +39,33 @@ class CoordinatorAgent(BaseAgent):
     async def _classify_interaction(self, student_input: str) -> str:
         """Clasifica el tipo de interacción del estudiante"""
         
+        # Clasificador local primero: el LLM solo se consulta si no está seguro
+        local_type, confidence = get_interaction_classifier().classify(student_input)
+        if confidence >= settings.INTERACTION_CLASSIFIER_THRESHOLD:
+            return local_type
+        
         prompt = f"""
         Clasifica este input del estudiante en UNA de estas categorías:
         
         - "question": Pregunta sobre un concepto específico
         - "examples_request": Pide ejemplos específicos  
         - "procedure_request": Pregunta cómo hacer algo
+        - "explanation_request": Pide que se le explique un tema
+        - "calculation_request": Pide resolver un cálculo concreto
         - "greeting": Saludo inicial
         - "answer": Responde a un ejercicio
+        - "statement": Comentario o agradecimiento sin pregunta
         
         Input: "{student_input}"
         
         Responde SOLO con la categoría. Nada más.
         """
         
-        classification = await self.generate_response(prompt)
-        return classification.lower().strip()
+        # Clasificación determinista del mismo input: se reutiliza la respuesta
+        classification = await self.generate_response(prompt, use_cache=True)
+        classification = classification.lower().strip().strip('"')
+        # Si el LLM responde algo fuera de las categorías se queda la predicción local
+        return classification if classification in INTERACTION_TYPES else local_type
     
     async def synthesize_response(self, agent_outputs: Dict[str, Any]) -> str:
         """Sintetiza las respuestas de todos los agentes"""
@@ -0,0 +1,222 @@
+"""Clasificador local del tipo de interacción - Reglas + modelo lineal, sin llamar al LLM"""
+
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from utils.text_analysis import fold, stem
+
+INTERACTION_TYPES = (
+    "greeting",
+    "question",
+    "examples_request",
+    "procedure_request",
+    "explanation_request",
+    "calculation_request",
+    "answer",
+    "statement"
+)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Rasgos de palabras clave y expresiones regulares (sobre el texto plegado: sin tildes)
+_PATTERNS: Dict[str, re.Pattern] = {
+    "pregunta": re.compile(r"[?¿]"),
+    "saludo_inicial": re.compile(r"^\W*(hola|buen[oa]s|hey|saludos|que tal)\b"),
+    "agradecimiento": re.compile(r"\b(gracias|entendido|entiendo|perfecto|genial|vale|listo|ok)\b"),
+    "interrogativo_que": re.compile(r"\b(que es|que son|que significa|cual es|a que se refiere)\b"),
+    "interrogativo_como": re.compile(r"\b(como se|como hago|como puedo|como calculo|como resuelvo|pasos)\b"),
+    "pide_ejemplos": re.compile(r"\b(ejemplos?|muestrame|ilustra)\b"),
+    "pide_explicacion": re.compile(r"^\W*(explica|explicame|describe|hablame|detalla|profundiza)"),
+    "imperativo_calculo": re.compile(r"\b(calcula|resuelve|encuentra|halla|determina|obten)\b"),
+    "numeros": re.compile(r"\d"),
+    "operador": re.compile(r"[=+*/×·^]|\d\s*-\s*\d"),
+    "vector_literal": re.compile(r"[(\[]\s*-?\d+(\.\d+)?(\s*[,;]\s*-?\d+(\.\d+)?)+\s*[)\]]"),
+    "respuesta_inicial": re.compile(
+        r"^\W*(el resultado|la respuesta|mi respuesta|me (da|dio|sale|salio)|da |es igual|obtuve|obtengo|creo que|=)"
+    ),
+    "empieza_con_numero": re.compile(r"^\W*-?\d"),
+}
+
+# Ejemplos etiquetados con los que se ajusta el modelo lineal al cargar el módulo
+TRAINING_EXAMPLES: List[Tuple[str, str]] = [
+    ("Hola", "greeting"),
+    ("Hola, buenos días", "greeting"),
+    ("Buenas tardes profe", "greeting"),
+    ("hey, qué tal", "greeting"),
+    ("Hola! quiero aprender álgebra lineal", "greeting"),
+    ("Buenas noches, ¿cómo estás?", "greeting"),
+    ("Saludos", "greeting"),
+    ("hola de nuevo", "greeting"),
+
+    # Saludo seguido de un pedido: manda el pedido
+    ("Buenas tardes, necesito ayuda con los determinantes", "explanation_request"),
+    ("Hola, explícame los vectores propios", "explanation_request"),
+    ("hola, ¿qué es una base ortonormal?", "question"),
+    ("Buenos días, ¿cómo se calcula la inversa?", "procedure_request"),
+    ("Hola, dame un ejemplo de matriz simétrica", "examples_request"),
+    ("buenas, calcula el producto punto de (2, 1) y (1, 3)", "calculation_request"),
+
+    ("¿Qué es un vector?", "question"),
+    ("¿Qué es el producto punto?", "question"),
+    ("qué son los eigenvalores", "question"),
+    ("¿Cuál es la diferencia entre un vector y un escalar?", "question"),
+    ("¿Qué significa que una matriz sea invertible?", "question"),
+    ("¿Para qué sirve el determinante?", "question"),
+    ("¿Por qué el producto de matrices no es conmutativo?", "question"),
+    ("¿Una matriz singular tiene inversa?", "question"),
+    ("¿Qué es el producto de matrices?", "question"),
+    ("cual es la definición de espacio vectorial", "question"),
+
+    ("Dame ejemplos del determinante", "examples_request"),
+    ("Muéstrame un ejemplo de producto punto", "examples_request"),
+    ("¿Puedes darme ejemplos de matrices?", "examples_request"),
+    ("quiero ver ejemplos de suma de vectores", "examples_request"),
+    ("Ejemplos de transformaciones lineales", "examples_request"),
+    ("ilustra con un ejemplo la matriz inversa", "examples_request"),
+    ("un ejemplo numérico por favor", "examples_request"),
+
+    ("¿Cómo se calcula el producto punto?", "procedure_request"),
+    ("¿Cómo hago para multiplicar dos matrices?", "procedure_request"),
+    ("cómo se resuelve un sistema de ecuaciones lineales", "procedure_request"),
+    ("¿Cuáles son los pasos para calcular la inversa?", "procedure_request"),
+    ("¿Cómo puedo obtener el determinante de una matriz 3x3?", "procedure_request"),
+    ("pasos de la eliminación gaussiana", "procedure_request"),
+    ("¿Cómo resuelvo un sistema de ecuaciones?", "procedure_request"),
+
+    ("Explícame la suma de matrices", "explanation_request"),
+    ("Explica el producto cruz", "explanation_request"),
+    ("Describe qué es una transformación lineal", "explanation_request"),
+    ("Háblame de los eigenvalores", "explanation_request"),
+    ("explícame mejor la regla de Cramer", "explanation_request"),
+    ("Profundiza en la diagonalización", "explanation_request"),
+    ("Detalla el concepto de base de un espacio", "explanation_request"),
+
+    ("Calcula el producto punto de (1, 2) y (3, 4)", "calculation_request"),
+    ("Resuelve x + y = 3, x - y = 1", "calculation_request"),
+    ("Encuentra el determinante de [[1, 2], [3, 4]]", "calculation_request"),
+    ("calcula la magnitud de (3, 4)", "calculation_request"),
+    ("Halla la inversa de la matriz [2, 0; 0, 2]", "calculation_request"),
+    ("determina si (1, 2) y (2, 4) son linealmente independientes", "calculation_request"),
+    ("suma los vectores (1, 0, 2) y (0, 1, 1)", "calculation_request"),
+
+    ("el resultado es 11", "answer"),
+    ("La respuesta es (4, 6)", "answer"),
+    ("me da 19", "answer"),
+    ("11", "answer"),
+    ("(4, 6)", "answer"),
+    ("creo que es -2", "answer"),
+    ("obtuve 5 * 1 + 2 * 3 = 11", "answer"),
+    ("= 14", "answer"),
+    ("es igual a 0 porque las filas son iguales", "answer"),
+    ("mi respuesta: x = 2, y = 1", "answer"),
+
+    ("gracias", "statement"),
+    ("ok, entendido", "statement"),
+    ("perfecto, ya lo entiendo", "statement"),
+    ("vale", "statement"),
+    ("Me cuesta el álgebra lineal", "statement"),
+    ("no entendí nada", "statement"),
+    ("genial, sigamos", "statement"),
+    ("muchas gracias por la explicación", "statement"),
+]
+
+
+def extract_features(text: str) -> List[str]:
+    """Rasgos del texto normalizado: patrones, palabras (stems) y bigramas; los números se agrupan"""
+    folded = fold(text).strip()
+    features = [f"re:{name}" for name, pattern in _PATTERNS.items() if pattern.search(folded)]
+
+    tokens = ["<num>" if token.isdigit() else stem(token) for token in _TOKEN_RE.findall(folded)]
+    if len(tokens) <= 2:
+        features.append("len:corto")
+    features.extend(f"w:{token}" for token in tokens)
+    features.extend(f"b:{a}_{b}" for a, b in zip(tokens, tokens[1:]))
+    if tokens:
+        features.append(f"inicio:{tokens[0]}")
+    return features
+
+
+class InteractionClassifier:
+    """Regresión logística multinomial (NumPy) sobre rasgos binarios.
+
+    Se entrena en milisegundos con TRAINING_EXAMPLES al construirse; classify() devuelve el
+    tipo más probable y su probabilidad como confianza.
+    """
+
+    def __init__(self, examples: Optional[List[Tuple[str, str]]] = None, epochs: int = 300,
+                 learning_rate: float = 0.5, l2: float = 1e-3):
+        examples = examples or TRAINING_EXAMPLES
+        self.labels = [label for label in INTERACTION_TYPES if any(y == label for _, y in examples)]
+        self.vocabulary: Dict[str, int] = {}
+        for text, _ in examples:
+            for feature in extract_features(text):
+                self.vocabulary.setdefault(feature, len(self.vocabulary))
+
+        X = np.stack([self._vectorize(text) for text, _ in examples])
+        y = np.array([self.labels.index(label) for _, label in examples])
+        self.weights, self.bias = self._fit(X, y, epochs, learning_rate, l2)
+
+    def _vectorize(self, text: str) -> np.ndarray:
+        vector = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for feature in extract_features(text):
+            index = self.vocabulary.get(feature)
+            if index is not None:
+                vector[index] = 1.0
+        return vector
+
+    def _fit(self, X: np.ndarray, y: np.ndarray, epochs: int, learning_rate: float, l2: float):
+        """Descenso de gradiente por lotes completos sobre la entropía cruzada"""
+        targets = np.eye(len(self.labels), dtype=np.float32)[y]
+        weights = np.zeros((X.shape[1], len(self.labels)), dtype=np.float32)
+        bias = np.zeros(len(self.labels), dtype=np.float32)
+        for _ in range(epochs):
+            probabilities = self._softmax(X @ weights + bias)
+            error = (probabilities - targets) / len(X)
+            weights -= learning_rate * (X.T @ error + l2 * weights)
+            bias -= learning_rate * error.sum(axis=0)
+        return weights, bias
+
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        return exp / exp.sum(axis=-1, keepdims=True)
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        probabilities = self._softmax(self._vectorize(text) @ self.weights + self.bias)
+        return {label: float(p) for label, p in zip(self.labels, probabilities)}
+
+    def classify(self, text: str) -> Tuple[str, float]:
+        """(tipo de interacción, confianza entre 0 y 1)
+
+        Un "saludo" que nombra un tema del curso no es solo un saludo: se toma el tipo más
+        probable entre los demás, con la probabilidad renormalizada sin el saludo.
+        """
+        if not text.strip():
+            return "statement", 0.0
+        probabilities = self.predict_proba(text)
+        label = max(probabilities, key=probabilities.get)
+        if label == "greeting" and _mentions_topic(text):
+            rest = 1.0 - probabilities.pop("greeting")
+            label = max(probabilities, key=probabilities.get)
+            return label, probabilities[label] / rest if rest > 0 else 0.0
+        return label, probabilities[label]
+
+
+def _mentions_topic(text: str) -> bool:
+    # Import diferido: el evaluador importa los agentes base y no hace falta al cargar este módulo
+    from agents.assessor_agent import match_topic_keywords
+    return match_topic_keywords(text) is not None
+
+
+# Un solo modelo por proceso: se entrena una vez, la primera vez que se necesita
+_classifier: Optional[InteractionClassifier] = None
+_classifier_lock = threading.Lock()
+
+
+def get_interaction_classifier() -> InteractionClassifier:
+    global _classifier
+    with _classifier_lock:
+        if _classifier is None:
+            _classifier = InteractionClassifier()
+        return _classifier
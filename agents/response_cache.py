@@ -0,0 +1,173 @@
+"""Caché de respuestas del LLM - Memoria LRU con TTL sobre un almacén SQLite persistente"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, Optional, Tuple
+from config.settings import settings
+from utils.cache import TTLCache
+from utils.async_pool import run_blocking
+
+
+def make_response_key(agent_type: str, model: str, temperature: Any,
+                      system_prompt: str, prompt: str) -> str:
+    """Clave determinista: agente, modelo, temperatura y hash de los prompts (espacios normalizados)"""
+    parts = [agent_type, str(model), str(temperature), " ".join(system_prompt.split()), " ".join(prompt.split())]
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+class ResponseStore:
+    """Tabla SQLite de respuestas con vencimiento y tope de entradas (se expulsan las más antiguas)"""
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                agent_type TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_created_at ON responses(created_at)"
+        )
+        # Las entradas vencidas se limpian al abrir
+        self._conn.execute("DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[str, Optional[float]]]:
+        """(respuesta, segundos de vida restantes o None si no vence); None si no está o venció"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        response, expires_at = row
+        if expires_at is None:
+            return response, None
+        remaining = expires_at - time.time()
+        if remaining <= 0:
+            return None
+        return response, remaining
+
+    def put(self, key: str, agent_type: str, response: str, ttl: Optional[float] = None):
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, agent_type, response, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, agent_type, response, now, expires_at)
+            )
+            if self.max_entries > 0:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+                    "ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """Primero la memoria (LRU + TTL); si falla, SQLite, y el acierto se promueve a memoria"""
+
+    def __init__(self, path: Optional[str] = None, memory_size: int = None, ttl: float = None,
+                 max_entries: int = None):
+        self.ttl = settings.RESPONSE_CACHE_TTL if ttl is None else ttl
+        self.memory = TTLCache(memory_size or settings.RESPONSE_CACHE_MEMORY_SIZE, self.ttl)
+        self.store = ResponseStore(
+            path, settings.RESPONSE_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        ) if path else None
+        self.store_hits = 0
+
+    def _promote(self, key: str, stored: Optional[Tuple[str, Optional[float]]]) -> Optional[str]:
+        """Sube un acierto de SQLite a memoria con la vida que le queda (0 = sin vencimiento)"""
+        if stored is None:
+            return None
+        response, remaining = stored
+        self.store_hits += 1
+        self.memory.set(key, response, ttl=remaining or 0)
+        return response
+
+    def get(self, key: str) -> Optional[str]:
+        response = self.memory.get(key)
+        if response is None and self.store is not None:
+            response = self._promote(key, self.store.get(key))
+        return response
+
+    def set(self, key: str, agent_type: str, response: str, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        self.memory.set(key, response, ttl=ttl)
+        if self.store is not None:
+            self.store.put(key, agent_type, response, ttl)
+
+    async def aget(self, key: str) -> Optional[str]:
+        """Versión async: la memoria se consulta directo y SQLite en el pool de hilos"""
+        response = self.memory.get(key)
+        if response is None and self.store is not None:
+            response = self._promote(key, await run_blocking(self.store.get, key))
+        return response
+
+    async def aset(self, key: str, agent_type: str, response: str, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        self.memory.set(key, response, ttl=ttl)
+        if self.store is not None:
+            await run_blocking(self.store.put, key, agent_type, response, ttl)
+
+    def clear(self):
+        self.memory.clear()
+        if self.store is not None:
+            self.store.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {"memory": self.memory.get_stats(), "store_hits": self.store_hits}
+        if self.store is not None:
+            stats["store_entries"] = self.store.count()
+        return stats
+
+
+# Una sola caché de respuestas por proceso, compartida por todos los agentes
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Caché global (None si está desactivada en la configuración)"""
+    global _response_cache
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            try:
+                _response_cache = ResponseCache(settings.RESPONSE_CACHE_PATH)
+            except Exception as e:
+                print(f"⚠️ Caché de respuestas solo en memoria: {e}")
+                _response_cache = ResponseCache(None)
+        return _response_cache
@@ -3,6 +3,8 @@
 from typing import Dict, Any, List
 from .base_agent import BaseAgent
 from config.settings import settings
+from rag.retrieval import create_default_pipeline
+from rag.compression import ExtractiveCompressor
 
 class RetrieverAgent(BaseAgent):
     """Agente que recupera contenido usando RAG"""
@@ -10,6 +12,10 @@ class RetrieverAgent(BaseAgent):
     def __init__(self, llm, vector_store_manager):
         super().__init__("retriever", llm)
         self.vector_store = vector_store_manager
+        self.pipeline = create_default_pipeline(vector_store_manager, rewriter=self._build_search_query)
+        self.compressor = ExtractiveCompressor(
+            embeddings=getattr(vector_store_manager, "embeddings", None)
+        )
         
     async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """Recupera contenido relevante usando RAG"""
@@ -21,23 +27,26 @@ class RetrieverAgent(BaseAgent):
         student_level = assessment.get("level", 3)
         topic = assessment.get("topic", "")
         
-        # Construir query para recuperación
-        search_query = await self._build_search_query(student_input, topic, student_level)
-        
-        # Recuperar contenido de la base vectorial (SIN await - es método sincrónico)
-        retrieved_docs = self.vector_store.similarity_search(
-            query=search_query,
+        # Pipeline por etapas: reescritura, candidatos, filtro, rerank, dedup y empaquetado
+        result = await self.pipeline.run(
+            student_input,
+            topic=topic,
+            level=student_level,
             k=settings.RETRIEVAL_TOP_K,
-            filter_level=student_level
+            interaction_type=context.get("interaction_type", "question")
         )
+        retrieved_docs = result["documents"]
         
         # Procesar y filtrar contenido recuperado
-        processed_content = await self._process_retrieved_content(retrieved_docs, assessment)
+        processed_content = await self._process_retrieved_content(
+            retrieved_docs, assessment, query=f"{student_input} {result['query']}"
+        )
         
         return {
             "retrieved_content": processed_content,
             "source_documents": retrieved_docs,
-            "search_query": search_query
+            "search_query": result["query"],
+            "retrieval_trace": result["trace"]
         }
     
     async def _build_search_query(self, student_input: str, topic: str, level: int) -> str:
@@ -63,12 +72,16 @@ class RetrieverAgent(BaseAgent):
             # Fallback: usar input original o tema
             return topic if topic else student_input
     
-    async def _process_retrieved_content(self, documents: List, assessment: Dict) -> str:
+    async def _process_retrieved_content(self, documents: List, assessment: Dict, query: str = "") -> str:
         """Procesa y filtra el contenido recuperado"""
         
         if not documents:
             return "No se encontró contenido específico para tu consulta."
         
+        if settings.CONTEXT_COMPRESSION_MODE != "llm":
+            # Compresión extractiva local: milisegundos en lugar de otra llamada al LLM
+            return await self.compressor.acompress(query or assessment.get("topic", ""), documents[:3])
+        
         # Combinar contenido de documentos (máximo 3 para evitar sobrecarga)
         combined_content = "\n\n".join([doc.page_content for doc in documents[:3]])
         
@@ -107,8 +120,8 @@ class RetrieverAgent(BaseAgent):
     async def search_specific_topic(self, topic: str, level: int = 3) -> List:
         """Busca contenido específico de un tema"""
         try:
-            # Usar método sincrónico sin await
-            docs = self.vector_store.search_by_topic(topic, level=level, k=3)
+            # Filtro exacto sobre el índice de metadatos: sin llamada de embeddings
+            docs = await self.vector_store.asearch_by_topic(topic, level=level, k=3)
             return docs
         except Exception as e:
             print(f"Error buscando tema {topic}: {e}")
@@ -141,7 +154,8 @@ class RetrieverAgent(BaseAgent):
                 "total_documents": vector_stats.get("count", 0),
                 "available_topics": topics,
                 "status": vector_stats.get("status", "unknown"),
-                "retrieval_k": settings.RETRIEVAL_TOP_K
+                "retrieval_k": settings.RETRIEVAL_TOP_K,
+                "pipeline": self.pipeline.get_stats()
             }
         except Exception as e:
             return {
@@ -1,6 +1,6 @@
 """Agente Tutor - Genera respuestas educativas personalizadas - CORREGIDO PARA RESPUESTAS ESPECÍFICAS"""
 
-from typing import Dict, Any, List
+from typing import Dict, Any, AsyncIterator, List, Tuple
 from .base_agent import BaseAgent
 from config.settings import settings
 
@@ -15,33 +15,12 @@ class TutorAgent(BaseAgent):
         
         context = input_data.get("context", {})
         assessment = input_data.get("assessment", {})
-        retrieved_content = input_data.get("retrieved_content", "")
-        
-        student_input = context.get("student_input", "")
         interaction_type = context.get("interaction_type", "question")
         student_level = assessment.get("level", 3)
         topic = assessment.get("topic", "")
-        gaps = assessment.get("gaps", [])
         
-        # Generar respuesta según el tipo de interacción
-        if interaction_type == "greeting":
-            response = await self._generate_greeting_response()
-        elif interaction_type == "question":
-            response = await self._generate_specific_question_response(
-                student_input, student_level, topic, retrieved_content, gaps
-            )
-        elif interaction_type == "answer":
-            response = await self._generate_feedback_response(
-                student_input, assessment, retrieved_content
-            )
-        elif interaction_type == "explanation_request":
-            response = await self._generate_explanation_response(
-                student_input, student_level, topic, retrieved_content
-            )
-        else:
-            response = await self._generate_specific_question_response(
-                student_input, student_level, topic, retrieved_content, gaps
-            )
+        prompt, use_cache = self._response_prompt(input_data)
+        response = await self.generate_response(prompt, use_cache=use_cache)
         
         # Agregar ejercicio de práctica si es apropiado
         practice_exercise = await self._generate_practice_exercise(
@@ -55,26 +34,59 @@ class TutorAgent(BaseAgent):
             "topic_addressed": topic
         }
     
-    async def _generate_specific_question_response(self, question: str, level: int, topic: str, 
-                                                  content: str, gaps: List[str]) -> str:
-        """Genera respuesta ESPECÍFICA y DIRECTA a la pregunta del estudiante"""
+    async def astream_response(self, input_data: Dict[str, Any]) -> AsyncIterator[str]:
+        """Igual que la respuesta de process(), pero entregada por fragmentos a medida que llegan"""
+        prompt, use_cache = self._response_prompt(input_data)
+        async for token in self.astream(prompt, use_cache=use_cache):
+            yield token
+    
+    def _response_prompt(self, input_data: Dict[str, Any]) -> Tuple[str, bool]:
+        """Prompt de la respuesta según el tipo de interacción, y si conviene cachearla"""
+        
+        context = input_data.get("context", {})
+        assessment = input_data.get("assessment", {})
+        retrieved_content = input_data.get("retrieved_content", "")
+        
+        student_input = context.get("student_input", "")
+        interaction_type = context.get("interaction_type", "question")
+        student_level = assessment.get("level", 3)
+        topic = assessment.get("topic", "")
+        gaps = assessment.get("gaps", [])
+        
+        # Generar respuesta según el tipo de interacción
+        if interaction_type == "greeting":
+            # El prompt del saludo es fijo: se cachea aunque el tutor no use caché
+            return self._greeting_prompt(), True
+        elif interaction_type == "answer":
+            prompt = self._feedback_prompt(student_input, assessment, retrieved_content)
+        elif interaction_type == "explanation_request":
+            prompt = self._explanation_prompt(student_input, student_level, topic, retrieved_content)
+        else:
+            prompt = self._specific_question_prompt(
+                student_input, student_level, topic, retrieved_content, gaps
+            )
+        return prompt, False
+    
+    def _specific_question_prompt(self, question: str, level: int, topic: str, 
+                                  content: str, gaps: List[str]) -> str:
+        """Prompt para una respuesta ESPECÍFICA y DIRECTA a la pregunta del estudiante"""
         
         # Analizar qué pregunta específicamente
         question_lower = question.lower()
         
         if "producto" in question_lower and "matrices" in question_lower:
-            return await self._explain_matrix_multiplication(level, content)
+            return self._matrix_multiplication_prompt(level, content)
         elif "ejemplos" in question_lower:
-            return await self._provide_specific_examples(question, level, topic, content)
+            return self._examples_prompt(question, level, topic, content)
         elif "que es" in question_lower or "qué es" in question_lower:
-            return await self._explain_concept_directly(question, level, content)
+            return self._concept_prompt(question, level, content)
         elif "como" in question_lower or "cómo" in question_lower:
-            return await self._explain_procedure(question, level, content)
+            return self._procedure_prompt(question, level, content)
         else:
-            return await self._generate_direct_answer(question, level, topic, content)
+            return self._direct_answer_prompt(question, level, topic, content)
     
-    async def _explain_matrix_multiplication(self, level: int, content: str) -> str:
-        """Explica específicamente el producto de matrices"""
+    def _matrix_multiplication_prompt(self, level: int, content: str) -> str:
+        """Prompt que explica específicamente el producto de matrices"""
         
         prompt = f"""
         Explica ESPECÍFICAMENTE el producto de matrices para un estudiante de nivel {level}/5.
@@ -92,10 +104,10 @@ class TutorAgent(BaseAgent):
         Incluye SIEMPRE un ejemplo numérico completo.
         """
         
-        return await self.generate_response(prompt)
+        return prompt
     
-    async def _provide_specific_examples(self, question: str, level: int, topic: str, content: str) -> str:
-        """Proporciona ejemplos específicos y concretos"""
+    def _examples_prompt(self, question: str, level: int, topic: str, content: str) -> str:
+        """Prompt que pide ejemplos específicos y concretos"""
         
         prompt = f"""
         El estudiante pidió ejemplos sobre: "{question}"
@@ -115,10 +127,10 @@ class TutorAgent(BaseAgent):
         Sé ESPECÍFICO. El estudiante quiere ver cálculos reales.
         """
         
-        return await self.generate_response(prompt)
+        return prompt
     
-    async def _explain_concept_directly(self, question: str, level: int, content: str) -> str:
-        """Explica un concepto de manera directa"""
+    def _concept_prompt(self, question: str, level: int, content: str) -> str:
+        """Prompt que explica un concepto de manera directa"""
         
         prompt = f"""
         Pregunta específica: "{question}"
@@ -136,10 +148,10 @@ class TutorAgent(BaseAgent):
         SIEMPRE incluye un ejemplo con números reales.
         """
         
-        return await self.generate_response(prompt)
+        return prompt
     
-    async def _explain_procedure(self, question: str, level: int, content: str) -> str:
-        """Explica cómo hacer algo paso a paso"""
+    def _procedure_prompt(self, question: str, level: int, content: str) -> str:
+        """Prompt que explica cómo hacer algo paso a paso"""
         
         prompt = f"""
         Pregunta sobre procedimiento: "{question}"
@@ -156,10 +168,10 @@ class TutorAgent(BaseAgent):
         Sé PRÁCTICO y ESPECÍFICO. El estudiante quiere saber CÓMO hacerlo.
         """
         
-        return await self.generate_response(prompt)
+        return prompt
     
-    async def _generate_direct_answer(self, question: str, level: int, topic: str, content: str) -> str:
-        """Genera respuesta directa para cualquier pregunta"""
+    def _direct_answer_prompt(self, question: str, level: int, topic: str, content: str) -> str:
+        """Prompt de respuesta directa para cualquier pregunta"""
         
         prompt = f"""
         Pregunta del estudiante: "{question}"
@@ -179,10 +191,10 @@ class TutorAgent(BaseAgent):
         IMPORTANTE: El estudiante quiere una respuesta ESPECÍFICA a su pregunta.
         """
         
-        return await self.generate_response(prompt)
+        return prompt
     
-    async def _generate_greeting_response(self) -> str:
-        """Genera respuesta de saludo"""
+    def _greeting_prompt(self) -> str:
+        """Prompt del saludo"""
         
         prompt = """
         Genera un saludo breve y directo para VectorMentor.
@@ -195,11 +207,11 @@ class TutorAgent(BaseAgent):
         NO hagas introducciones largas.
         """
         
-        return await self.generate_response(prompt)
+        return prompt
     
-    async def _generate_feedback_response(self, student_answer: str, assessment: Dict, 
-                                        content: str) -> str:
-        """Genera feedback sobre la respuesta del estudiante"""
+    def _feedback_prompt(self, student_answer: str, assessment: Dict, 
+                         content: str) -> str:
+        """Prompt de feedback sobre la respuesta del estudiante"""
         
         level = assessment.get("level", 3)
         errors = assessment.get("errors", [])
@@ -224,11 +236,11 @@ class TutorAgent(BaseAgent):
         Sé DIRECTO y CONSTRUCTIVO.
         """
         
-        return await self.generate_response(prompt)
+        return prompt
     
-    async def _generate_explanation_response(self, request: str, level: int, topic: str, 
-                                           content: str) -> str:
-        """Genera explicación detallada de un concepto"""
+    def _explanation_prompt(self, request: str, level: int, topic: str, 
+                            content: str) -> str:
+        """Prompt de explicación detallada de un concepto"""
         
         prompt = f"""
         Explica este concepto en detalle: "{request}"
@@ -246,7 +258,7 @@ class TutorAgent(BaseAgent):
         Sé DETALLADO pero CLARO. Incluye cálculos específicos.
         """
         
-        return await self.generate_response(prompt)
+        return prompt
     
     async def _generate_practice_exercise(self, topic: str, level: int, 
                                         interaction_type: str) -> str:
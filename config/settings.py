@@ -1,7 +1,7 @@
 """Configuraciones del sistema EduMentor AI"""
 
 import os
-from typing import Dict, Any
+from typing import Dict, Any, List
 from dotenv import load_dotenv
 
 # CARGAR EL ARCHIVO .ENV PRIMERO
@@ -17,13 +17,64 @@ class Settings:
     LLM_MODEL: str = "gpt-4o-mini"  # Modelo más económico
     EMBEDDING_MODEL: str = "text-embedding-3-small"  # Modelo actualizado
     
+    # Planificador de llamadas al proveedor (LLM y embeddings comparten los límites de la cuenta)
+    LLM_MAX_IN_FLIGHT: int = 8  # Solicitudes simultáneas como máximo
+    LLM_REQUESTS_PER_MINUTE: int = 500  # 0 = sin límite
+    LLM_TOKENS_PER_MINUTE: int = 200000  # 0 = sin límite
+    LLM_MAX_RETRIES: int = 4  # Reintentos ante 429, 5xx o fallos de red
+    LLM_RETRY_BASE_DELAY: float = 0.5  # Segundos; se duplica en cada intento (con jitter)
+    LLM_RETRY_MAX_DELAY: float = 20.0
+    
     # Base vectorial
-    VECTOR_STORE_TYPE: str = "chroma"
+    VECTOR_STORE_TYPE: str = "chroma"  # "chroma" o "numpy"
     CHROMA_PERSIST_DIRECTORY: str = "./chroma_db"
     
+    # Backend NumPy (VECTOR_STORE_TYPE = "numpy")
+    NUMPY_STORE_DIRECTORY: str = "./numpy_store"
+    NUMPY_INDEX_TYPE: str = "flat"  # "flat" (exacto) o "ivf" (particionado con k-means)
+    NUMPY_INDEX_DTYPE: str = "float32"  # "float16" reduce a la mitad el archivo mapeado
+    IVF_NLIST: int = 64  # Número de particiones
+    IVF_NPROBE: int = 8  # Particiones revisadas por consulta
+    IVF_MIN_TRAIN_SIZE: int = 2048  # Por debajo se usa búsqueda exacta
+    
+    # Caché persistente de embeddings
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = "./cache/embeddings.sqlite3"
+    EMBEDDING_CACHE_MAX_BYTES: int = 256 * 1024 * 1024  # 256 MB
+    
     # Configuraciones de RAG
     RETRIEVAL_TOP_K: int = 5
+    QUERY_CACHE_ENABLED: bool = True  # Caché de resultados de similarity_search
+    QUERY_CACHE_SIZE: int = 512
+    QUERY_CACHE_TTL: int = 3600  # Segundos
+    RESPONSE_CACHE_ENABLED: bool = True  # Caché de respuestas del LLM (opt-in por agente)
+    RESPONSE_CACHE_PATH: str = "./cache/responses.sqlite3"
+    RESPONSE_CACHE_MEMORY_SIZE: int = 256
+    RESPONSE_CACHE_TTL: int = 7 * 24 * 3600  # Segundos
+    RESPONSE_CACHE_MAX_ENTRIES: int = 20000
+    TURN_CACHE_ENABLED: bool = True  # Caché semántica de turnos completos del workflow
+    TURN_CACHE_THRESHOLD: float = 0.92  # Similitud mínima entre inputs para reutilizar la respuesta
+    TURN_CACHE_MAX_ENTRIES: int = 500
+    TURN_CACHE_TTL: int = 24 * 3600  # Segundos
+    TURN_CACHE_SKIP_TYPES: tuple = ("answer",)  # Dependen del ejercicio anterior: no se cachean
+    INGEST_BATCH_SIZE: int = 64  # Documentos por lote de upsert al cargar contenido
+    RETRIEVAL_MAX_WORKERS: int = 4  # Hilos para el trabajo bloqueante de la recuperación async
+    HYBRID_RETRIEVAL_MODE: str = "fused"  # "fused" (vector + BM25 con RRF) o "vector"
+    HYBRID_VECTOR_BUDGET_MS: int = 800  # Presupuesto de la búsqueda vectorial en modo fused
+    RRF_K: int = 60  # Constante de Reciprocal Rank Fusion
+    MMR_LAMBDA: float = 0.7  # 1.0 = solo relevancia, 0.0 = solo diversidad
+    MMR_RANK_WEIGHT: float = 0.5  # Peso del orden del rerank (RRF) frente al coseno en la relevancia de MMR
+    CONTEXT_COMPRESSION_MODE: str = "extractive"  # "extractive" (local) o "llm" (resumen con el LLM)
+    CONTEXT_COMPRESSION_SCORER: str = "bm25"  # "bm25" o "embedding" (similitud con la consulta)
+    CONTEXT_MAX_TOKENS: int = 400  # Presupuesto del contexto comprimido
+    INTERACTION_CLASSIFIER_THRESHOLD: float = 0.6  # Por debajo el coordinador consulta al LLM
+    EMBEDDING_TIMEOUT_SECONDS: float = 5.0  # Timeout por llamada de embeddings
+    EMBEDDING_BREAKER_FAILURES: int = 3  # Fallos seguidos que abren el circuito
+    EMBEDDING_BREAKER_RESET_SECONDS: float = 30.0  # Espera antes de la prueba half-open
     SIMILARITY_THRESHOLD: float = 0.7
+    SIMILARITY_BLOCK_SIZE: int = 1024  # Tamaño de bloque para matrices de similaridad
+    EMBEDDING_QUALITY_EXACT_LIMIT: int = 5000  # Por encima se estima con muestreo
+    EMBEDDING_QUALITY_SAMPLE_PAIRS: int = 200000
     
     # Configuraciones de agentes
     MAX_CONVERSATION_HISTORY: int = 10
@@ -50,6 +101,7 @@ AGENT_CONFIGS: Dict[str, Dict[str, Any]] = {
     "assessor": {
         "temperature": 0.3,
         "max_tokens": 300,
+        "cache_responses": True,
         "system_prompt": """Eres un evaluador experto en álgebra lineal. 
         Analiza las respuestas del estudiante y determina su nivel de comprensión 
         en una escala de 1-5. Identifica gaps de conocimiento y sugiere el siguiente paso."""
@@ -58,6 +110,7 @@ AGENT_CONFIGS: Dict[str, Dict[str, Any]] = {
     "retriever": {
         "temperature": 0.1,
         "max_tokens": 200,
+        "cache_responses": True,
         "system_prompt": """Eres un especialista en recuperación de contenido educativo. 
         Tu trabajo es encontrar el material más relevante y apropiado para el nivel 
         del estudiante."""
@@ -72,6 +125,14 @@ AGENT_CONFIGS: Dict[str, Dict[str, Any]] = {
     }
 }
 
+# Etapas del pipeline de recuperación que se omiten por tipo de interacción
+RETRIEVAL_DISABLED_STAGES: Dict[str, List[str]] = {
+    "greeting": ["rewrite", "rerank"],
+    "answer": ["rewrite"],
+    "calculation_request": ["rewrite"],
+    "statement": ["rewrite"]
+}
+
 # Instancia global de configuraciones
 settings = Settings()
 
@@ -8,7 +8,8 @@ import sys
 import os
 import re
 import asyncio
-from utils.math_formatter import format_tutor_response
+from utils.math_formatter import format_tutor_response, IncrementalMathFormatter
+from utils.text_analysis import analyze, analyze_terms
 from typing import Dict, Any
 # Agregar el directorio raíz al path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -423,34 +424,35 @@ Texto normal aquí.
     st.markdown("### Output procesado:")
     display_chat_message(test_text, is_user=False)
 
+# Vocabulario de álgebra lineal para decidir si una pregunta es del tema
+ALGEBRA_KEYWORDS = [
+    'vector', 'vectores', 'magnitud', 'dirección', 'componentes', 'coordenadas',
+    'ortogonal', 'perpendicular', 'paralelo', 'unitario', 'normalizar',
+    'matriz', 'matrices', 'determinante', 'determinantes', 'transpuesta',
+    'inversa', 'diagonal', 'identidad', 'simétrica', 'antisimétrica',
+    'sistema', 'ecuaciones', 'lineales', 'cramer', 'gauss', 'gaussiana',
+    'eliminación', 'sustitución', 'reducción', 'escalonada', 'pivote',
+    'suma', 'multiplicación', 'producto', 'punto', 'escalar', 'cruz',
+    'combinación', 'lineal', 'transformación', 'proyección',
+    'espacio', 'vectorial', 'base', 'bases', 'dimensión', 'independencia',
+    'dependencia', 'generador', 'subespacio', 'kernel', 'nulo',
+    'algebra', 'lineal', 'matemáticas', 'geometría', 'analítica',
+    'ángulo', 'distancia', 'norma', 'métrica'
+]
+ALGEBRA_TERMS = analyze_terms(ALGEBRA_KEYWORDS)
+
 def process_user_input(workflow, user_input):
     """Procesa el input del usuario a través del workflow"""
     try:
-        from rag.vector_store import VectorStoreManager
-        rag = VectorStoreManager()
-        
         if workflow is None:
-            # Usar búsqueda vectorial
+            # Usar búsqueda vectorial con el gestor compartido del proceso
+            from rag.store_factory import get_vector_store_manager
+            rag = get_vector_store_manager()
             results = rag.similarity_search(user_input, k=3)
             
-            # Verificar relevancia
-            algebra_keywords = [
-                'vector', 'vectores', 'magnitud', 'dirección', 'componentes', 'coordenadas',
-                'ortogonal', 'perpendicular', 'paralelo', 'unitario', 'normalizar',
-                'matriz', 'matrices', 'determinante', 'determinantes', 'transpuesta',
-                'inversa', 'diagonal', 'identidad', 'simétrica', 'antisimétrica',
-                'sistema', 'ecuaciones', 'lineales', 'cramer', 'gauss', 'gaussiana',
-                'eliminación', 'sustitución', 'reducción', 'escalonada', 'pivote',
-                'suma', 'multiplicación', 'producto', 'punto', 'escalar', 'cruz',
-                'combinación', 'lineal', 'transformación', 'proyección',
-                'espacio', 'vectorial', 'base', 'bases', 'dimensión', 'independencia',
-                'dependencia', 'generador', 'subespacio', 'kernel', 'nulo',
-                'algebra', 'lineal', 'matemáticas', 'geometría', 'analítica',
-                'ángulo', 'distancia', 'norma', 'métrica'
-            ]
-            
-            user_words = user_input.lower().split()
-            is_algebra_related = any(word in algebra_keywords for word in user_words)
+            # Verificar relevancia: términos analizados (acentos, plurales) contra el vocabulario
+            user_terms = analyze(user_input)
+            is_algebra_related = any(term in ALGEBRA_TERMS for term in user_terms)
             
             if is_algebra_related:
                 return _process_algebra_question(user_input, results)
@@ -464,6 +466,28 @@ def process_user_input(workflow, user_input):
     except Exception as e:
         return _create_error_response(str(e))
 
+def stream_user_input(workflow, user_input, placeholder):
+    """Procesa el input con el workflow mostrando la respuesta a medida que se genera"""
+    
+    async def consume():
+        formatter = IncrementalMathFormatter(clean_math_formatting)
+        shown = ""
+        result = None
+        async for event in workflow.astream_student_input(user_input):
+            if event["type"] == "token":
+                shown += formatter.feed(event["content"])
+                # El texto pendiente (fórmula sin cerrar) se muestra cuando se completa
+                placeholder.markdown(shown + "▌")
+            else:
+                result = event["result"]
+        placeholder.markdown(shown + formatter.flush())
+        return result
+    
+    try:
+        return asyncio.run(consume())
+    except Exception as e:
+        return _create_error_response(str(e))
+
 def _process_algebra_question(user_input, results):
     """Procesa preguntas de álgebra lineal usando OpenAI CON EVALUACIÓN AUTOMÁTICA"""
     try:
@@ -715,6 +739,7 @@ def main():
                 st.markdown(f"""
                 <div class="stats-box">
                 <strong>📚 Base de conocimientos:</strong> {stats['rag_system']['count']} documentos<br>
+                <strong>🗂️ Temas:</strong> {len(stats['rag_system'].get('topics', {}))}<br>
                 <strong>🤖 Agentes activos:</strong> {stats['agents_active']}<br>
                 <strong>🧠 Modelo LLM:</strong> {stats['llm_model']}<br>
                 <strong>💬 Interacciones:</strong> {stats['student_progress']['total_interactions']}
@@ -822,42 +847,47 @@ def main():
     
     # Procesar input
     if submit_button and user_input.strip():
-        with st.spinner("🤔 Pensando..."):
-            # Procesar input del usuario
-            result = process_user_input(st.session_state.workflow, user_input)
-            
-            # Verificar si result es una corrutina y ejecutarla
-            if hasattr(result, '__await__'):
-                result = asyncio.run(result)
-            
-            # VERIFICAR SI RESULT ES UN STRING (del workflow completo)
-            if isinstance(result, str):
-                # El workflow retornó solo un string, convertir al formato esperado
-                result = {
-                    "response": result,
-                    "assessment": {"level": 3, "topic": "workflow_complete"},
-                    "practice_exercise": "",
-                    "mode": "workflow"
-                }
-            
-            # Verificar que result sea un diccionario válido
-            if not isinstance(result, dict) or "response" not in result:
-                result = {
-                    "response": "Error procesando la respuesta. Por favor, intenta de nuevo.",
-                    "assessment": {"level": 3, "topic": "error"},
-                    "practice_exercise": "",
-                    "mode": "error"
-                }
-            
-            # Agregar a historial
-            st.session_state.conversation_history.append({
-                "user_input": user_input,
-                "response": result["response"],
-                "assessment": result.get("assessment", {}),
-                "practice_exercise": result.get("practice_exercise", "")
-            })
-            
-            st.rerun()
+        if st.session_state.workflow is not None:
+            # Con el workflow completo la respuesta se muestra a medida que se genera
+            st.markdown(f"🧑‍🎓 **Tú:** {user_input}")
+            st.markdown("🤖 **VectorMentor:**")
+            result = stream_user_input(st.session_state.workflow, user_input, st.empty())
+        else:
+            with st.spinner("🤔 Pensando..."):
+                result = process_user_input(st.session_state.workflow, user_input)
+        
+        # Verificar si result es una corrutina y ejecutarla
+        if hasattr(result, '__await__'):
+            result = asyncio.run(result)
+        
+        # VERIFICAR SI RESULT ES UN STRING (del workflow completo)
+        if isinstance(result, str):
+            # El workflow retornó solo un string, convertir al formato esperado
+            result = {
+                "response": result,
+                "assessment": {"level": 3, "topic": "workflow_complete"},
+                "practice_exercise": "",
+                "mode": "workflow"
+            }
+        
+        # Verificar que result sea un diccionario válido
+        if not isinstance(result, dict) or "response" not in result:
+            result = {
+                "response": "Error procesando la respuesta. Por favor, intenta de nuevo.",
+                "assessment": {"level": 3, "topic": "error"},
+                "practice_exercise": "",
+                "mode": "error"
+            }
+        
+        # Agregar a historial
+        st.session_state.conversation_history.append({
+            "user_input": user_input,
+            "response": result["response"],
+            "assessment": result.get("assessment", {}),
+            "practice_exercise": result.get("practice_exercise", "")
+        })
+        
+        st.rerun()
     
     # Botón de ejemplo
     if example_button:
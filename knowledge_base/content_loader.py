@@ -4,7 +4,7 @@ import os
 from pathlib import Path
 from typing import List
 from langchain_core.documents import Document
-from rag.vector_store import VectorStoreManager
+from rag.store_factory import get_vector_store_manager
 
 class ContentLoader:
     """Carga y procesa contenido educativo para la base vectorial"""
@@ -16,13 +16,8 @@ class ContentLoader:
     def load_all_content(self):
         """Carga todo el contenido educativo - MÉTODO SINCRÓNICO"""
         
-        # Inicializar vector manager (sin await)
-        self.vector_manager = VectorStoreManager()
-        
-        # Verificar si ya existe contenido
-        if self._content_exists():
-            print("✅ Contenido ya cargado en la base vectorial")
-            return
+        # Gestor compartido del proceso (sin await)
+        self.vector_manager = get_vector_store_manager()
         
         # Cargar contenido por categorías
         documents = []
@@ -33,20 +28,11 @@ class ContentLoader:
         documents.extend(self._load_ejercicios_content())
         documents.extend(self._load_advanced_content())
         
-        # Agregar a la base vectorial (sin await)
+        # Ids derivados del contenido: los documentos ya cargados y sin cambios se omiten,
+        # así que repetir la carga no duplica nada ni vuelve a calcular embeddings
         self.vector_manager.add_documents(documents)
         
-        print(f"✅ Cargados {len(documents)} documentos educativos")
-    
-    def _content_exists(self) -> bool:
-        """Verifica si ya existe contenido en la base vectorial"""
-        try:
-            if not self.vector_manager:
-                return False
-            results = self.vector_manager.similarity_search("vector", k=1)
-            return len(results) > 0
-        except:
-            return False
+        print(f"✅ Contenido educativo sincronizado ({len(documents)} documentos)")
     
     def _load_vectores_content(self) -> List[Document]:
         """Carga contenido sobre vectores"""
@@ -12,7 +12,7 @@ sys.path.append(str(Path(__file__).parent))
 
 from config.settings import settings
 from knowledge_base.content_loader import ContentLoader
-from rag.vector_store import VectorStoreManager
+from rag.store_factory import get_vector_store_manager
 from workflow.langgraph_flow import VectorMentorWorkflow
 from utils.logging_config import setup_logging
 
@@ -33,7 +33,7 @@ async def initialize_system():
     
     # Inicializar base vectorial (método sincrónico)
     print("🔍 Verificando base vectorial...")
-    vector_manager = VectorStoreManager()
+    vector_manager = get_vector_store_manager()
     stats = vector_manager.get_collection_stats()
     print(f"📊 Base vectorial: {stats['count']} documentos - {stats['status']}")
     
@@ -60,7 +60,7 @@ async def run_cli_mode():
     """Ejecuta el sistema en modo consola"""
     try:
         # Importar formateador de matemáticas
-        from utils.math_formatter import format_tutor_response, improve_cli_display
+        from utils.math_formatter import IncrementalMathFormatter, improve_cli_display
         
         # Mejorar display CLI
         improve_cli_display()
@@ -85,12 +85,14 @@ async def run_cli_mode():
                 if not user_input.strip():
                     continue
                 
-                print("🤖 VectorMentor: Procesando...")
-                response = await workflow.process_student_input(user_input)
+                print("🤖 VectorMentor:")
                 
-                # Formatear la respuesta para mejor visualización
-                formatted_response = format_tutor_response(response)
-                print(f"🤖 VectorMentor:\n{formatted_response}\n")
+                # Mostrar la respuesta a medida que llega, formateando solo fórmulas completas
+                formatter = IncrementalMathFormatter()
+                async for event in workflow.astream_student_input(user_input):
+                    if event["type"] == "token":
+                        print(formatter.feed(event["content"]), end="", flush=True)
+                print(formatter.flush() + "\n")
                 
             except KeyboardInterrupt:
                 break
@@ -11,4 +11,27 @@ try:
 except ImportError:
     EmbeddingManager = None
 
-__all__ = ['VectorStoreManager', 'EmbeddingManager']
\ No newline at end of file
+try:
+    from .similarity import SimilarityIndex
+except ImportError:
+    SimilarityIndex = None
+
+try:
+    from .numpy_store import NumpyVectorStoreManager
+except ImportError:
+    NumpyVectorStoreManager = None
+
+try:
+    from .store_factory import create_vector_store_manager, get_vector_store_manager
+except ImportError:
+    create_vector_store_manager = None
+    get_vector_store_manager = None
+
+__all__ = [
+    'VectorStoreManager',
+    'NumpyVectorStoreManager',
+    'EmbeddingManager',
+    'SimilarityIndex',
+    'create_vector_store_manager',
+    'get_vector_store_manager'
+]
\ No newline at end of file
@@ -0,0 +1,238 @@
+"""Interfaz común para los backends de la base vectorial"""
+
+import hashlib
+import numpy as np
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Optional
+from langchain_core.documents import Document
+from config.settings import settings
+from utils.cache import TTLCache
+from utils.async_pool import run_blocking
+from .catalog import MetadataCatalog
+from .embedding_cache import normalize_text
+
+
+def normalize_query(query: str) -> str:
+    """Normaliza mayúsculas y espacios para que variantes triviales compartan caché"""
+    return " ".join(query.casefold().split())
+
+
+def make_document_id(document: Document) -> str:
+    """Id estable derivado del contenido: recargar el mismo texto no lo duplica"""
+    return hashlib.sha256(normalize_text(document.page_content).encode("utf-8")).hexdigest()
+
+
+class BaseVectorStoreManager(ABC):
+    """Clase base abstracta para los gestores de base vectorial (Chroma, NumPy)"""
+
+    def __init__(self):
+        # La generación cambia con cada escritura e invalida los resultados cacheados
+        self._generation = 0
+        self._query_cache = None
+        if settings.QUERY_CACHE_ENABLED:
+            self._query_cache = TTLCache(settings.QUERY_CACHE_SIZE, settings.QUERY_CACHE_TTL)
+        # Conteos por tema/nivel/subtema; cada backend fija la ruta junto a su índice
+        self.catalog = MetadataCatalog()
+
+    def _cached_results(self, key) -> Optional[List[Document]]:
+        if self._query_cache is None:
+            return None
+        cached = self._query_cache.get(key)
+        return list(cached) if cached is not None else None
+
+    def is_cached(self, query: str, k: int = None, filter_level: int = None) -> bool:
+        """True si la búsqueda (query, k, nivel) se respondería desde la caché"""
+        k = k or settings.RETRIEVAL_TOP_K
+        key = (normalize_query(query), k, filter_level, self._generation)
+        return self._cached_results(key) is not None
+
+    def _store_results(self, key, docs: List[Document]):
+        # Las listas vacías suelen venir de errores: no se cachean
+        if self._query_cache is not None and docs:
+            self._query_cache.set(key, list(docs))
+
+    def similarity_search(self, query: str, k: int = None, filter_level: int = None) -> List[Document]:
+        """Busca documentos similares al query, reutilizando resultados recientes"""
+        k = k or settings.RETRIEVAL_TOP_K
+        key = (normalize_query(query), k, filter_level, self._generation)
+        cached = self._cached_results(key)
+        if cached is not None:
+            return cached
+
+        docs = self._similarity_search(query, k, filter_level)
+        self._store_results(key, docs)
+        return docs
+
+    async def asimilarity_search(self, query: str, k: int = None, filter_level: int = None) -> List[Document]:
+        """Versión async: embedding con el cliente asíncrono y búsqueda en el pool de hilos"""
+        k = k or settings.RETRIEVAL_TOP_K
+        key = (normalize_query(query), k, filter_level, self._generation)
+        cached = self._cached_results(key)
+        if cached is not None:
+            return cached
+
+        try:
+            query_vector = await self.embeddings.aembed_query(query)
+            docs = await run_blocking(self._search_by_vector, query_vector, k, filter_level)
+        except Exception as e:
+            print(f"❌ Error en búsqueda: {e}")
+            docs = []
+        self._store_results(key, docs)
+        return docs
+
+    def _similarity_search(self, query: str, k: int, filter_level: int = None) -> List[Document]:
+        """Búsqueda real en el backend (sin caché)"""
+        try:
+            return self._search_by_vector(self.embeddings.embed_query(query), k, filter_level)
+        except Exception as e:
+            print(f"❌ Error en búsqueda: {e}")
+            return []
+
+    @abstractmethod
+    def _search_by_vector(self, query_vector: List[float], k: int,
+                          filter_level: int = None) -> List[Document]:
+        """Top-k por similitud para un embedding ya calculado"""
+        pass
+
+    def stored_vectors(self, documents: List[Document]) -> List[Optional[np.ndarray]]:
+        """Embeddings ya guardados de esos documentos (None donde el backend no los tenga)"""
+        try:
+            found = self._vectors_for_ids([make_document_id(doc) for doc in documents])
+        except Exception as e:
+            print(f"⚠️ No se pudieron leer los embeddings guardados: {e}")
+            return [None] * len(documents)
+        return [found.get(make_document_id(doc)) for doc in documents]
+
+    def _vectors_for_ids(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        """Vectores guardados por id; los backends que no los exponen devuelven {}"""
+        return {}
+
+    def _invalidate_query_cache(self):
+        """Avanza la generación tras una escritura para descartar resultados cacheados"""
+        self._generation += 1
+        if self._query_cache is not None:
+            self._query_cache.clear()
+
+    def get_query_cache_stats(self) -> Dict[str, Any]:
+        """Aciertos, fallos y tamaño de la caché de consultas"""
+        if self._query_cache is None:
+            return {"enabled": False, "generation": self._generation}
+        return {"enabled": True, "generation": self._generation, **self._query_cache.get_stats()}
+
+    def add_documents(self, documents: List[Document]):
+        """Agrega documentos con ids deterministas, en lotes y omitiendo los que no cambiaron"""
+        pending: Dict[str, Document] = {}
+        for doc in documents:
+            doc_id = make_document_id(doc)
+            if not self.catalog.is_current(doc_id, doc.metadata):
+                pending[doc_id] = doc
+
+        skipped = len(documents) - len(pending)
+        if not pending:
+            if skipped:
+                print(f" {skipped} documentos sin cambios, nada que agregar")
+            return
+
+        ids, docs = list(pending), list(pending.values())
+        batch_size = max(1, settings.INGEST_BATCH_SIZE)
+        added = 0
+        try:
+            for start in range(0, len(ids), batch_size):
+                self._upsert_batch(ids[start:start + batch_size], docs[start:start + batch_size])
+                added += len(ids[start:start + batch_size])
+        except Exception as e:
+            print(f"❌ Error agregando documentos: {e}")
+
+        if added:
+            try:
+                self._commit()
+            except Exception as e:
+                print(f"❌ Error persistiendo documentos: {e}")
+            self._invalidate_query_cache()
+            print(f" {added} documentos agregados" + (f" ({skipped} sin cambios)" if skipped else ""))
+
+    @abstractmethod
+    def _upsert_batch(self, ids: List[str], documents: List[Document]):
+        """Inserta o reemplaza un lote de documentos y registra sus metadatos en el catálogo"""
+        pass
+
+    def _commit(self):
+        """Persiste lo agregado (una vez por llamada a add_documents)"""
+        self.catalog.save()
+
+    @abstractmethod
+    def delete_documents(self, ids: List[str]):
+        """Elimina documentos por id"""
+        pass
+
+    def search_by_topic(self, topic: str, level: int = None, k: int = 5,
+                        query: Optional[str] = None) -> List[Document]:
+        """Busca documentos por tema (filtro exacto de metadatos); query opcional para ordenar"""
+        try:
+            ids = self.catalog.find_ids(topic, max_level=level)
+            # Solo hace falta el embedding si hay más candidatos que k
+            query_vector = self.embeddings.embed_query(query) if query and len(ids) > k else None
+            return self._documents_for_topic(topic, ids, level, k, query_vector)
+        except Exception as e:
+            print(f"❌ Error buscando por tema: {e}")
+            return []
+
+    async def asearch_by_topic(self, topic: str, level: int = None, k: int = 5,
+                               query: Optional[str] = None) -> List[Document]:
+        """Versión async de search_by_topic"""
+        try:
+            ids = self.catalog.find_ids(topic, max_level=level)
+            query_vector = await self.embeddings.aembed_query(query) if query and len(ids) > k else None
+            return await run_blocking(self._documents_for_topic, topic, ids, level, k, query_vector)
+        except Exception as e:
+            print(f"❌ Error buscando por tema: {e}")
+            return []
+
+    @abstractmethod
+    def _documents_for_topic(self, topic: str, ids: List[str], level: Optional[int], k: int,
+                             query_vector: Optional[List[float]] = None) -> List[Document]:
+        """Lee hasta k documentos de los ids filtrados, ordenados por similitud si hay vector"""
+        pass
+
+    @abstractmethod
+    def get_collection_stats(self) -> Dict[str, Any]:
+        """Obtiene estadísticas de la colección"""
+        pass
+
+    @abstractmethod
+    def clear_collection(self):
+        """Limpia toda la colección (usar con cuidado)"""
+        pass
+
+    def get_topics_summary(self) -> Dict[str, int]:
+        """Obtiene resumen de temas disponibles (desde el catálogo, sin embeddings)"""
+        return self.catalog.topic_counts()
+
+    def warm(self):
+        """Prepara el backend antes de atender consultas (abre conexiones, carga páginas)"""
+        pass
+
+    def close(self):
+        """Libera los recursos del backend al apagar el proceso"""
+        pass
+
+    def add_text_with_metadata(self, texts: List[str], metadatas: List[Dict[str, Any]]):
+        """Agrega textos con metadatos"""
+        documents = [
+            Document(page_content=text, metadata=metadata)
+            for text, metadata in zip(texts, metadatas)
+        ]
+        self.add_documents(documents)
+
+    def add_user_content(self, content: str, topic: str, level: int = 3, subtopic: str = "user_generated"):
+        """Permite agregar contenido generado por el usuario o sistema"""
+        document = Document(
+            page_content=content,
+            metadata={
+                "topic": topic,
+                "level": level,
+                "subtopic": subtopic,
+                "source": "user_generated"
+            }
+        )
+        self.add_documents([document])
@@ -0,0 +1,96 @@
+"""Índice invertido con puntuación BM25 para la búsqueda por palabras clave"""
+
+import math
+import heapq
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from langchain_core.documents import Document
+from utils.text_analysis import analyze
+from utils.fuzzy_match import TrigramIndex
+
+
+class BM25Index:
+    """Listas de postings término -> {documento: frecuencia}, construidas al agregar documentos.
+
+    Los términos se normalizan una sola vez al indexar con el mismo analizador que se
+    aplica a la consulta (acentos, stopwords, stemming). Con fuzzy=True los términos del
+    query que no están en el vocabulario se corrigen con un índice de trigramas.
+    """
+
+    def __init__(self, tokenizer: Callable[[str], List[str]] = analyze,
+                 k1: float = 1.5, b: float = 0.75, fuzzy: bool = True):
+        self.tokenizer = tokenizer
+        self.k1 = k1
+        self.b = b
+        self.vocabulary = TrigramIndex() if fuzzy else None
+        self.documents: List[Document] = []
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._lengths: List[int] = []
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def _document_tokens(self, doc: Document) -> List[str]:
+        """Tokens del contenido más las palabras clave de los metadatos, si las hay"""
+        tokens = self.tokenizer(doc.page_content)
+        keywords = doc.metadata.get("keywords") or []
+        if keywords:
+            tokens.extend(self.tokenizer(" ".join(keywords)))
+        return tokens
+
+    def add(self, documents: Sequence[Document]):
+        """Indexa documentos nuevos (incremental)"""
+        for doc in documents:
+            doc_idx = len(self.documents)
+            tokens = self._document_tokens(doc)
+            self.documents.append(doc)
+            self._lengths.append(len(tokens))
+            self._total_length += len(tokens)
+            for term, tf in Counter(tokens).items():
+                self._postings.setdefault(term, {})[doc_idx] = tf
+        if self.vocabulary is not None:
+            self.vocabulary.add(self._postings.keys())
+
+    def clear(self):
+        self.documents.clear()
+        self._postings.clear()
+        self._lengths.clear()
+        if self.vocabulary is not None:
+            self.vocabulary = TrigramIndex()
+        self._total_length = 0
+
+    def _idf(self, term: str) -> float:
+        df = len(self._postings.get(term, ()))
+        return math.log(1 + (len(self.documents) - df + 0.5) / (df + 0.5))
+
+    def score(self, query: str, predicate: Optional[Callable[[Document], bool]] = None) -> Dict[int, float]:
+        """Puntuaciones BM25 solo de los documentos que contienen algún término del query"""
+        if not self.documents:
+            return {}
+
+        avg_length = self._total_length / len(self.documents) or 1.0
+        terms = self.tokenizer(query)
+        if self.vocabulary is not None:
+            terms = self.vocabulary.correct_all(terms)
+
+        scores: Dict[int, float] = {}
+        for term in set(terms):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf(term)
+            for doc_idx, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_idx] / avg_length)
+                scores[doc_idx] = scores.get(doc_idx, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        if predicate is not None:
+            scores = {idx: s for idx, s in scores.items() if predicate(self.documents[idx])}
+        return scores
+
+    def search(self, query: str, k: int,
+               predicate: Optional[Callable[[Document], bool]] = None) -> List[Tuple[Document, float]]:
+        """Top-k (documento, puntuación) con un heap sobre los candidatos"""
+        scores = self.score(query, predicate)
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.documents[idx], score) for idx, score in best]
@@ -0,0 +1,158 @@
+"""Catálogo de metadatos - Conteos e índice invertido por tema y nivel, mantenidos incrementalmente"""
+
+import os
+import json
+import threading
+from collections import Counter
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+
+class MetadataCatalog:
+    """Conteos exactos de la colección, actualizados en cada alta o baja de documentos"""
+
+    VERSION = 1
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._topics: Counter = Counter()
+        self._levels: Counter = Counter()
+        self._subtopics: Counter = Counter()
+        # Índice invertido tema -> ids (dict como conjunto ordenado por inserción)
+        self._by_topic: Dict[str, Dict[str, None]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _entry(metadata: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "topic": metadata.get("topic", "unknown"),
+            "level": metadata.get("level", 3),
+            "subtopic": metadata.get("subtopic", "unknown")
+        }
+
+    def _count(self, entry: Dict[str, Any], delta: int):
+        for counter, field in ((self._topics, "topic"), (self._levels, "level"),
+                               (self._subtopics, "subtopic")):
+            counter[entry[field]] += delta
+            if counter[entry[field]] <= 0:
+                del counter[entry[field]]
+
+    def _post(self, doc_id: str, entry: Dict[str, Any]):
+        self._by_topic.setdefault(entry["topic"], {})[doc_id] = None
+
+    def _unpost(self, doc_id: str, entry: Dict[str, Any]):
+        postings = self._by_topic.get(entry["topic"])
+        if postings is not None:
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._by_topic[entry["topic"]]
+
+    def add(self, items: Iterable[Tuple[str, Dict[str, Any]]]):
+        """Registra documentos (id, metadatos); un id repetido reemplaza al anterior"""
+        with self._lock:
+            for doc_id, metadata in items:
+                previous = self._entries.get(doc_id)
+                if previous is not None:
+                    self._count(previous, -1)
+                    self._unpost(doc_id, previous)
+                entry = self._entry(metadata)
+                self._entries[doc_id] = entry
+                self._count(entry, 1)
+                self._post(doc_id, entry)
+
+    def remove(self, doc_ids: Iterable[str]):
+        """Da de baja documentos por id"""
+        with self._lock:
+            for doc_id in doc_ids:
+                entry = self._entries.pop(doc_id, None)
+                if entry is not None:
+                    self._count(entry, -1)
+                    self._unpost(doc_id, entry)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._topics.clear()
+            self._levels.clear()
+            self._subtopics.clear()
+            self._by_topic.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._entries
+
+    def is_current(self, doc_id: str, metadata: Dict[str, Any]) -> bool:
+        """True si el id ya está registrado con los mismos metadatos"""
+        return self._entries.get(doc_id) == self._entry(metadata)
+
+    def topic_counts(self) -> Dict[str, int]:
+        return dict(self._topics)
+
+    def level_counts(self) -> Dict[int, int]:
+        return dict(sorted(self._levels.items()))
+
+    def subtopic_counts(self) -> Dict[str, int]:
+        return dict(self._subtopics)
+
+    def match_topics(self, topic: str) -> List[str]:
+        """Temas del catálogo que contienen al pedido o están contenidos en él"""
+        wanted = topic.lower()
+        return [
+            name for name in self._by_topic
+            if wanted in str(name).lower() or str(name).lower() in wanted
+        ]
+
+    def find_ids(self, topic: str, max_level: Optional[int] = None) -> List[str]:
+        """Ids del tema con nivel <= max_level, los de nivel más cercano primero"""
+        with self._lock:
+            ids = [
+                doc_id
+                for name in self.match_topics(topic)
+                for doc_id in self._by_topic[name]
+                if max_level is None or self._entries[doc_id]["level"] <= max_level
+            ]
+            if max_level is not None:
+                ids.sort(key=lambda doc_id: -self._entries[doc_id]["level"])
+        return ids
+
+    def get_summary(self) -> Dict[str, Any]:
+        """Resumen completo para estadísticas"""
+        return {
+            "count": len(self._entries),
+            "topics": self.topic_counts(),
+            "levels": self.level_counts(),
+            "subtopics": self.subtopic_counts()
+        }
+
+    def save(self):
+        """Persiste el catálogo junto al índice (escritura atómica)"""
+        if not self.path:
+            return
+        with self._lock:
+            payload = {"version": self.VERSION, "entries": self._entries}
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+    def load(self) -> bool:
+        """Carga el catálogo persistido; False si no existe o es de otra versión"""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if payload.get("version") != self.VERSION:
+            return False
+
+        self.clear()
+        self.add(payload.get("entries", {}).items())
+        return True
+
+    def delete_file(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,133 @@
+"""Circuit breaker para las llamadas de embeddings - Cae a palabras clave sin esperar a la red"""
+
+import time
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class CircuitOpenError(Exception):
+    """El circuito está abierto: no se intenta la llamada"""
+    pass
+
+
+class CircuitBreaker:
+    """Estados: closed (normal) -> open (tras N fallos) -> half_open (una prueba tras el enfriamiento)"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0,
+                 call_timeout: Optional[float] = None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.call_timeout = call_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """True si la llamada puede intentarse; en half_open deja pasar una sola prueba"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def is_available(self) -> bool:
+        """Consulta sin efectos: True si una llamada se intentaría ahora (no reserva la prueba half-open)"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                return time.monotonic() - self.opened_at >= self.reset_timeout
+            return not self._probe_in_flight
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                print(f"✅ Circuito '{self.name}' cerrado: el servicio respondió")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(f"⚠️ Circuito '{self.name}' abierto tras {self.failures} fallos")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def trip(self):
+        """Abre el circuito de inmediato (p. ej. si falla la prueba de arranque)"""
+        with self._lock:
+            self.failures = max(self.failures, self.failure_threshold)
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    async def call(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Ejecuta una corrutina con timeout, contando éxitos y fallos"""
+        if not self.allow_request():
+            raise CircuitOpenError(f"Circuito '{self.name}' abierto")
+        try:
+            if self.call_timeout:
+                result = await asyncio.wait_for(func(*args, **kwargs), timeout=self.call_timeout)
+            else:
+                result = await func(*args, **kwargs)
+        except (Exception, asyncio.CancelledError):
+            # Una cancelación externa (presupuesto agotado) también indica lentitud
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    def call_sync(self, func: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Versión sincrónica; con timeout la llamada corre en un hilo y se deja de esperar al vencer
+        (el hilo termina por su cuenta). Sin timeout manda el del cliente."""
+        if not self.allow_request():
+            raise CircuitOpenError(f"Circuito '{self.name}' abierto")
+        try:
+            if timeout:
+                result = self._run_with_timeout(func, args, kwargs, timeout)
+            else:
+                result = func(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    def _run_with_timeout(self, func: Callable[..., Any], args: tuple, kwargs: dict, timeout: float) -> Any:
+        outcome = {}
+
+        def target():
+            try:
+                outcome["result"] = func(*args, **kwargs)
+            except BaseException as e:
+                outcome["error"] = e
+
+        worker = threading.Thread(target=target, daemon=True)
+        worker.start()
+        worker.join(timeout)
+        if worker.is_alive():
+            raise TimeoutError(f"Circuito '{self.name}': sin respuesta en {timeout} s")
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["result"]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"name": self.name, "state": self.state, "failures": self.failures}
@@ -0,0 +1,112 @@
+"""Compresión extractiva del contexto recuperado - Alternativa local al resumen con el LLM.
+
+Se parte el contenido en oraciones, se puntúan contra la consulta (BM25 o similitud de
+embeddings) y se conservan las mejores dentro de un presupuesto de tokens. Las oraciones
+se eligen completas, así que las fórmulas nunca se cortan.
+"""
+
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from config.settings import settings
+from .bm25 import BM25Index
+from .similarity import normalize_rows
+from utils.llm_scheduler import estimate_tokens
+
+# Fórmulas LaTeX que no se deben partir aunque contengan puntos o saltos de línea
+_PROTECTED = re.compile(r"\$\$.+?\$\$|\$[^$\n]+\$|\\\[.+?\\\]|\\\(.+?\\\)", re.S)
+# Fin de oración: signo final tras algo que no sea un dígito ("1. Suma" y "3.5" no cortan)
+_BOUNDARY = re.compile(r"(?<=[^\d\s][.!?])\s+(?=[¿¡(\"'A-ZÁÉÍÓÚÑ])")
+_PLACEHOLDER = re.compile(r"\x00(\d+)\x00")
+
+
+def split_sentences(text: str) -> List[str]:
+    """Oraciones del texto: una por línea y, dentro de cada línea, por signo final"""
+    spans: List[str] = []
+
+    def protect(match):
+        spans.append(match.group(0))
+        return f"\x00{len(spans) - 1}\x00"
+
+    masked = _PROTECTED.sub(protect, text)
+    sentences = []
+    for line in masked.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        for sentence in _BOUNDARY.split(line):
+            sentence = _PLACEHOLDER.sub(lambda m: spans[int(m.group(1))], sentence.strip())
+            if sentence:
+                sentences.append(sentence)
+    return sentences
+
+
+class ExtractiveCompressor:
+    """Selecciona las oraciones más relevantes de los documentos dentro de max_tokens"""
+
+    def __init__(self, max_tokens: int = None, scorer: str = None,
+                 embeddings: Optional[Embeddings] = None):
+        self.max_tokens = max_tokens or settings.CONTEXT_MAX_TOKENS
+        self.scorer = scorer or settings.CONTEXT_COMPRESSION_SCORER
+        self.embeddings = embeddings
+
+    def _sentences(self, documents: Sequence[Document]) -> List[Tuple[int, int, str]]:
+        """(documento, posición, oración) en el orden de relevancia de los documentos"""
+        return [
+            (doc_idx, position, sentence)
+            for doc_idx, doc in enumerate(documents)
+            for position, sentence in enumerate(split_sentences(doc.page_content))
+        ]
+
+    def _bm25_scores(self, query: str, sentences: List[str]) -> List[float]:
+        index = BM25Index(fuzzy=False)
+        index.add([Document(page_content=sentence) for sentence in sentences])
+        scores = index.score(query)
+        return [scores.get(i, 0.0) for i in range(len(sentences))]
+
+    @staticmethod
+    def _cosine_scores(query_vector, sentence_vectors) -> List[float]:
+        query = normalize_rows(np.asarray([query_vector]))[0]
+        return (normalize_rows(np.asarray(sentence_vectors)) @ query).tolist()
+
+    def _select(self, units: List[Tuple[int, int, str]], scores: List[float]) -> str:
+        """Greedy por puntuación dentro del presupuesto; se devuelve en el orden original"""
+        ranked = sorted(range(len(units)), key=lambda i: (-scores[i], units[i][0], units[i][1]))
+        chosen, used = [], 0
+        for i in ranked:
+            cost = estimate_tokens(units[i][2])
+            if chosen and used + cost > self.max_tokens:
+                continue
+            chosen.append(i)
+            used += cost
+
+        by_document: Dict[int, List[str]] = {}
+        for i in sorted(chosen, key=lambda i: (units[i][0], units[i][1])):
+            by_document.setdefault(units[i][0], []).append(units[i][2])
+        return "\n\n".join("\n".join(sentences) for sentences in by_document.values())
+
+    def compress(self, query: str, documents: Sequence[Document]) -> str:
+        """Compresión sincrónica con puntuación BM25"""
+        units = self._sentences(documents)
+        if not units:
+            return ""
+        return self._select(units, self._bm25_scores(query, [u[2] for u in units]))
+
+    async def acompress(self, query: str, documents: Sequence[Document]) -> str:
+        """Con scorer="embedding" usa la similitud con la consulta (los embeddings pasan por la caché)"""
+        units = self._sentences(documents)
+        if not units:
+            return ""
+        sentences = [u[2] for u in units]
+
+        if self.scorer == "embedding" and self.embeddings is not None:
+            try:
+                query_vector = await self.embeddings.aembed_query(query)
+                sentence_vectors = await self.embeddings.aembed_documents(sentences)
+                return self._select(units, self._cosine_scores(query_vector, sentence_vectors))
+            except Exception as e:
+                print(f"⚠️ Compresión por embeddings no disponible, usando BM25: {e}")
+
+        return self._select(units, self._bm25_scores(query, sentences))
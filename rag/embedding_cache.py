@@ -0,0 +1,297 @@
+"""Caché persistente de embeddings - Direccionada por contenido sobre SQLite"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from typing import List, Dict, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from config.settings import settings
+from utils.async_pool import run_blocking
+from utils.llm_scheduler import BACKGROUND, INTERACTIVE, LLMScheduler, estimate_tokens, get_llm_scheduler
+
+
+def normalize_text(text: str) -> str:
+    """Normaliza el texto para que variaciones de espacios no generen claves distintas"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def make_cache_key(model: str, text: str) -> str:
+    """Clave de caché: hash del modelo y del texto normalizado"""
+    payload = f"{model}\x00{normalize_text(text)}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+class EmbeddingCache:
+    """Almacén SQLite de embeddings float32 con expulsión LRU por tamaño.
+
+    Los aciertos no escriben en disco: el último acceso se acumula en memoria y se vuelca
+    en un solo executemany al guardar (antes de expulsar), al cerrar o al juntar
+    ACCESS_FLUSH_BATCH claves pendientes.
+    """
+
+    ACCESS_FLUSH_BATCH = 256
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._pending_access: Dict[str, float] = {}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access)"
+        )
+        self._conn.commit()
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM embeddings"
+        ).fetchone()[0]
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Recupera los embeddings existentes y anota su último acceso (sin escribir todavía)"""
+        if not keys:
+            return {}
+
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            # SQLite limita el número de parámetros por consulta
+            for start in range(0, len(unique_keys), 500):
+                chunk = unique_keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+            now = time.time()
+            for key in found:
+                self._pending_access[key] = now
+            if len(self._pending_access) >= self.ACCESS_FLUSH_BATCH:
+                self._flush_access()
+                self._conn.commit()
+
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+        return found
+
+    def put_many(self, model: str, items: Dict[str, List[float]]):
+        """Guarda embeddings nuevos y expulsa los menos usados si se supera el límite"""
+        if not items:
+            return
+
+        now = time.time()
+        rows = []
+        for key, vector in items.items():
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            rows.append((key, model, blob, len(blob), now))
+
+        with self._lock:
+            # La expulsión ordena por último acceso: primero se vuelcan los aciertos pendientes
+            self._flush_access()
+            # Tamaño de entradas que se reemplazan, para mantener el total exacto
+            existing = 0
+            for start in range(0, len(rows), 500):
+                chunk = [row[0] for row in rows[start:start + 500]]
+                existing += self._conn.execute(
+                    f"SELECT COALESCE(SUM(size), 0) FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchone()[0]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._total_bytes += sum(row[3] for row in rows) - existing
+            self._evict_if_needed()
+            self._conn.commit()
+
+    def _flush_access(self):
+        """Escribe los últimos accesos pendientes (quien llama tiene el lock y hace el commit)"""
+        if not self._pending_access:
+            return
+        self._conn.executemany(
+            "UPDATE embeddings SET last_access = ? WHERE key = ?",
+            [(accessed, key) for key, accessed in self._pending_access.items()]
+        )
+        self._pending_access.clear()
+
+    def _evict_if_needed(self):
+        """Elimina las entradas con acceso más antiguo hasta quedar bajo el 90% del límite"""
+        if self.max_bytes <= 0 or self._total_bytes <= self.max_bytes:
+            return
+
+        target = int(self.max_bytes * 0.9)
+        cursor = self._conn.execute("SELECT key, size FROM embeddings ORDER BY last_access ASC")
+        to_delete = []
+        for key, size in cursor:
+            if self._total_bytes <= target:
+                break
+            to_delete.append((key,))
+            self._total_bytes -= size
+
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", to_delete)
+
+    def clear(self):
+        """Vacía la caché"""
+        with self._lock:
+            self._pending_access.clear()
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._total_bytes = 0
+
+    def get_stats(self) -> Dict[str, int]:
+        """Estadísticas de uso de la caché"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {
+            "entries": entries,
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+    def close(self):
+        with self._lock:
+            self._flush_access()
+            self._conn.commit()
+            self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """Envuelve un cliente de embeddings y solo calcula los textos que no están en caché"""
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model: str):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model = model
+
+    def _split(self, texts: List[str]):
+        """Separa textos ya cacheados de los que faltan (sin duplicados)"""
+        keys = [make_cache_key(self.model, text) for text in texts]
+        found = self.cache.get_many(keys)
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        return keys, found, missing
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = self._split(texts)
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(self.model, computed)
+            found.update(computed)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        keys, found, missing = self._split([text])
+        if missing:
+            vector = self.embeddings.embed_query(text)
+            self.cache.put_many(self.model, {keys[0]: vector})
+            return vector
+        return found[keys[0]]
+
+    # En las versiones async las lecturas y escrituras de SQLite van al pool de hilos
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = await run_blocking(self._split, texts)
+        if missing:
+            vectors = await self.embeddings.aembed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            await run_blocking(self.cache.put_many, self.model, computed)
+            found.update(computed)
+        return [found[key] for key in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        keys, found, missing = await run_blocking(self._split, [text])
+        if missing:
+            vector = await self.embeddings.aembed_query(text)
+            await run_blocking(self.cache.put_many, self.model, {keys[0]: vector})
+            return vector
+        return found[keys[0]]
+
+
+class ScheduledEmbeddings(Embeddings):
+    """Pasa cada llamada al proveedor por el planificador compartido con el LLM.
+
+    Los lotes sincrónicos de documentos son la carga de contenido: van con prioridad de fondo.
+    """
+
+    def __init__(self, embeddings: Embeddings, scheduler: Optional[LLMScheduler] = None):
+        self.embeddings = embeddings
+        self.scheduler = scheduler or get_llm_scheduler()
+
+    @staticmethod
+    def _tokens(texts: List[str]) -> int:
+        return sum(estimate_tokens(text) for text in texts)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.scheduler.run_sync(self.embeddings.embed_documents, texts,
+                                       priority=BACKGROUND, tokens=self._tokens(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.scheduler.run_sync(self.embeddings.embed_query, text, tokens=self._tokens([text]))
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.scheduler.run(self.embeddings.aembed_documents, texts,
+                                        priority=INTERACTIVE, tokens=self._tokens(texts))
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.scheduler.run(self.embeddings.aembed_query, text, tokens=self._tokens([text]))
+
+
+# Una sola conexión por archivo de caché para todo el proceso
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(path: Optional[str] = None) -> EmbeddingCache:
+    """Obtiene la caché compartida para una ruta"""
+    path = os.path.abspath(path or settings.EMBEDDING_CACHE_PATH)
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = EmbeddingCache(path, settings.EMBEDDING_CACHE_MAX_BYTES)
+        return _caches[path]
+
+
+def create_embeddings(model: Optional[str] = None) -> Embeddings:
+    """Crea el cliente de embeddings de OpenAI, con caché persistente si está habilitada"""
+    from langchain_openai import OpenAIEmbeddings
+
+    model = model or settings.EMBEDDING_MODEL
+    # Los reintentos los hace el planificador (con backoff y respetando los límites compartidos)
+    embeddings = ScheduledEmbeddings(OpenAIEmbeddings(
+        model=model,
+        api_key=settings.OPENAI_API_KEY,
+        max_retries=0
+    ))
+
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return embeddings
+
+    try:
+        return CachedEmbeddings(embeddings, get_embedding_cache(), model)
+    except Exception as e:
+        print(f"⚠️ Caché de embeddings no disponible, usando cliente directo: {e}")
+        return embeddings
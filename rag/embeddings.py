@@ -1,18 +1,17 @@
 """Embedding Manager - Gestión de embeddings para RAG"""
 
-from typing import List, Dict, Any, Tuple
-from langchain_openai import OpenAIEmbeddings
+from typing import List, Dict, Any, Tuple, Optional, Union
 from config.settings import settings
+from .embedding_cache import create_embeddings
+from .similarity import SimilarityIndex, iter_similarity_blocks, similarity_statistics
 import numpy as np
 
 class EmbeddingManager:
     """Gestiona la generación y manipulación de embeddings"""
     
     def __init__(self):
-        self.embeddings = OpenAIEmbeddings(
-            model=settings.EMBEDDING_MODEL,
-            api_key=settings.OPENAI_API_KEY  # Cambio aquí también
-        )
+        # Cliente con caché persistente: textos ya vistos no vuelven a la API
+        self.embeddings = create_embeddings()
         
     async def embed_text(self, text: str) -> List[float]:
         """Genera embedding para un texto"""
@@ -54,21 +53,39 @@ class EmbeddingManager:
             print(f"❌ Error calculando similaridad: {e}")
             return 0.0
     
+    def build_index(self, embeddings: List[List[float]]) -> SimilarityIndex:
+        """Construye una matriz de candidatos normalizada reutilizable entre búsquedas"""
+        return SimilarityIndex(embeddings)
+    
     def find_most_similar(self, query_embedding: List[float], 
-                         candidate_embeddings: List[List[float]], 
-                         threshold: float = None) -> List[Tuple[int, float]]:
+                         candidate_embeddings: Union[List[List[float]], SimilarityIndex], 
+                         threshold: float = None,
+                         top_k: Optional[int] = None) -> List[Tuple[int, float]]:
         """Encuentra los embeddings más similares al query"""
+        return self.find_most_similar_batch(
+            [query_embedding], candidate_embeddings, threshold=threshold, top_k=top_k
+        )[0]
+    
+    def find_most_similar_batch(self, query_embeddings: List[List[float]],
+                                candidate_embeddings: Union[List[List[float]], SimilarityIndex],
+                                threshold: float = None,
+                                top_k: Optional[int] = None) -> List[List[Tuple[int, float]]]:
+        """Encuentra los candidatos más similares para un lote de queries con un solo producto matricial"""
         threshold = threshold or settings.SIMILARITY_THRESHOLD
         
-        similarities = []
-        for i, candidate in enumerate(candidate_embeddings):
-            similarity = self.cosine_similarity(query_embedding, candidate)
-            if similarity >= threshold:
-                similarities.append((i, similarity))
+        if not query_embeddings:
+            return []
         
-        # Ordenar por similaridad descendente
-        similarities.sort(key=lambda x: x[1], reverse=True)
-        return similarities
+        try:
+            index = candidate_embeddings
+            if not isinstance(index, SimilarityIndex):
+                index = self.build_index(candidate_embeddings)
+            
+            # Resultados ordenados por similaridad descendente
+            return index.search_batch(query_embeddings, k=top_k, threshold=threshold)
+        except Exception as e:
+            print(f"❌ Error calculando similaridad: {e}")
+            return [[] for _ in query_embeddings]
     
     async def semantic_search(self, query: str, documents: List[str], 
                             top_k: int = 5) -> List[Tuple[str, float]]:
@@ -84,47 +101,49 @@ class EmbeddingManager:
             if not doc_embeddings:
                 return []
             
-            # Encontrar más similares
-            similarities = self.find_most_similar(query_embedding, doc_embeddings)
+            # Encontrar los top_k más similares
+            similarities = self.find_most_similar(query_embedding, doc_embeddings, top_k=top_k)
             
-            # Retornar top_k resultados con documentos
-            results = []
-            for idx, score in similarities[:top_k]:
-                results.append((documents[idx], score))
-            
-            return results
+            return [(documents[idx], score) for idx, score in similarities]
             
         except Exception as e:
             print(f"❌ Error en búsqueda semántica: {e}")
             return []
     
-    def analyze_embedding_quality(self, embeddings: List[List[float]]) -> Dict[str, Any]:
+    def analyze_embedding_quality(self, embeddings: List[List[float]],
+                                  sample_pairs: Optional[int] = None) -> Dict[str, Any]:
         """Analiza la calidad de los embeddings"""
-        if not embeddings:
+        if embeddings is None or len(embeddings) == 0:
             return {"status": "no_embeddings"}
         
         try:
             # Convertir a numpy array
-            emb_array = np.array(embeddings)
+            emb_array = np.asarray(embeddings, dtype=np.float32)
+            norms = np.linalg.norm(emb_array, axis=1)
             
             # Estadísticas básicas
             stats = {
-                "count": len(embeddings),
-                "dimension": len(embeddings[0]) if embeddings else 0,
-                "mean_norm": np.mean([np.linalg.norm(emb) for emb in embeddings]),
-                "std_norm": np.std([np.linalg.norm(emb) for emb in embeddings]),
+                "count": emb_array.shape[0],
+                "dimension": emb_array.shape[1],
+                "mean_norm": float(norms.mean()),
+                "std_norm": float(norms.std()),
             }
             
-            # Diversidad (distancia promedio entre embeddings)
-            if len(embeddings) > 1:
-                similarities = []
-                for i in range(len(embeddings)):
-                    for j in range(i+1, len(embeddings)):
-                        sim = self.cosine_similarity(embeddings[i], embeddings[j])
-                        similarities.append(sim)
+            # Diversidad (distancia promedio entre embeddings), por bloques o por muestreo
+            if emb_array.shape[0] > 1:
+                if sample_pairs is None and emb_array.shape[0] > settings.EMBEDDING_QUALITY_EXACT_LIMIT:
+                    sample_pairs = settings.EMBEDDING_QUALITY_SAMPLE_PAIRS
                 
-                stats["avg_similarity"] = np.mean(similarities)
-                stats["diversity_score"] = 1 - np.mean(similarities)  # Más diverso = menos similar
+                similarity_stats = similarity_statistics(
+                    emb_array,
+                    block_size=settings.SIMILARITY_BLOCK_SIZE,
+                    sample_pairs=sample_pairs
+                )
+                stats["avg_similarity"] = similarity_stats["mean"]
+                stats["std_similarity"] = similarity_stats["std"]
+                stats["diversity_score"] = 1 - similarity_stats["mean"]  # Más diverso = menos similar
+                stats["similarity_method"] = similarity_stats["method"]
+                stats["pairs_evaluated"] = similarity_stats["pairs"]
             
             return stats
             
@@ -153,16 +172,20 @@ class EmbeddingManager:
         
         return await self.embed_text(enriched_text)
     
-    def batch_similarity_matrix(self, embeddings: List[List[float]]) -> List[List[float]]:
-        """Calcula matriz de similaridad para un conjunto de embeddings"""
+    def batch_similarity_matrix(self, embeddings: List[List[float]], as_list: bool = False,
+                                out: Optional[np.ndarray] = None) -> Union[np.ndarray, List[List[float]]]:
+        """Matriz de similaridad float32 armada bloque a bloque con iter_similarity_blocks.
+        
+        Además del resultado solo vive un bloque a la vez; con out (p. ej. un np.memmap de n×n)
+        ni el resultado queda en RAM. as_list=True devuelve listas, el formato anterior.
+        """
         n = len(embeddings)
-        similarity_matrix = [[0.0 for _ in range(n)] for _ in range(n)]
+        similarity_matrix = np.empty((n, n), dtype=np.float32) if out is None else out
         
-        for i in range(n):
-            for j in range(n):
-                if i == j:
-                    similarity_matrix[i][j] = 1.0
-                else:
-                    similarity_matrix[i][j] = self.cosine_similarity(embeddings[i], embeddings[j])
+        for row_start, col_start, block in iter_similarity_blocks(
+                embeddings, block_size=settings.SIMILARITY_BLOCK_SIZE):
+            similarity_matrix[row_start:row_start + block.shape[0],
+                              col_start:col_start + block.shape[1]] = block
+        np.fill_diagonal(similarity_matrix, 1.0)
         
-        return similarity_matrix
\ No newline at end of file
+        return similarity_matrix.tolist() if as_list else similarity_matrix
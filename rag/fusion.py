@@ -0,0 +1,35 @@
+"""Fusión de rankings (Reciprocal Rank Fusion) para combinar búsqueda vectorial y por palabras clave"""
+
+from typing import Dict, List, Sequence
+from langchain_core.documents import Document
+
+
+def content_key(doc: Document) -> str:
+    """Clave de deduplicación: el contenido con espacios normalizados"""
+    return " ".join(doc.page_content.split())
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Document]], k: int = 60,
+                           top_n: int = None) -> List[Document]:
+    """Combina varias listas ordenadas: cada documento suma 1 / (k + posición) por lista.
+
+    Los duplicados (mismo contenido) se fusionan en una sola entrada y se conserva la
+    primera instancia vista, así que el orden de las listas decide qué metadatos se devuelven.
+    """
+    scores: Dict[str, float] = {}
+    first_seen: Dict[str, Document] = {}
+
+    for ranking in rankings:
+        seen_in_ranking = set()
+        for rank, doc in enumerate(ranking, start=1):
+            key = content_key(doc)
+            if key in seen_in_ranking:
+                continue
+            seen_in_ranking.add(key)
+            first_seen.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+
+    ordered = sorted(scores, key=scores.get, reverse=True)
+    if top_n is not None:
+        ordered = ordered[:top_n]
+    return [first_seen[key] for key in ordered]
@@ -1,17 +1,36 @@
 """RAG Híbrido - Funciona con o sin embeddings"""
 
+import asyncio
+import threading
 from typing import List, Dict, Any, Optional
 from langchain_core.documents import Document
 from config.settings import settings
+from utils.async_pool import run_blocking
+from .bm25 import BM25Index
+from .fusion import reciprocal_rank_fusion
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .seed_content import get_initial_documents
 
 class HybridRAGManager:
     """RAG que funciona con embeddings cuando está disponible, sino usa búsqueda simple"""
     
     def __init__(self):
-        self.documents = []
+        # Corpus de palabras clave (documentos, índice BM25) publicado como una sola tupla:
+        # quien lee toma ambos de la misma generación. Las escrituras se serializan con el lock
+        # porque el hilo de la prueba también puede reemplazarlo.
+        self._corpus_lock = threading.RLock()
+        self._corpus = ([], BM25Index())
         self.use_embeddings = False
         self.vector_store = None
         self.embeddings = None
+        # Protege cada llamada de embeddings: si el servicio falla, las consultas caen a BM25
+        self.embedding_breaker = CircuitBreaker(
+            "embeddings",
+            failure_threshold=settings.EMBEDDING_BREAKER_FAILURES,
+            reset_timeout=settings.EMBEDDING_BREAKER_RESET_SECONDS,
+            call_timeout=settings.EMBEDDING_TIMEOUT_SECONDS
+        )
+        self._probe_thread = None
         
         # Intentar cargar sistema completo
         self._try_initialize_full_rag()
@@ -19,13 +38,38 @@ class HybridRAGManager:
         # Si falla, usar versión simple
         if not self.use_embeddings:
             print("⚠️ Usando RAG simple sin embeddings")
+        
+        # Las palabras clave funcionan desde el arranque, aunque los embeddings no estén listos.
+        # El índice de respaldo se arma antes de lanzar la prueba, que puede reemplazarlo.
+        if not self.documents:
             self._add_initial_content()
+        
+        if self.use_embeddings:
+            # La prueba de conectividad (y la carga inicial, que también calcula embeddings)
+            # corre en segundo plano: el arranque nunca espera a la red
+            self._probe_thread = threading.Thread(target=self._probe_embeddings, daemon=True)
+            self._probe_thread.start()
+    
+    @property
+    def documents(self) -> List[Document]:
+        return self._corpus[0]
+    
+    @property
+    def keyword_index(self) -> BM25Index:
+        return self._corpus[1]
+    
+    def _publish_corpus(self, documents: List[Document]):
+        """Indexa los documentos aparte y los publica junto con su índice en una sola asignación"""
+        keyword_index = BM25Index()
+        keyword_index.add(documents)
+        with self._corpus_lock:
+            self._corpus = (list(documents), keyword_index)
     
     def _try_initialize_full_rag(self):
         """Intenta inicializar el sistema RAG completo"""
         try:
-            from langchain_openai import OpenAIEmbeddings
             from langchain_community.vectorstores import Chroma
+            from .embedding_cache import create_embeddings
             import os
             
             # Verificar API key más estrictamente
@@ -38,10 +82,8 @@ class HybridRAGManager:
             # Configurar variable de entorno para OpenAI (AQUÍ ES DONDE VA)
             os.environ["OPENAI_API_KEY"] = settings.OPENAI_API_KEY
             
-            # Inicializar embeddings SIN parámetros adicionales
-            self.embeddings = OpenAIEmbeddings(
-                model=settings.EMBEDDING_MODEL
-            )
+            # Inicializar embeddings (con caché persistente)
+            self.embeddings = create_embeddings()
             
             # Crear directorio si no existe
             os.makedirs(settings.CHROMA_PERSIST_DIRECTORY, exist_ok=True)
@@ -51,90 +93,65 @@ class HybridRAGManager:
                 embedding_function=self.embeddings
             )
             
-            # Probar embedding simple para verificar conectividad
-            print("🧪 Probando conectividad con OpenAI...")
-            test_embedding = self.embeddings.embed_query("test")
-            print(f"✅ Conectividad OK - embedding dimensión: {len(test_embedding)}")
-            
             self.use_embeddings = True
             print("✅ RAG completo con embeddings inicializado")
             
-            # Agregar contenido inicial si la base está vacía
-            if self.vector_store._collection.count() == 0:
-                print("📚 Base vectorial vacía, agregando contenido inicial...")
-                self._add_initial_content_to_vectorstore()
-            else:
+            # El modo fused necesita el mismo corpus en el índice BM25
+            if self.vector_store._collection.count() > 0:
                 print(f"📚 Base vectorial existente con {self.vector_store._collection.count()} documentos")
+                self._load_keyword_index_from_vectorstore()
             
         except Exception as e:
             print(f"⚠️ No se pudo inicializar RAG completo: {e}")
             self.use_embeddings = False
+    
+    def _probe_embeddings(self):
+        """Prueba de conectividad en segundo plano; si falla, abre el circuito"""
+        try:
+            print("🧪 Probando conectividad con OpenAI...")
+            # Cliente sin caché: un vector cacheado no prueba la conectividad
+            client = getattr(self.embeddings, "embeddings", self.embeddings)
+            test_embedding = self.embedding_breaker.call_sync(
+                client.embed_query, "test", timeout=settings.EMBEDDING_TIMEOUT_SECONDS
+            )
+            print(f"✅ Conectividad OK - embedding dimensión: {len(test_embedding)}")
+            
+            # Agregar contenido inicial si la base está vacía (con el lock: un add_documents
+            # concurrente no puede quedar fuera del corpus que se publica)
+            with self._corpus_lock:
+                if self.vector_store._collection.count() == 0:
+                    print("📚 Base vectorial vacía, agregando contenido inicial...")
+                    self._add_initial_content_to_vectorstore()
+                    self._load_keyword_index_from_vectorstore()
+        except Exception as e:
+            print(f"⚠️ Prueba de embeddings fallida, se usarán palabras clave: {e}")
+            self.embedding_breaker.trip()
 
-    def _add_initial_content_to_vectorstore(self):
-        """Agrega contenido inicial a la base vectorial"""
+    def _load_keyword_index_from_vectorstore(self):
+        """Indexa en BM25 los documentos que ya están en Chroma"""
+        data = self.vector_store.get(include=["documents", "metadatas"])
         documents = [
-            Document(
-                page_content="""
-                Un vector es una cantidad que tiene tanto magnitud como dirección. 
-                En el plano cartesiano, un vector se puede representar como un par ordenado (x, y).
-                La magnitud de un vector v = (x, y) se calcula como ||v|| = √(x² + y²).
-                Los vectores se pueden sumar componente a componente: (a, b) + (c, d) = (a+c, b+d).
-                """,
-                metadata={"topic": "vectores", "level": 1, "subtopic": "definicion_basica"}
-            ),
-            
-            Document(
-                page_content="""
-                Las operaciones básicas con vectores incluyen:
-                1. Suma: u + v = (u₁ + v₁, u₂ + v₂)
-                2. Resta: u - v = (u₁ - v₁, u₂ - v₂)  
-                3. Multiplicación por escalar: k·v = (k·v₁, k·v₂)
-                4. Producto punto: u·v = u₁v₁ + u₂v₂
-                El producto punto da como resultado un escalar, no un vector.
-                """,
-                metadata={"topic": "vectores", "level": 2, "subtopic": "operaciones"}
-            ),
-            
-            Document(
-                page_content="""
-                El producto punto (o producto escalar) entre dos vectores u = (u₁, u₂) y v = (v₁, v₂) 
-                se define como u·v = u₁v₁ + u₂v₂ = ||u|| ||v|| cos(θ), donde θ es el ángulo entre los vectores.
-                Si el producto punto es cero, los vectores son perpendiculares (ortogonales).
-                Si es positivo, el ángulo es agudo; si es negativo, el ángulo es obtuso.
-                """,
-                metadata={"topic": "producto_punto", "level": 3, "subtopic": "definicion"}
-            ),
-            
-            Document(
-                page_content="""
-                Una matriz es un arreglo rectangular de números organizados en filas y columnas.
-                Una matriz de m×n tiene m filas y n columnas. Las operaciones básicas incluyen:
-                - Suma de matrices (del mismo tamaño): se suman elemento a elemento
-                - Multiplicación por escalar: se multiplica cada elemento por el escalar
-                - Multiplicación de matrices: el elemento (i,j) es el producto punto de la fila i por la columna j
-                """,
-                metadata={"topic": "matrices", "level": 2, "subtopic": "definicion_operaciones"}
-            ),
-            
-            Document(
-                page_content="""
-                Un sistema de ecuaciones lineales se puede escribir en forma matricial como Ax = b,
-                donde A es la matriz de coeficientes, x es el vector de incógnitas, y b es el vector de términos independientes.
-                Los métodos de solución incluyen: eliminación gaussiana, regla de Cramer, y factorización LU.
-                Un sistema puede tener solución única, infinitas soluciones, o no tener solución.
-                """,
-                metadata={"topic": "sistemas_lineales", "level": 3, "subtopic": "forma_matricial"}
-            )
+            Document(page_content=content, metadata=metadata or {})
+            for content, metadata in zip(data["documents"], data["metadatas"])
         ]
+        # Se construye aparte y se reemplaza de una vez: puede correr en el hilo de la prueba
+        self._publish_corpus(documents)
+
+    def _add_initial_content_to_vectorstore(self):
+        """Agrega contenido inicial a la base vectorial"""
+        documents = get_initial_documents()
         
         # Agregar a la base vectorial
         self.vector_store.add_documents(documents)
-        self.vector_store.persist()
+        try:
+            self.vector_store.persist()
+        except Exception:
+            pass  # persist() puede no estar disponible en todas las versiones
         print(f"✅ {len(documents)} documentos agregados a la base vectorial")
     
     def _add_initial_content(self):
         """Agrega contenido inicial para versión simple"""
-        self.documents = [
+        documents = [
             Document(
                 page_content="""
                 VECTORES BÁSICOS: Un vector es una cantidad que tiene magnitud y dirección. 
@@ -188,57 +205,76 @@ class HybridRAGManager:
                 metadata={"topic": "sistemas_lineales", "level": 3, "keywords": ["sistema", "ecuaciones", "eliminación", "gaussiana", "cramer", "solución"]}
             )
         ]
-        print(f"✅ RAG simple inicializado con {len(self.documents)} documentos")
+        self._publish_corpus(documents)
+        print(f"✅ RAG simple inicializado con {len(documents)} documentos")
     
     async def similarity_search(self, query: str, k: int = 3, filter_level: int = None) -> List[Document]:
         """Búsqueda que funciona con o sin embeddings"""
         
-        if self.use_embeddings and self.vector_store:
+        # Con el circuito abierto no se intenta la rama vectorial: fallback inmediato
+        if self.use_embeddings and self.vector_store and self._embeddings_available():
+            if settings.HYBRID_RETRIEVAL_MODE == "fused":
+                return await self._fused_search(query, k, filter_level)
+            
             # Usar búsqueda vectorial
             try:
-                filter_dict = {}
-                if filter_level:
-                    filter_dict = {"level": {"$lte": filter_level}}
-                
-                results = self.vector_store.similarity_search(
-                    query, k=k, filter=filter_dict if filter_dict else None
-                )
-                return results
+                return await self._vector_search(query, k, filter_level)
             except Exception as e:
                 print(f"⚠️ Error en búsqueda vectorial, usando búsqueda simple: {e}")
         
         # Búsqueda simple por palabras clave
         return self._simple_keyword_search(query, k, filter_level)
     
-    def _simple_keyword_search(self, query: str, k: int, filter_level: int = None) -> List[Document]:
-        """Búsqueda simple por palabras clave"""
-        query_words = query.lower().split()
-        results = []
+    def _embeddings_available(self) -> bool:
+        """False mientras el circuito esté abierto (antes de que toque la prueba half-open)"""
+        return self.embedding_breaker.is_available()
+    
+    async def _vector_search(self, query: str, k: int, filter_level: int = None) -> List[Document]:
+        """Búsqueda vectorial en Chroma sin bloquear el event loop"""
+        filter_dict = {"level": {"$lte": filter_level}} if filter_level else None
         
-        for doc in self.documents:
-            score = 0
-            content_lower = doc.page_content.lower()
-            keywords = doc.metadata.get("keywords", [])
-            
-            # Puntuación por palabras en el contenido
-            for word in query_words:
-                if word in content_lower:
-                    score += 2
-                if word in keywords:
-                    score += 3
-            
-            # Filtrar por nivel
-            if filter_level:
-                doc_level = doc.metadata.get("level", 3)
-                if doc_level > filter_level:
-                    continue
-            
-            if score > 0:
-                results.append((doc, score))
+        # Embedding con el cliente async; la consulta a Chroma (SQLite) va al pool de hilos
+        query_vector = await self.embedding_breaker.call(self.embeddings.aembed_query, query)
+        return await run_blocking(
+            self.vector_store.similarity_search_by_vector, query_vector, k=k, filter=filter_dict
+        )
+    
+    async def _fused_search(self, query: str, k: int, filter_level: int = None) -> List[Document]:
+        """Vector y BM25 en paralelo, combinados con RRF; la rama vectorial tiene presupuesto de tiempo"""
+        budget = settings.HYBRID_VECTOR_BUDGET_MS / 1000
+        fetch_k = k * 2
+        
+        # gather espera ambas ramas aunque una falle: ninguna tarea queda colgando.
+        # El presupuesto aplica solo a la vectorial; al vencer, wait_for la cancela.
+        vector_result, keyword_result = await asyncio.gather(
+            asyncio.wait_for(self._vector_search(query, fetch_k, filter_level), timeout=budget),
+            run_blocking(self._simple_keyword_search, query, fetch_k, filter_level),
+            return_exceptions=True
+        )
+        
+        if isinstance(vector_result, asyncio.TimeoutError):
+            print(f"⚠️ Búsqueda vectorial cancelada al superar {settings.HYBRID_VECTOR_BUDGET_MS} ms, "
+                  "usando solo palabras clave")
+            vector_result = []
+        elif isinstance(vector_result, CircuitOpenError):
+            vector_result = []
+        elif isinstance(vector_result, BaseException):
+            print(f"⚠️ Error en búsqueda vectorial, usando solo palabras clave: {vector_result}")
+            vector_result = []
         
-        # Ordenar por score y retornar top k
-        results.sort(key=lambda x: x[1], reverse=True)
-        return [doc for doc, score in results[:k]]
+        if isinstance(keyword_result, BaseException):
+            print(f"⚠️ Error en búsqueda por palabras clave, usando solo la vectorial: {keyword_result}")
+            keyword_result = []
+        
+        return reciprocal_rank_fusion([vector_result, keyword_result], k=settings.RRF_K, top_n=k)
+    
+    def _simple_keyword_search(self, query: str, k: int, filter_level: int = None) -> List[Document]:
+        """Búsqueda por palabras clave con BM25 sobre el índice invertido"""
+        predicate = None
+        if filter_level:
+            predicate = lambda doc: doc.metadata.get("level", 3) <= filter_level
+        _, keyword_index = self._corpus
+        return [doc for doc, _ in keyword_index.search(query, k, predicate)]
     
     def search_by_topic(self, topic: str, level: int = None, k: int = 5) -> List[Document]:
         """Busca por tema específico"""
@@ -259,8 +295,9 @@ class HybridRAGManager:
                 count = self.vector_store._collection.count()
                 return {
                     "count": count,
-                    "status": "embeddings_active",
-                    "type": "full_rag"
+                    "status": "embeddings_active" if self._embeddings_available() else "keyword_fallback",
+                    "type": "full_rag",
+                    "embedding_breaker": self.embedding_breaker.get_stats()
                 }
             except:
                 pass
@@ -274,14 +311,16 @@ class HybridRAGManager:
     
     def add_documents(self, documents: List[Document]):
         """Agrega documentos al sistema"""
-        if self.use_embeddings and self.vector_store:
-            try:
-                self.vector_store.add_documents(documents)
-                print(f"✅ {len(documents)} documentos agregados al vector store")
-                return
-            except Exception as e:
-                print(f"⚠️ Error agregando a vector store: {e}")
-        
-        # Agregar a lista simple
-        self.documents.extend(documents)
-        print(f"✅ {len(documents)} documentos agregados a la lista simple")
\ No newline at end of file
+        with self._corpus_lock:
+            if self.use_embeddings and self.vector_store:
+                try:
+                    self.vector_store.add_documents(documents)
+                    self._publish_corpus(self.documents + list(documents))
+                    print(f"✅ {len(documents)} documentos agregados al vector store")
+                    return
+                except Exception as e:
+                    print(f"⚠️ Error agregando a vector store: {e}")
+            
+            # Agregar a lista simple
+            self._publish_corpus(self.documents + list(documents))
+            print(f"✅ {len(documents)} documentos agregados a la lista simple")
\ No newline at end of file
@@ -0,0 +1,184 @@
+"""Formato de índice en disco mapeable en memoria (zero-copy) para arranque rápido.
+
+Estructura del archivo (little-endian):
+
+    [cabecera fija de 128 bytes]
+    [matriz count × dim en float32 o float16]       alineada a 64 bytes
+    [niveles: count × int16]                        columna para filtros por nivel
+    [tabla de ids: (count + 1) offsets uint64 + bytes UTF-8]
+    [metadatos: (count + 1) offsets uint64 + un JSON por documento]
+
+La matriz se abre con np.memmap en solo lectura: varios procesos comparten las mismas
+páginas del sistema operativo y los documentos se decodifican solo cuando se piden.
+"""
+
+import os
+import json
+import struct
+from collections.abc import Sequence
+from typing import List, Dict, Optional
+import numpy as np
+from langchain_core.documents import Document
+
+MAGIC = b"VMIDX\x00\x00\x00"
+FORMAT_VERSION = 1
+HEADER_SIZE = 128
+ALIGNMENT = 64
+
+# magic, versión, código dtype, count, dim, offsets de matriz/niveles/ids/metadatos, fin
+_HEADER_STRUCT = struct.Struct("<8sIIQIQQQQQ")
+
+_DTYPE_CODES = {1: np.float32, 2: np.float16}
+_DTYPE_NAMES = {"float32": 1, "float16": 2}
+
+
+class IndexFormatError(Exception):
+    """El archivo no es un índice válido o su versión no está soportada"""
+    pass
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _encode_table(items: List[bytes]) -> bytes:
+    """Tabla de offsets (count + 1) seguida de los bytes concatenados"""
+    offsets = np.zeros(len(items) + 1, dtype="<u8")
+    if items:
+        offsets[1:] = np.cumsum([len(item) for item in items])
+    return offsets.tobytes() + b"".join(items)
+
+
+def write_index(path: str, matrix: np.ndarray, ids: Sequence[str],
+                documents: Sequence[Document], dtype: str = "float32"):
+    """Escribe el índice completo de forma atómica (archivo temporal + rename)"""
+    if dtype not in _DTYPE_NAMES:
+        raise ValueError(f"dtype no soportado: {dtype}")
+
+    count = len(ids)
+    np_dtype = _DTYPE_CODES[_DTYPE_NAMES[dtype]]
+    if count:
+        matrix = np.ascontiguousarray(matrix, dtype=np_dtype).reshape(count, -1)
+    else:
+        matrix = np.empty((0, 0), dtype=np_dtype)
+    dim = matrix.shape[1]
+
+    levels = np.array([doc.metadata.get("level", 3) for doc in documents], dtype="<i2")
+    ids_blob = _encode_table([doc_id.encode("utf-8") for doc_id in ids])
+    meta_blob = _encode_table([
+        json.dumps({"page_content": doc.page_content, "metadata": doc.metadata},
+                   ensure_ascii=False).encode("utf-8")
+        for doc in documents
+    ])
+
+    matrix_offset = HEADER_SIZE
+    levels_offset = _align(matrix_offset + matrix.nbytes)
+    ids_offset = _align(levels_offset + levels.nbytes)
+    meta_offset = _align(ids_offset + len(ids_blob))
+    end_offset = meta_offset + len(meta_blob)
+
+    header = _HEADER_STRUCT.pack(
+        MAGIC, FORMAT_VERSION, _DTYPE_NAMES[dtype], count, dim,
+        matrix_offset, levels_offset, ids_offset, meta_offset, end_offset
+    ).ljust(HEADER_SIZE, b"\x00")
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        for offset, payload in ((0, header), (matrix_offset, matrix.tobytes()),
+                                (levels_offset, levels.tobytes()), (ids_offset, ids_blob),
+                                (meta_offset, meta_blob)):
+            f.seek(offset)
+            f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+
+    # Los procesos que ya tienen el archivo mapeado conservan la versión anterior
+    os.replace(tmp_path, path)
+
+
+class MappedTable(Sequence):
+    """Secuencia sobre una tabla de offsets que decodifica cada fila bajo demanda"""
+
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray):
+        self._offsets = offsets
+        self._blob = blob
+        self._decoded: Dict[int, object] = {}
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        if row not in self._decoded:
+            start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+            self._decoded[row] = self._decode(self._blob[start:end].tobytes())
+        return self._decoded[row]
+
+    def _decode(self, payload: bytes):
+        return payload.decode("utf-8")
+
+
+class MappedDocuments(MappedTable):
+    """Documentos cuyo JSON se decodifica solo al accederlos"""
+
+    def _decode(self, payload: bytes) -> Document:
+        entry = json.loads(payload.decode("utf-8"))
+        return Document(page_content=entry["page_content"], metadata=entry["metadata"])
+
+
+class MappedIndex:
+    """Índice abierto en solo lectura sobre np.memmap"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+
+        if len(header) < HEADER_SIZE:
+            raise IndexFormatError(f"Cabecera incompleta en {path}")
+
+        (magic, version, dtype_code, count, dim, matrix_offset, levels_offset,
+         ids_offset, meta_offset, end_offset) = _HEADER_STRUCT.unpack_from(header)
+
+        if magic != MAGIC:
+            raise IndexFormatError(f"{path} no es un índice de VectorMentor")
+        if version != FORMAT_VERSION:
+            raise IndexFormatError(f"Versión de índice no soportada: {version}")
+        if dtype_code not in _DTYPE_CODES:
+            raise IndexFormatError(f"Código de dtype desconocido: {dtype_code}")
+
+        self.version = version
+        self.count = count
+        self.dimension = dim
+        self.dtype = np.dtype(_DTYPE_CODES[dtype_code])
+
+        raw = np.memmap(path, dtype=np.uint8, mode="r")
+        if count:
+            self.matrix = np.memmap(path, dtype=self.dtype, mode="r",
+                                    offset=matrix_offset, shape=(count, dim))
+        else:
+            self.matrix = np.empty((0, 0), dtype=self.dtype)
+        self.levels = np.frombuffer(raw, dtype="<i2", count=count, offset=levels_offset)
+
+        ids_offsets = np.frombuffer(raw, dtype="<u8", count=count + 1, offset=ids_offset)
+        ids_data_start = ids_offset + ids_offsets.nbytes
+        self.ids = MappedTable(ids_offsets, raw[ids_data_start:meta_offset])
+
+        meta_offsets = np.frombuffer(raw, dtype="<u8", count=count + 1, offset=meta_offset)
+        meta_data_start = meta_offset + meta_offsets.nbytes
+        self.documents = MappedDocuments(meta_offsets, raw[meta_data_start:end_offset])
+
+    def get_document(self, row: int) -> Document:
+        return self.documents[row]
+
+
+def open_index(path: str) -> Optional[MappedIndex]:
+    """Abre el índice si existe; None si no hay archivo"""
+    if not os.path.exists(path):
+        return None
+    return MappedIndex(path)
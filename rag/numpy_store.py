@@ -0,0 +1,372 @@
+"""Base vectorial en memoria con NumPy - Búsqueda exacta (flat) o particionada (IVF)"""
+
+import os
+import json
+import heapq
+from typing import List, Dict, Any, Optional, Tuple, Sequence, Union
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from config.settings import settings
+from .base_store import BaseVectorStoreManager
+from .embedding_cache import create_embeddings
+from .index_file import MappedIndex, write_index
+from .seed_content import get_initial_documents
+from .similarity import normalize_rows, top_k_indices
+
+
+class IVFIndex:
+    """Índice invertido sobre centroides de k-means esférico"""
+
+    def __init__(self, nlist: int, nprobe: int):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.centroids = None
+        self.lists: List[np.ndarray] = []
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self, matrix: np.ndarray, iterations: int = 10, seed: int = 0):
+        """Entrena los centroides con k-means sobre vectores normalizados"""
+        nlist = min(self.nlist, matrix.shape[0])
+        rng = np.random.default_rng(seed)
+        centroids = matrix[rng.choice(matrix.shape[0], size=nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignments = np.argmax(matrix @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = matrix[assignments == c]
+                if len(members):
+                    centroids[c] = members.sum(axis=0)
+            centroids = normalize_rows(centroids)
+
+        self.centroids = centroids
+        self.assign(matrix)
+
+    def assign(self, matrix: np.ndarray):
+        """Reparte todas las filas de la matriz entre las listas de sus centroides"""
+        assignments = np.argmax(matrix @ self.centroids.T, axis=1)
+        order = np.argsort(assignments, kind="stable")
+        bounds = np.searchsorted(assignments[order], np.arange(len(self.centroids) + 1))
+        self.lists = [order[bounds[c]:bounds[c + 1]] for c in range(len(self.centroids))]
+
+    def candidate_rows(self, query: np.ndarray) -> np.ndarray:
+        """Filas de las nprobe listas más cercanas al query"""
+        centroid_scores = self.centroids @ query
+        probes = top_k_indices(centroid_scores, min(self.nprobe, len(self.centroids)))
+        return np.concatenate([self.lists[c] for c in probes])
+
+
+class NumpyVectorStoreManager(BaseVectorStoreManager):
+    """Gestiona una base vectorial local en NumPy, mapeada desde disco en solo lectura"""
+
+    INDEX_FILE = "index.vmidx"
+    CENTROIDS_FILE = "ivf_centroids.npy"
+    CATALOG_FILE = "catalog.json"
+    # Formato anterior (.npy + JSON), se migra al cargar
+    LEGACY_MATRIX_FILE = "embeddings.npy"
+    LEGACY_METADATA_FILE = "metadata.json"
+
+    def __init__(self, persist_directory: Optional[str] = None, index_type: Optional[str] = None,
+                 embeddings: Optional[Embeddings] = None):
+        super().__init__()
+        self.embeddings = embeddings or create_embeddings()
+        self.persist_directory = persist_directory or settings.NUMPY_STORE_DIRECTORY
+        self.index_type = (index_type or settings.NUMPY_INDEX_TYPE).lower()
+        self.catalog.path = self._path(self.CATALOG_FILE)
+        self.matrix = np.empty((0, 0), dtype=np.float32)
+        self.documents: Sequence[Document] = []
+        self.ids: List[str] = []
+        self.levels = np.empty(0, dtype=np.int16)
+        # Filas de cada nivel: slice contiguo si la matriz está ordenada por nivel
+        self._partitions: Dict[int, Union[slice, np.ndarray]] = {}
+        self._row_by_id: Optional[Dict[str, int]] = None
+        self.ivf = IVFIndex(settings.IVF_NLIST, settings.IVF_NPROBE) if self.index_type == "ivf" else None
+        self._initialize_vector_store()
+
+    def _initialize_vector_store(self):
+        """Carga el índice persistido o crea uno nuevo con el contenido inicial"""
+        try:
+            os.makedirs(self.persist_directory, exist_ok=True)
+            if self._load():
+                print(f" Base NumPy cargada con {len(self.documents)} documentos ({self.index_type})")
+            else:
+                print(" Creando nueva base NumPy...")
+                self.add_documents(get_initial_documents())
+        except Exception as e:
+            print(f"❌ Error inicializando base NumPy: {e}")
+
+    def _path(self, filename: str) -> str:
+        return os.path.join(self.persist_directory, filename)
+
+    def _load(self) -> bool:
+        """Mapea el índice del disco si existe (sin copiar la matriz a memoria)"""
+        index_path = self._path(self.INDEX_FILE)
+        if not os.path.exists(index_path):
+            return self._load_legacy()
+
+        mapped = MappedIndex(index_path)
+        self.matrix = mapped.matrix
+        self.ids = mapped.ids
+        self._row_by_id = None
+        self.documents = mapped.documents
+        self.levels = np.array(mapped.levels, dtype=np.int16)
+        self._partitions = self._level_partitions()
+
+        # Si falta el catálogo o no coincide con el índice, se reconstruye una vez
+        if not self.catalog.load() or len(self.catalog) != len(self.ids):
+            self.catalog.clear()
+            self.catalog.add((doc_id, doc.metadata) for doc_id, doc in zip(self.ids, self.documents))
+            self.catalog.save()
+
+        centroids_path = self._path(self.CENTROIDS_FILE)
+        if self.ivf is not None and os.path.exists(centroids_path):
+            self.ivf.centroids = np.load(centroids_path)
+            self.ivf.assign(self.matrix)
+        return True
+
+    def _load_legacy(self) -> bool:
+        """Convierte una base guardada como .npy + JSON al formato mapeable"""
+        matrix_path = self._path(self.LEGACY_MATRIX_FILE)
+        metadata_path = self._path(self.LEGACY_METADATA_FILE)
+        if not (os.path.exists(matrix_path) and os.path.exists(metadata_path)):
+            return False
+
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+
+        self.matrix = np.load(matrix_path)
+        self.ids = [entry["id"] for entry in payload["documents"]]
+        self.documents = [
+            Document(page_content=entry["page_content"], metadata=entry["metadata"])
+            for entry in payload["documents"]
+        ]
+        self._order_by_level()
+        self._refresh_levels()
+        self._update_ivf()
+        self._persist()
+        os.remove(matrix_path)
+        os.remove(metadata_path)
+        print(f" Base NumPy migrada al formato {self.INDEX_FILE}")
+        return self._load()
+
+    def _persist(self):
+        """Escribe el índice y lo vuelve a mapear en solo lectura"""
+        write_index(self._path(self.INDEX_FILE), self.matrix, self.ids, self.documents,
+                    dtype=settings.NUMPY_INDEX_DTYPE)
+
+        if self.ivf is not None and self.ivf.is_trained:
+            np.save(self._path(self.CENTROIDS_FILE), self.ivf.centroids)
+        self.catalog.save()
+
+        mapped = MappedIndex(self._path(self.INDEX_FILE))
+        self.matrix = mapped.matrix
+        self.documents = mapped.documents
+        self._row_by_id = None
+
+    def _refresh_levels(self):
+        self.levels = np.array(
+            [doc.metadata.get("level", 3) for doc in self.documents], dtype=np.int16
+        )
+        self._partitions = self._level_partitions()
+
+    def _order_by_level(self):
+        """Reordena las filas por nivel (estable) para que cada partición sea un bloque contiguo"""
+        levels = np.array([doc.metadata.get("level", 3) for doc in self.documents], dtype=np.int16)
+        if np.all(levels[:-1] <= levels[1:]):
+            return
+        order = np.argsort(levels, kind="stable")
+        self.matrix = np.asarray(self.matrix)[order]
+        self.documents = [self.documents[row] for row in order]
+        self.ids = [self.ids[row] for row in order]
+        self._row_by_id = None
+
+    def _level_partitions(self) -> Dict[int, Union[slice, np.ndarray]]:
+        """Nivel -> filas; los índices guardados antes del ordenamiento usan arreglos de filas"""
+        if not len(self.levels):
+            return {}
+        order = np.argsort(self.levels, kind="stable")
+        values, starts = np.unique(self.levels[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+        contiguous = np.array_equal(order, np.arange(len(order)))
+        return {
+            int(level): slice(int(start), int(end)) if contiguous else order[start:end]
+            for level, start, end in zip(values, starts, ends)
+        }
+
+    def _update_ivf(self):
+        """Entrena el IVF cuando hay suficientes vectores, o reasigna si ya está entrenado"""
+        if self.ivf is None:
+            return
+        if self.ivf.is_trained:
+            self.ivf.assign(self.matrix)
+        elif len(self.documents) >= settings.IVF_MIN_TRAIN_SIZE:
+            self.ivf.train(self.matrix)
+
+    def _search_rows(self, query_vector: List[float], k: int,
+                       filter_level: int = None) -> List[Tuple[int, float]]:
+        """Top-k sobre la matriz, las listas IVF sondeadas o las particiones de nivel <= filter_level"""
+        if not self.documents:
+            return []
+
+        query = normalize_rows(query_vector)[0]
+        partitions = None
+        if filter_level and any(level > filter_level for level in self._partitions):
+            partitions = [rows for level, rows in self._partitions.items() if level <= filter_level]
+
+        if self.ivf is not None and self.ivf.is_trained:
+            candidates = self.ivf.candidate_rows(query)
+            if partitions is not None:
+                candidates = candidates[self.levels[candidates] <= filter_level]
+            # Si las listas sondeadas no alcanzan para k resultados, búsqueda exacta
+            if len(candidates) >= k:
+                scores = self.matrix[candidates] @ query
+                return [(int(candidates[i]), float(scores[i])) for i in top_k_indices(scores, k)]
+
+        if partitions is None:
+            scores = self.matrix @ query
+            return [(int(r), float(scores[r])) for r in top_k_indices(scores, k)]
+
+        # Top-k de cada partición y mezcla con un heap
+        return heapq.nlargest(k, self._partition_top_k(partitions, query, k), key=lambda item: item[1])
+
+    def _partition_top_k(self, partitions, query: np.ndarray, k: int):
+        """(fila, score) de los k mejores de cada partición; los slices no copian la matriz"""
+        for rows in partitions:
+            scores = self.matrix[rows] @ query
+            for i in top_k_indices(scores, k):
+                row = rows.start + i if isinstance(rows, slice) else rows[i]
+                yield int(row), float(scores[i])
+
+    def _search_by_vector(self, query_vector: List[float], k: int,
+                          filter_level: int = None) -> List[Document]:
+        """Documentos más similares al embedding del query"""
+        return [self.documents[row] for row, _ in self._search_rows(query_vector, k, filter_level)]
+
+    def _upsert_batch(self, ids: List[str], documents: List[Document]):
+        """Reemplaza las filas de ids existentes y agrega las nuevas (en memoria)"""
+        vectors = normalize_rows(self.embeddings.embed_documents([doc.page_content for doc in documents]))
+        row_by_id = self._row_index()
+        # La matriz mapeada es de solo lectura: se copia una vez hasta el próximo _persist
+        matrix = self.matrix if self.matrix.flags.writeable else np.array(self.matrix)
+        self.documents = list(self.documents)
+        self.ids = list(self.ids)
+
+        appended = []
+        for doc_id, doc, vector in zip(ids, documents, vectors):
+            row = row_by_id.get(doc_id)
+            if row is None:
+                row_by_id[doc_id] = len(self.ids)
+                self.ids.append(doc_id)
+                self.documents.append(doc)
+                appended.append(vector)
+            else:
+                matrix[row] = vector
+                self.documents[row] = doc
+
+        if appended:
+            matrix = np.vstack([matrix, appended]) if len(matrix) else np.array(appended)
+        self.matrix = matrix
+        self.catalog.add(zip(ids, [doc.metadata for doc in documents]))
+
+    def _commit(self):
+        """Una sola reescritura del índice por llamada a add_documents"""
+        self._order_by_level()
+        self._refresh_levels()
+        self._update_ivf()
+        self._persist()
+
+    def delete_documents(self, ids: List[str]):
+        """Elimina documentos por id y reescribe el índice"""
+        to_delete = set(ids)
+        keep = [row for row, doc_id in enumerate(self.ids) if doc_id not in to_delete]
+        if len(keep) == len(self.ids):
+            return
+
+        try:
+            removed = len(self.ids) - len(keep)
+            self.matrix = np.asarray(self.matrix)[keep]
+            self.documents = [self.documents[row] for row in keep]
+            self.ids = [self.ids[row] for row in keep]
+            self.catalog.remove(to_delete)
+            self._refresh_levels()
+            self._update_ivf()
+            self._persist()
+            self._invalidate_query_cache()
+            print(f" {removed} documentos eliminados")
+        except Exception as e:
+            print(f"❌ Error eliminando documentos: {e}")
+
+    def _row_index(self) -> Dict[str, int]:
+        """Mapa id -> fila, armado bajo demanda y descartado en cada _persist"""
+        if self._row_by_id is None:
+            self._row_by_id = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        return self._row_by_id
+
+    def _rows_for_ids(self, ids: List[str]) -> List[int]:
+        """Filas de la matriz para los ids dados"""
+        row_by_id = self._row_index()
+        return [row_by_id[doc_id] for doc_id in ids if doc_id in row_by_id]
+
+    def _vectors_for_ids(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        """Filas de la matriz (ya normalizadas) para los ids dados"""
+        row_by_id = self._row_index()
+        return {doc_id: np.asarray(self.matrix[row_by_id[doc_id]]) for doc_id in ids if doc_id in row_by_id}
+
+    def _documents_for_topic(self, topic: str, ids: List[str], level: Optional[int], k: int,
+                             query_vector: Optional[List[float]] = None) -> List[Document]:
+        """Filas del tema; con vector, se puntúan solo esas filas"""
+        rows = self._rows_for_ids(ids)
+        if query_vector is not None and len(rows) > k:
+            scores = np.asarray(self.matrix[rows]) @ normalize_rows(query_vector)[0]
+            rows = [rows[i] for i in top_k_indices(scores, k)]
+        return [self.documents[row] for row in rows[:k]]
+
+    def get_collection_stats(self) -> Dict[str, Any]:
+        """Obtiene estadísticas de la colección"""
+        return {
+            "count": len(self.documents),
+            "status": "active",
+            "persist_directory": self.persist_directory,
+            "backend": "numpy",
+            "index_type": "ivf" if self.ivf is not None and self.ivf.is_trained else "flat",
+            "topics": self.catalog.topic_counts(),
+            "levels": self.catalog.level_counts(),
+            "query_cache": self.get_query_cache_stats()
+        }
+
+    def warm(self):
+        """Recorre la matriz mapeada para traer sus páginas a memoria"""
+        if len(self.documents):
+            float(np.asarray(self.matrix).sum(dtype=np.float64))
+
+    def close(self):
+        """Suelta las referencias al archivo mapeado"""
+        self.matrix = np.empty((0, 0), dtype=np.float32)
+        self.documents, self.ids = [], []
+        self._row_by_id = None
+        self.levels = np.empty(0, dtype=np.int16)
+        self._partitions = {}
+
+    def clear_collection(self):
+        """Limpia toda la colección (usar con cuidado)"""
+        try:
+            for filename in (self.INDEX_FILE, self.CENTROIDS_FILE, self.CATALOG_FILE):
+                if os.path.exists(self._path(filename)):
+                    os.remove(self._path(filename))
+            self.matrix = np.empty((0, 0), dtype=np.float32)
+            self.documents, self.ids = [], []
+            self._row_by_id = None
+            self.levels = np.empty(0, dtype=np.int16)
+            self._partitions = {}
+            self.catalog.clear()
+            if self.ivf is not None:
+                self.ivf = IVFIndex(settings.IVF_NLIST, settings.IVF_NPROBE)
+
+            self._invalidate_query_cache()
+            print("🗑️ Colección limpiada")
+            self._initialize_vector_store()
+        except Exception as e:
+            print(f"❌ Error limpiando colección: {e}")
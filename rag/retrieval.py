@@ -0,0 +1,306 @@
+"""Pipeline de recuperación por etapas con métricas por etapa.
+
+    reescritura -> candidatos -> filtro de metadatos -> rerank -> dedup -> empaquetado
+
+Cada etapa recibe y devuelve el mismo estado (un dict), así que se pueden reemplazar
+o desactivar una a una. El pipeline registra tiempo, cantidad de candidatos y aciertos
+de caché de cada etapa, por consulta y acumulados.
+"""
+
+import time
+import numpy as np
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+from langchain_core.documents import Document
+from config.settings import settings, RETRIEVAL_DISABLED_STAGES
+from .bm25 import BM25Index
+from .fusion import content_key, reciprocal_rank_fusion
+from .similarity import mmr_select, normalize_rows
+from utils.async_pool import run_blocking
+
+
+class RetrievalStage(ABC):
+    """Etapa del pipeline: transforma el estado (query, candidates, documents, ...)"""
+
+    name: str = "stage"
+
+    @abstractmethod
+    async def run(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        pass
+
+
+class QueryRewriteStage(RetrievalStage):
+    """Reescribe el input del estudiante como query de búsqueda (p. ej. con el LLM)"""
+
+    name = "rewrite"
+
+    def __init__(self, rewriter: Optional[Callable[[str, str, int], Awaitable[str]]] = None):
+        self.rewriter = rewriter
+
+    async def run(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        if self.rewriter is not None:
+            state["query"] = await self.rewriter(state["student_input"], state["topic"], state["level"])
+        return state
+
+
+class CandidateStage(RetrievalStage):
+    """Genera candidatos con la búsqueda vectorial async (sobre-muestreo de fetch_factor × k).
+
+    Si el store expone stored_vectors, deja en state["vectors"] los embeddings ya guardados
+    de cada candidato (por content_key) para las etapas siguientes.
+    """
+
+    name = "candidates"
+
+    def __init__(self, vector_store, fetch_factor: int = 2):
+        self.vector_store = vector_store
+        self.fetch_factor = fetch_factor
+
+    async def run(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        fetch_k = state["k"] * self.fetch_factor
+        is_cached = getattr(self.vector_store, "is_cached", None)
+        state["cache_hit"] = bool(is_cached and is_cached(state["query"], fetch_k, state["level"]))
+        state["candidates"] = await self.vector_store.asimilarity_search(
+            state["query"], k=fetch_k, filter_level=state["level"]
+        )
+        stored_vectors = getattr(self.vector_store, "stored_vectors", None)
+        if stored_vectors is not None and state["candidates"]:
+            vectors = await run_blocking(stored_vectors, state["candidates"])
+            state["vectors"] = {
+                content_key(doc): vector
+                for doc, vector in zip(state["candidates"], vectors) if vector is not None
+            }
+        return state
+
+
+class MetadataFilterStage(RetrievalStage):
+    """Filtro exacto de nivel (los backends aproximados pueden devolver niveles de más)"""
+
+    name = "filter"
+
+    async def run(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        level = state["level"]
+        if level:
+            state["candidates"] = [
+                doc for doc in state["candidates"] if doc.metadata.get("level", 3) <= level
+            ]
+        return state
+
+
+def _matches_topic(doc: Document, topic: str) -> bool:
+    doc_topic = str(doc.metadata.get("topic", "")).lower()
+    return bool(doc_topic) and (doc_topic in topic or topic in doc_topic)
+
+
+class LexicalRerankStage(RetrievalStage):
+    """Combina el orden vectorial con BM25 (RRF) y adelanta los documentos del tema evaluado"""
+
+    name = "rerank"
+
+    async def run(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        candidates = state["candidates"]
+        if len(candidates) < 2:
+            return state
+        index = BM25Index(fuzzy=False)
+        index.add(candidates)
+        lexical = [doc for doc, _ in index.search(state["student_input"] or state["query"], len(candidates))]
+        candidates = reciprocal_rank_fusion([candidates, lexical], k=settings.RRF_K)
+
+        topic = (state.get("topic") or "").lower()
+        if topic:
+            # sort estable: conserva el orden fusionado dentro de cada grupo
+            candidates.sort(key=lambda doc: not _matches_topic(doc, topic))
+        state["candidates"] = candidates
+        return state
+
+
+class DedupStage(RetrievalStage):
+    """Elimina documentos con el mismo contenido"""
+
+    name = "dedup"
+
+    async def run(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        seen = set()
+        unique = []
+        for doc in state["candidates"]:
+            key = content_key(doc)
+            if key not in seen:
+                seen.add(key)
+                unique.append(doc)
+        state["candidates"] = unique
+        return state
+
+
+class DiversityStage(RetrievalStage):
+    """Reordena con MMR para que los documentos finales no repitan el mismo contenido.
+
+    La relevancia de cada candidato combina su posición en el orden recibido (la del rerank
+    BM25/RRF, como puntaje 1/(RRF_K + posición) reescalado a [0, 1]) con su propio coseno con
+    la consulta, según MMR_RANK_WEIGHT; los documentos del tema evaluado conservan la
+    prioridad que les dio el rerank. Los vectores de
+    los candidatos salen de state["vectors"] (leídos del store por la etapa de candidatos);
+    solo los que falten se calculan con el cliente de embeddings.
+    """
+
+    name = "diversity"
+
+    def __init__(self, embeddings=None, lambda_mult: float = None, rank_weight: float = None):
+        self.embeddings = embeddings
+        self.lambda_mult = lambda_mult
+        self.rank_weight = rank_weight
+
+    @staticmethod
+    def _rank_relevance(n: int) -> np.ndarray:
+        """Puntaje RRF de cada posición, reescalado para que el primero valga 1 y el último 0"""
+        scores = 1.0 / (settings.RRF_K + np.arange(1, n + 1, dtype=np.float32))
+        return (scores - scores[-1]) / (scores[0] - scores[-1])
+
+    async def run(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        candidates = state["candidates"]
+        if self.embeddings is None or len(candidates) < 3:
+            return state
+        lambda_mult = settings.MMR_LAMBDA if self.lambda_mult is None else self.lambda_mult
+        rank_weight = settings.MMR_RANK_WEIGHT if self.rank_weight is None else self.rank_weight
+        # La etapa de candidatos ya embebió esta consulta: sale de la caché de embeddings
+        query_vector = await self.embeddings.aembed_query(state["query"])
+
+        stored = state.get("vectors", {})
+        vectors = [stored.get(content_key(doc)) for doc in candidates]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            computed = await self.embeddings.aembed_documents([candidates[i].page_content for i in missing])
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+
+        matrix = normalize_rows(np.asarray(vectors, dtype=np.float32))
+        similarities = matrix @ normalize_rows(query_vector)[0]
+        relevance = rank_weight * self._rank_relevance(len(candidates)) + (1 - rank_weight) * similarities
+
+        # Como en el rerank, los documentos del tema evaluado van primero: MMR dentro de cada grupo
+        topic = (state.get("topic") or "").lower()
+        on_topic = [i for i, doc in enumerate(candidates) if topic and _matches_topic(doc, topic)]
+        rest = sorted(set(range(len(candidates))) - set(on_topic))
+        order = []
+        for group in (on_topic, rest):
+            if group:
+                selected = mmr_select(query_vector, matrix[group], len(group), lambda_mult,
+                                      relevance=relevance[group])
+                order.extend(group[i] for i in selected)
+        state["candidates"] = [candidates[i] for i in order]
+        return state
+
+
+class ContextPackingStage(RetrievalStage):
+    """Selecciona los documentos finales y arma el contexto dentro de un límite de caracteres"""
+
+    name = "pack"
+
+    def __init__(self, max_documents: int = 3, max_chars: int = 6000):
+        self.max_documents = max_documents
+        self.max_chars = max_chars
+
+    async def run(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        documents, parts, used = [], [], 0
+        for doc in state["candidates"][:self.max_documents]:
+            content = doc.page_content.strip()
+            if used and used + len(content) > self.max_chars:
+                break
+            documents.append(doc)
+            parts.append(content)
+            used += len(content)
+        state["documents"] = documents
+        state["context_text"] = "\n\n".join(parts)
+        return state
+
+
+class RetrievalPipeline:
+    """Ejecuta las etapas en orden y mide cada una"""
+
+    def __init__(self, stages: Iterable[RetrievalStage],
+                 disabled_stages: Optional[Dict[str, List[str]]] = None):
+        self.stages: List[RetrievalStage] = list(stages)
+        self.disabled_stages = RETRIEVAL_DISABLED_STAGES if disabled_stages is None else disabled_stages
+        self._totals: Dict[str, Dict[str, float]] = {}
+
+    def replace(self, name: str, stage: RetrievalStage):
+        """Reemplaza la etapa con ese nombre (o la agrega al final si no existe)"""
+        for i, current in enumerate(self.stages):
+            if current.name == name:
+                self.stages[i] = stage
+                return
+        self.stages.append(stage)
+
+    def get_stage(self, name: str) -> Optional[RetrievalStage]:
+        return next((stage for stage in self.stages if stage.name == name), None)
+
+    async def run(self, student_input: str, topic: str = "", level: int = 3,
+                  k: int = None, interaction_type: str = "question") -> Dict[str, Any]:
+        """Recupera documentos; el resultado incluye 'trace' con las métricas de cada etapa"""
+        state: Dict[str, Any] = {
+            "student_input": student_input,
+            "query": student_input or topic,
+            "topic": topic,
+            "level": level,
+            "k": k or settings.RETRIEVAL_TOP_K,
+            "interaction_type": interaction_type,
+            "candidates": [],
+            "documents": [],
+            "context_text": "",
+            "cache_hit": False,
+            "trace": []
+        }
+        skipped = set(self.disabled_stages.get(interaction_type, []))
+
+        for stage in self.stages:
+            if stage.name in skipped:
+                continue
+            count_in = len(state["candidates"])
+            start = time.perf_counter()
+            try:
+                state = await stage.run(state)
+            except Exception as e:
+                print(f"❌ Error en etapa de recuperación '{stage.name}': {e}")
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            state["trace"].append({
+                "stage": stage.name,
+                "ms": round(elapsed_ms, 2),
+                "in": count_in,
+                "out": len(state["candidates"]),
+                "cache_hit": state["cache_hit"] if stage.name == "candidates" else None
+            })
+            self._record(stage.name, elapsed_ms, state["cache_hit"] if stage.name == "candidates" else False)
+
+        # Si no hubo etapa de empaquetado, se devuelven los candidatos tal cual
+        if not state["documents"] and self.get_stage("pack") is None:
+            state["documents"] = state["candidates"]
+        return state
+
+    def _record(self, name: str, elapsed_ms: float, cache_hit: bool):
+        totals = self._totals.setdefault(name, {"calls": 0, "total_ms": 0.0, "cache_hits": 0})
+        totals["calls"] += 1
+        totals["total_ms"] += elapsed_ms
+        totals["cache_hits"] += int(cache_hit)
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """Tiempo medio y aciertos de caché acumulados por etapa"""
+        return {
+            name: {
+                "calls": totals["calls"],
+                "avg_ms": round(totals["total_ms"] / totals["calls"], 2),
+                "cache_hits": totals["cache_hits"]
+            }
+            for name, totals in self._totals.items()
+        }
+
+
+def create_default_pipeline(vector_store, rewriter=None) -> RetrievalPipeline:
+    """Pipeline estándar del RetrieverAgent"""
+    return RetrievalPipeline([
+        QueryRewriteStage(rewriter),
+        CandidateStage(vector_store),
+        MetadataFilterStage(),
+        LexicalRerankStage(),
+        DedupStage(),
+        DiversityStage(getattr(vector_store, "embeddings", None)),
+        ContextPackingStage(),
+    ])
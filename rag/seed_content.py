@@ -0,0 +1,96 @@
+"""Contenido educativo inicial compartido por los backends de la base vectorial"""
+
+from typing import List
+from langchain_core.documents import Document
+
+
+def get_initial_documents() -> List[Document]:
+    """Documentos semilla de álgebra lineal con sus metadatos"""
+    return [
+        # Vectores básicos
+        Document(
+            page_content="""
+            Un vector es una cantidad que tiene tanto magnitud como dirección. 
+            En el plano cartesiano, un vector se puede representar como un par ordenado (x, y).
+            La magnitud de un vector v = (x, y) se calcula como ||v|| = √(x² + y²).
+            Los vectores se pueden sumar componente a componente: (a, b) + (c, d) = (a+c, b+d).
+            """,
+            metadata={"topic": "vectores", "level": 1, "subtopic": "definicion_basica"}
+        ),
+        
+        Document(
+            page_content="""
+            Las operaciones básicas con vectores incluyen:
+            1. Suma: u + v = (u₁ + v₁, u₂ + v₂)
+            2. Resta: u - v = (u₁ - v₁, u₂ - v₂)  
+            3. Multiplicación por escalar: k·v = (k·v₁, k·v₂)
+            4. Producto punto: u·v = u₁v₁ + u₂v₂
+            El producto punto da como resultado un escalar, no un vector.
+            """,
+            metadata={"topic": "vectores", "level": 2, "subtopic": "operaciones"}
+        ),
+        
+        Document(
+            page_content="""
+            El producto punto (o producto escalar) entre dos vectores u = (u₁, u₂) y v = (v₁, v₂) 
+            se define como u·v = u₁v₁ + u₂v₂ = ||u|| ||v|| cos(θ), donde θ es el ángulo entre los vectores.
+            Si el producto punto es cero, los vectores son perpendiculares (ortogonales).
+            Si es positivo, el ángulo es agudo; si es negativo, el ángulo es obtuso.
+            """,
+            metadata={"topic": "producto_punto", "level": 3, "subtopic": "definicion"}
+        ),
+        
+        # Matrices básicas
+        Document(
+            page_content="""
+            Una matriz es un arreglo rectangular de números organizados en filas y columnas.
+            Una matriz de m×n tiene m filas y n columnas. Las operaciones básicas incluyen:
+            - Suma de matrices (del mismo tamaño): se suman elemento a elemento
+            - Multiplicación por escalar: se multiplica cada elemento por el escalar
+            - Multiplicación de matrices: el elemento (i,j) es el producto punto de la fila i por la columna j
+            """,
+            metadata={"topic": "matrices", "level": 2, "subtopic": "definicion_operaciones"}
+        ),
+        
+        Document(
+            page_content="""
+            El determinante de una matriz 2×2 es: det(A) = ad - bc para A = [[a,b],[c,d]].
+            Para matrices 3×3, se puede usar la regla de Sarrus o expansión por cofactores.
+            El determinante es cero si y solo si la matriz es singular (no invertible).
+            Una matriz es invertible si su determinante es diferente de cero.
+            """,
+            metadata={"topic": "matrices", "level": 3, "subtopic": "determinante"}
+        ),
+        
+        # Sistemas lineales
+        Document(
+            page_content="""
+            Un sistema de ecuaciones lineales se puede escribir en forma matricial como Ax = b,
+            donde A es la matriz de coeficientes, x es el vector de incógnitas, y b es el vector de términos independientes.
+            Los métodos de solución incluyen: eliminación gaussiana, regla de Cramer, y factorización LU.
+            Un sistema puede tener solución única, infinitas soluciones, o no tener solución.
+            """,
+            metadata={"topic": "sistemas_lineales", "level": 3, "subtopic": "forma_matricial"}
+        ),
+        
+        # Espacios vectoriales
+        Document(
+            page_content="""
+            Un espacio vectorial es un conjunto de vectores con operaciones de suma y multiplicación por escalar
+            que satisfacen ciertos axiomas. Los vectores en R² forman un espacio vectorial de dimensión 2.
+            Una base es un conjunto de vectores linealmente independientes que generan todo el espacio.
+            La dimensión de un espacio vectorial es el número de vectores en cualquier base.
+            """,
+            metadata={"topic": "espacios_vectoriales", "level": 4, "subtopic": "definicion"}
+        ),
+        
+        Document(
+            page_content="""
+            Vectores linealmente independientes son aquellos donde ninguno puede escribirse como
+            combinación lineal de los otros. En R², dos vectores son linealmente independientes
+            si no son paralelos (colineales). En R³, tres vectores son linealmente independientes
+            si no son coplanares. La independencia lineal se puede verificar con determinantes.
+            """,
+            metadata={"topic": "espacios_vectoriales", "level": 4, "subtopic": "independencia_lineal"}
+        )
+    ]
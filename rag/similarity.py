@@ -0,0 +1,179 @@
+"""Motor de similaridad vectorizado - Top-k coseno sobre matrices normalizadas"""
+
+from typing import List, Tuple, Optional, Sequence, Union
+import numpy as np
+
+ArrayLike = Union[np.ndarray, Sequence[Sequence[float]], Sequence[float]]
+
+
+def normalize_rows(embeddings: ArrayLike, dtype=np.float32) -> np.ndarray:
+    """Convierte embeddings a una matriz 2D con filas de norma 1 (filas nulas quedan en cero)"""
+    matrix = np.asarray(embeddings, dtype=dtype)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    if matrix.size == 0:
+        return matrix.reshape(0, matrix.shape[-1] if matrix.ndim == 2 else 0)
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Índices de los k mayores scores, ordenados de mayor a menor (selección parcial)"""
+    n = scores.shape[-1]
+    if k <= 0 or n == 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+    if k >= n:
+        return np.argsort(-scores, axis=-1, kind="stable")
+
+    # argpartition es O(n); solo se ordenan los k seleccionados
+    candidates = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    candidate_scores = np.take_along_axis(scores, candidates, axis=-1)
+    order = np.argsort(-candidate_scores, axis=-1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=-1)
+
+
+def mmr_select(query: ArrayLike, candidates: ArrayLike, k: int,
+               lambda_mult: float = 0.7, relevance: Optional[np.ndarray] = None) -> List[int]:
+    """Maximal Marginal Relevance: índices que equilibran relevancia y diversidad.
+
+    En cada paso se elige argmax(λ·rel(d) - (1-λ)·max sim(d, elegidos)), con rel = sim(q, d)
+    salvo que se pase otra relevancia. La matriz candidato x candidato se calcula una vez y
+    la máxima similitud con los elegidos se actualiza con np.maximum: cada paso es O(n).
+    """
+    matrix = normalize_rows(candidates)
+    n = matrix.shape[0]
+    k = min(k, n)
+    if k <= 0:
+        return []
+
+    if relevance is None:
+        relevance = matrix @ normalize_rows(query)[0]
+    pairwise = matrix @ matrix.T
+    max_redundancy = np.full(n, -np.inf, dtype=matrix.dtype)
+    available = np.ones(n, dtype=bool)
+
+    selected = [int(np.argmax(relevance))]
+    for _ in range(k - 1):
+        last = selected[-1]
+        available[last] = False
+        np.maximum(max_redundancy, pairwise[:, last], out=max_redundancy)
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_redundancy
+        scores[~available] = -np.inf
+        selected.append(int(np.argmax(scores)))
+    return selected
+
+
+class SimilarityIndex:
+    """Matriz de candidatos pre-normalizada en float32 para búsquedas top-k por producto matricial"""
+
+    def __init__(self, embeddings: ArrayLike = None, dtype=np.float32):
+        self.dtype = dtype
+        if embeddings is None or len(embeddings) == 0:
+            self.matrix = np.empty((0, 0), dtype=dtype)
+        else:
+            self.matrix = normalize_rows(embeddings, dtype=dtype)
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    @property
+    def dimension(self) -> int:
+        return self.matrix.shape[1] if self.matrix.ndim == 2 else 0
+
+    def add(self, embeddings: ArrayLike):
+        """Agrega nuevos candidatos al final de la matriz"""
+        new_rows = normalize_rows(embeddings, dtype=self.dtype)
+        if len(self) == 0:
+            self.matrix = new_rows
+        else:
+            self.matrix = np.vstack([self.matrix, new_rows])
+
+    def scores(self, queries: ArrayLike) -> np.ndarray:
+        """Similaridad coseno de cada query contra todos los candidatos (shape: queries × candidatos)"""
+        query_matrix = normalize_rows(queries, dtype=self.dtype)
+        if len(self) == 0:
+            return np.empty((query_matrix.shape[0], 0), dtype=self.dtype)
+        return query_matrix @ self.matrix.T
+
+    def search_batch(self, queries: ArrayLike, k: Optional[int] = None,
+                     threshold: Optional[float] = None) -> List[List[Tuple[int, float]]]:
+        """Top-k por cada query de un lote con un único producto matricial"""
+        scores = self.scores(queries)
+        k = len(self) if k is None else min(k, len(self))
+        indices = top_k_indices(scores, k)
+
+        results = []
+        for row, row_indices in enumerate(indices):
+            row_scores = scores[row, row_indices]
+            if threshold is not None:
+                keep = row_scores >= threshold
+                row_indices, row_scores = row_indices[keep], row_scores[keep]
+            results.append([(int(i), float(s)) for i, s in zip(row_indices, row_scores)])
+        return results
+
+    def search(self, query: ArrayLike, k: Optional[int] = None,
+               threshold: Optional[float] = None) -> List[Tuple[int, float]]:
+        """Top-k para una sola query"""
+        return self.search_batch(query, k=k, threshold=threshold)[0]
+
+
+def iter_similarity_blocks(embeddings: ArrayLike, block_size: int = 1024,
+                           upper_only: bool = False):
+    """Recorre la matriz de similaridad por bloques sin materializarla completa.
+
+    Produce tuplas (fila_inicio, columna_inicio, bloque). Con upper_only=True solo se
+    generan los bloques de la diagonal hacia arriba (útil para estadísticas simétricas).
+    """
+    matrix = normalize_rows(embeddings)
+    n = matrix.shape[0]
+    for row_start in range(0, n, block_size):
+        rows = matrix[row_start:row_start + block_size]
+        first_col = row_start if upper_only else 0
+        for col_start in range(first_col, n, block_size):
+            cols = matrix[col_start:col_start + block_size]
+            yield row_start, col_start, rows @ cols.T
+
+
+def similarity_statistics(embeddings: ArrayLike, block_size: int = 1024,
+                          sample_pairs: Optional[int] = None, seed: int = 0) -> dict:
+    """Media y desviación de la similaridad entre pares distintos (i < j).
+
+    Sin sample_pairs se acumula de forma exacta y online bloque a bloque (memoria
+    O(block_size²)). Con sample_pairs se estima con pares aleatorios, útil para
+    corpus muy grandes.
+    """
+    matrix = normalize_rows(embeddings)
+    n = matrix.shape[0]
+    total_pairs = n * (n - 1) // 2
+    if total_pairs == 0:
+        return {"pairs": 0, "mean": 0.0, "std": 0.0, "method": "exact"}
+
+    if sample_pairs is not None and sample_pairs < total_pairs:
+        rng = np.random.default_rng(seed)
+        left = rng.integers(0, n, size=sample_pairs)
+        # Desplazamiento en [1, n-1] garantiza pares de elementos distintos
+        right = (left + rng.integers(1, n, size=sample_pairs)) % n
+        sims = np.einsum("ij,ij->i", matrix[left], matrix[right], dtype=np.float64)
+        return {
+            "pairs": int(sample_pairs),
+            "mean": float(sims.mean()),
+            "std": float(sims.std()),
+            "method": "sampled"
+        }
+
+    count = 0
+    total = 0.0
+    total_sq = 0.0
+    for row_start, col_start, block in iter_similarity_blocks(matrix, block_size, upper_only=True):
+        if row_start == col_start:
+            block = block[np.triu_indices(block.shape[0], k=1, m=block.shape[1])]
+        values = block.astype(np.float64, copy=False)
+        count += values.size
+        total += float(values.sum())
+        total_sq += float(np.square(values).sum())
+
+    mean = total / count
+    variance = max(total_sq / count - mean * mean, 0.0)
+    return {"pairs": count, "mean": mean, "std": float(np.sqrt(variance)), "method": "exact"}
@@ -0,0 +1,79 @@
+"""Selección del backend de base vectorial y registro compartido por proceso"""
+
+import os
+import atexit
+import threading
+from typing import Optional, Dict, Tuple
+from config.settings import settings
+from .base_store import BaseVectorStoreManager
+from .embedding_cache import create_embeddings
+
+
+def create_vector_store_manager(store_type: Optional[str] = None, **kwargs) -> BaseVectorStoreManager:
+    """Crea el gestor de base vectorial indicado por settings.VECTOR_STORE_TYPE"""
+    store_type = (store_type or settings.VECTOR_STORE_TYPE).lower()
+
+    if store_type == "numpy":
+        from .numpy_store import NumpyVectorStoreManager
+        return NumpyVectorStoreManager(**kwargs)
+
+    if store_type == "chroma":
+        # Import diferido: el backend NumPy no necesita Chroma instalado
+        from .vector_store import VectorStoreManager
+        return VectorStoreManager(**kwargs)
+
+    raise ValueError(f"Tipo de base vectorial no soportado: {store_type}")
+
+
+# Un gestor ya inicializado por (backend, directorio, modelo de embeddings)
+_registry: Dict[Tuple[str, str, str], BaseVectorStoreManager] = {}
+_registry_lock = threading.Lock()
+
+
+def _default_directory(store_type: str) -> str:
+    if store_type == "numpy":
+        return settings.NUMPY_STORE_DIRECTORY
+    return settings.CHROMA_PERSIST_DIRECTORY
+
+
+def get_vector_store_manager(store_type: Optional[str] = None,
+                             persist_directory: Optional[str] = None,
+                             embedding_model: Optional[str] = None) -> BaseVectorStoreManager:
+    """Devuelve el gestor compartido del proceso, creándolo y calentándolo la primera vez"""
+    store_type = (store_type or settings.VECTOR_STORE_TYPE).lower()
+    persist_directory = persist_directory or _default_directory(store_type)
+    embedding_model = embedding_model or settings.EMBEDDING_MODEL
+    key = (store_type, os.path.abspath(persist_directory), embedding_model)
+
+    manager = _registry.get(key)
+    if manager is not None:
+        return manager
+
+    with _registry_lock:
+        # Otro hilo pudo haberlo creado mientras esperábamos el lock
+        manager = _registry.get(key)
+        if manager is None:
+            manager = create_vector_store_manager(
+                store_type,
+                persist_directory=persist_directory,
+                embeddings=create_embeddings(embedding_model)
+            )
+            manager.warm()
+            _registry[key] = manager
+        return manager
+
+
+def shutdown_vector_store_managers():
+    """Cierra y olvida todos los gestores registrados"""
+    with _registry_lock:
+        managers = list(_registry.values())
+        _registry.clear()
+
+    for manager in managers:
+        try:
+            manager.close()
+        except Exception as e:
+            print(f"⚠️ Error cerrando base vectorial: {e}")
+
+
+atexit.register(shutdown_vector_store_managers)
@@ -1,10 +1,14 @@
 """VectorStore Manager - Gestión de la base de datos vectorial - CORREGIDO"""
 
 import os
+import numpy as np
 from typing import List, Dict, Any, Optional
-from langchain_openai import OpenAIEmbeddings
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from config.settings import settings
+from .base_store import BaseVectorStoreManager
+from .embedding_cache import create_embeddings
+from .seed_content import get_initial_documents
 
 # Importar Chroma desde el paquete correcto para evitar warnings
 try:
@@ -14,16 +18,17 @@ except ImportError:
     from langchain_community.vectorstores import Chroma
     print("⚠️ Usando langchain_community.vectorstores (deprecado)")
 
-class VectorStoreManager:
+class VectorStoreManager(BaseVectorStoreManager):
     """Gestiona la base de datos vectorial para RAG"""
+
+    CATALOG_FILE = "catalog.json"
     
-    def __init__(self):
-        self.embeddings = OpenAIEmbeddings(
-            model=settings.EMBEDDING_MODEL,
-            api_key=settings.OPENAI_API_KEY  # Usar api_key en lugar de openai_api_key
-        )
+    def __init__(self, persist_directory: Optional[str] = None, embeddings: Optional[Embeddings] = None):
+        super().__init__()
+        self.embeddings = embeddings or create_embeddings()
         self.vector_store = None
-        self.persist_directory = settings.CHROMA_PERSIST_DIRECTORY
+        self.persist_directory = persist_directory or settings.CHROMA_PERSIST_DIRECTORY
+        self.catalog.path = os.path.join(self.persist_directory, self.CATALOG_FILE)
         self._initialize_vector_store()
     
     def _initialize_vector_store(self):
@@ -44,7 +49,12 @@ class VectorStoreManager:
                     count = self.vector_store._collection.count()
                     print(f" Base vectorial cargada con {count} documentos")
                 except:
+                    count = None
                     print(" Base vectorial cargada (no se pudo obtener count)")
+                self._load_catalog(count)
+                # Colección vacía (p. ej. tras clear_collection): sembrar de nuevo, es idempotente
+                if count == 0:
+                    self._add_initial_content()
             else:
                 print(" Creando nueva base vectorial...")
                 self.vector_store = Chroma(
@@ -58,199 +68,120 @@ class VectorStoreManager:
             print(f"❌ Error inicializando vector store: {e}")
             # Fallback: crear en memoria
             self.vector_store = Chroma(embedding_function=self.embeddings)
+            self.catalog.path = None
+            self.catalog.clear()
             print(" Usando vector store en memoria como fallback")
-    
+
+    def _load_catalog(self, count: Optional[int] = None):
+        """Carga el catálogo persistido o lo reconstruye una vez desde los metadatos de Chroma"""
+        if self.catalog.load() and (count is None or len(self.catalog) == count):
+            return
+
+        try:
+            data = self.vector_store.get(include=["metadatas"])
+            self.catalog.clear()
+            self.catalog.add(zip(data["ids"], [metadata or {} for metadata in data["metadatas"]]))
+            self.catalog.save()
+            print(f" Catálogo de metadatos reconstruido ({len(self.catalog)} documentos)")
+        except Exception as e:
+            print(f"⚠️ No se pudo reconstruir el catálogo: {e}")
+
     def _add_initial_content(self):
         """Agrega contenido educativo inicial"""
         print(" Agregando contenido educativo inicial...")
         
-        initial_documents = [
-            # Vectores básicos
-            Document(
-                page_content="""
-                Un vector es una cantidad que tiene tanto magnitud como dirección. 
-                En el plano cartesiano, un vector se puede representar como un par ordenado (x, y).
-                La magnitud de un vector v = (x, y) se calcula como ||v|| = √(x² + y²).
-                Los vectores se pueden sumar componente a componente: (a, b) + (c, d) = (a+c, b+d).
-                """,
-                metadata={"topic": "vectores", "level": 1, "subtopic": "definicion_basica"}
-            ),
-            
-            Document(
-                page_content="""
-                Las operaciones básicas con vectores incluyen:
-                1. Suma: u + v = (u₁ + v₁, u₂ + v₂)
-                2. Resta: u - v = (u₁ - v₁, u₂ - v₂)  
-                3. Multiplicación por escalar: k·v = (k·v₁, k·v₂)
-                4. Producto punto: u·v = u₁v₁ + u₂v₂
-                El producto punto da como resultado un escalar, no un vector.
-                """,
-                metadata={"topic": "vectores", "level": 2, "subtopic": "operaciones"}
-            ),
-            
-            Document(
-                page_content="""
-                El producto punto (o producto escalar) entre dos vectores u = (u₁, u₂) y v = (v₁, v₂) 
-                se define como u·v = u₁v₁ + u₂v₂ = ||u|| ||v|| cos(θ), donde θ es el ángulo entre los vectores.
-                Si el producto punto es cero, los vectores son perpendiculares (ortogonales).
-                Si es positivo, el ángulo es agudo; si es negativo, el ángulo es obtuso.
-                """,
-                metadata={"topic": "producto_punto", "level": 3, "subtopic": "definicion"}
-            ),
-            
-            # Matrices básicas
-            Document(
-                page_content="""
-                Una matriz es un arreglo rectangular de números organizados en filas y columnas.
-                Una matriz de m×n tiene m filas y n columnas. Las operaciones básicas incluyen:
-                - Suma de matrices (del mismo tamaño): se suman elemento a elemento
-                - Multiplicación por escalar: se multiplica cada elemento por el escalar
-                - Multiplicación de matrices: el elemento (i,j) es el producto punto de la fila i por la columna j
-                """,
-                metadata={"topic": "matrices", "level": 2, "subtopic": "definicion_operaciones"}
-            ),
-            
-            Document(
-                page_content="""
-                El determinante de una matriz 2×2 es: det(A) = ad - bc para A = [[a,b],[c,d]].
-                Para matrices 3×3, se puede usar la regla de Sarrus o expansión por cofactores.
-                El determinante es cero si y solo si la matriz es singular (no invertible).
-                Una matriz es invertible si su determinante es diferente de cero.
-                """,
-                metadata={"topic": "matrices", "level": 3, "subtopic": "determinante"}
-            ),
-            
-            # Sistemas lineales
-            Document(
-                page_content="""
-                Un sistema de ecuaciones lineales se puede escribir en forma matricial como Ax = b,
-                donde A es la matriz de coeficientes, x es el vector de incógnitas, y b es el vector de términos independientes.
-                Los métodos de solución incluyen: eliminación gaussiana, regla de Cramer, y factorización LU.
-                Un sistema puede tener solución única, infinitas soluciones, o no tener solución.
-                """,
-                metadata={"topic": "sistemas_lineales", "level": 3, "subtopic": "forma_matricial"}
-            ),
-            
-            # Espacios vectoriales
-            Document(
-                page_content="""
-                Un espacio vectorial es un conjunto de vectores con operaciones de suma y multiplicación por escalar
-                que satisfacen ciertos axiomas. Los vectores en R² forman un espacio vectorial de dimensión 2.
-                Una base es un conjunto de vectores linealmente independientes que generan todo el espacio.
-                La dimensión de un espacio vectorial es el número de vectores en cualquier base.
-                """,
-                metadata={"topic": "espacios_vectoriales", "level": 4, "subtopic": "definicion"}
-            ),
-            
-            Document(
-                page_content="""
-                Vectores linealmente independientes son aquellos donde ninguno puede escribirse como
-                combinación lineal de los otros. En R², dos vectores son linealmente independientes
-                si no son paralelos (colineales). En R³, tres vectores son linealmente independientes
-                si no son coplanares. La independencia lineal se puede verificar con determinantes.
-                """,
-                metadata={"topic": "espacios_vectoriales", "level": 4, "subtopic": "independencia_lineal"}
-            )
-        ]
+        initial_documents = get_initial_documents()
         
         # Agregar documentos a la base vectorial
         self.add_documents(initial_documents)
         print(f" {len(initial_documents)} documentos iniciales agregados")
     
-    def similarity_search(self, query: str, k: int = None, filter_level: int = None) -> List[Document]:
-        """Busca documentos similares al query"""
-        if not self.vector_store:
+    def _search_by_vector(self, query_vector: List[float], k: int,
+                          filter_level: int = None) -> List[Document]:
+        """Busca en Chroma a partir de un embedding ya calculado"""
+        if self.vector_store is None:
             return []
         
-        k = k or settings.RETRIEVAL_TOP_K
+        if not filter_level:
+            return self.vector_store.similarity_search_by_vector(query_vector, k=k)
         
-        try:
-            # Construir filtros si se especifica nivel
-            if filter_level:
-                # Buscar documentos del nivel del estudiante o menores
-                # Nota: Chroma usa diferentes sintaxis para filtros según la versión
-                try:
-                    # Intentar nueva sintaxis
-                    docs = self.vector_store.similarity_search(
-                        query, 
-                        k=k, 
-                        filter={"level": {"$lte": filter_level}}
-                    )
-                except:
-                    # Fallback: buscar sin filtro y filtrar manualmente
-                    all_docs = self.vector_store.similarity_search(query, k=k*2)
-                    docs = [doc for doc in all_docs if doc.metadata.get("level", 3) <= filter_level][:k]
-            else:
-                docs = self.vector_store.similarity_search(query, k=k)
-            
-            return docs
-            
-        except Exception as e:
-            print(f"❌ Error en búsqueda: {e}")
+        level_counts = self.catalog.level_counts()
+        levels = [level for level in level_counts if level <= filter_level]
+        # Sin filtro solo si el catálogo confirma que todos los niveles caben; un catálogo
+        # vacío (reconstrucción fallida, base en memoria) no confirma nada
+        if level_counts and len(levels) == len(level_counts):
+            return self.vector_store.similarity_search_by_vector(query_vector, k=k)
+        if level_counts and not levels:
             return []
+        
+        # Una sola consulta filtrada: los niveles conocidos del catálogo o, sin catálogo, $lte
+        where = {"level": {"$in": levels}} if level_counts else {"level": {"$lte": filter_level}}
+        return self.vector_store.similarity_search_by_vector(query_vector, k=k, filter=where)
     
     def add_documents(self, documents: List[Document]):
         """Agrega documentos a la base vectorial"""
-        if not self.vector_store:
+        if self.vector_store is None:
             print("❌ Vector store no inicializado")
             return
-        
+        super().add_documents(documents)
+    
+    def _upsert_batch(self, ids: List[str], documents: List[Document]):
+        """Upsert de un lote en Chroma: los ids repetidos se reemplazan en lugar de duplicarse"""
+        self.vector_store.add_documents(documents, ids=ids)
+        self.catalog.add(zip(ids, [doc.metadata for doc in documents]))
+    
+    def _commit(self):
+        """Persiste la colección (en versiones que lo requieren) y el catálogo"""
         try:
-            self.vector_store.add_documents(documents)
-            # Intentar persistir si es posible
-            try:
-                self.vector_store.persist()
-            except:
-                pass  # persist() puede no estar disponible en todas las versiones
-            print(f" {len(documents)} documentos agregados")
-        except Exception as e:
-            print(f"❌ Error agregando documentos: {e}")
+            self.vector_store.persist()
+        except:
+            pass  # persist() puede no estar disponible en todas las versiones
+        self.catalog.save()
     
-    def add_text_with_metadata(self, texts: List[str], metadatas: List[Dict[str, Any]]):
-        """Agrega textos con metadatos"""
-        if not self.vector_store:
-            print("❌ Vector store no inicializado")
+    def delete_documents(self, ids: List[str]):
+        """Elimina documentos por id"""
+        if self.vector_store is None or not ids:
             return
         
         try:
-            self.vector_store.add_texts(texts, metadatas=metadatas)
-            try:
-                self.vector_store.persist()
-            except:
-                pass
-            print(f" {len(texts)} textos agregados")
+            self.vector_store.delete(ids=ids)
+            self.catalog.remove(ids)
+            self.catalog.save()
+            self._invalidate_query_cache()
+            print(f" {len(ids)} documentos eliminados")
         except Exception as e:
-            print(f"❌ Error agregando textos: {e}")
+            print(f"❌ Error eliminando documentos: {e}")
     
     def get_collection_stats(self) -> Dict[str, Any]:
         """Obtiene estadísticas de la colección"""
-        if not self.vector_store:
+        if self.vector_store is None:
             return {"count": 0, "status": "no_initialized"}
         
         try:
-            # Intentar obtener el count de diferentes maneras
-            count = 0
-            try:
-                count = self.vector_store._collection.count()
-            except:
-                try:
-                    # Alternativa: hacer una búsqueda amplia
-                    docs = self.vector_store.similarity_search("", k=1000)
-                    count = len(docs)
-                except:
-                    count = "unknown"
-            
+            # El catálogo mantiene los conteos: no hace falta consultar Chroma
+            summary = self.catalog.get_summary()
             return {
-                "count": count,
+                "count": summary["count"],
                 "status": "active",
-                "persist_directory": self.persist_directory
+                "persist_directory": self.persist_directory,
+                "topics": summary["topics"],
+                "levels": summary["levels"],
+                "query_cache": self.get_query_cache_stats()
             }
         except Exception as e:
             return {"count": 0, "status": f"error: {e}"}
     
+    def warm(self):
+        """Abre la colección de Chroma para que la primera consulta no pague la conexión"""
+        if self.vector_store is not None:
+            try:
+                self.vector_store._collection.count()
+            except Exception:
+                pass
+    
     def clear_collection(self):
         """Limpia toda la colección (usar con cuidado)"""
-        if self.vector_store:
+        if self.vector_store is not None:
             try:
                 # Intentar diferentes métodos para limpiar
                 try:
@@ -261,63 +192,40 @@ class VectorStoreManager:
                     if os.path.exists(self.persist_directory):
                         shutil.rmtree(self.persist_directory)
                 
+                self.catalog.clear()
+                self.catalog.delete_file()
+                self._invalidate_query_cache()
                 print("🗑️ Colección limpiada")
                 self._initialize_vector_store()
             except Exception as e:
                 print(f"❌ Error limpiando colección: {e}")
     
-    def search_by_topic(self, topic: str, level: int = None, k: int = 5) -> List[Document]:
-        """Busca documentos por tema específico"""
-        if not self.vector_store:
+    def _vectors_for_ids(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        """Embeddings guardados en Chroma para esos ids (una lectura, sin llamadas a la API)"""
+        if self.vector_store is None or not ids:
+            return {}
+        data = self.vector_store.get(ids=ids, include=["embeddings"])
+        return {doc_id: np.asarray(vector, dtype=np.float32)
+                for doc_id, vector in zip(data["ids"], data["embeddings"])}
+    
+    def _documents_for_topic(self, topic: str, ids: List[str], level: Optional[int], k: int,
+                             query_vector: Optional[List[float]] = None) -> List[Document]:
+        """Lee los documentos del tema; con vector, Chroma ordena dentro del filtro exacto"""
+        if self.vector_store is None or not ids:
             return []
         
-        try:
-            # Construir query de búsqueda más específica
-            search_query = f"{topic} álgebra lineal"
-            
+        if query_vector is not None and len(ids) > k:
+            conditions = [{"topic": {"$in": self.catalog.match_topics(topic)}}]
             if level:
-                # Filtrar por nivel si se especifica
-                docs = self.similarity_search(search_query, k=k*2, filter_level=level)
-            else:
-                docs = self.similarity_search(search_query, k=k)
-            
-            # Filtrar por tema en los metadatos
-            filtered_docs = []
-            for doc in docs:
-                doc_topic = doc.metadata.get("topic", "").lower()
-                if topic.lower() in doc_topic or doc_topic in topic.lower():
-                    filtered_docs.append(doc)
-            
-            return filtered_docs[:k]
-            
-        except Exception as e:
-            print(f"❌ Error buscando por tema: {e}")
-            return []
-    
-    def add_user_content(self, content: str, topic: str, level: int = 3, subtopic: str = "user_generated"):
-        """Permite agregar contenido generado por el usuario o sistema"""
-        document = Document(
-            page_content=content,
-            metadata={
-                "topic": topic,
-                "level": level,
-                "subtopic": subtopic,
-                "source": "user_generated"
-            }
-        )
-        self.add_documents([document])
-    
-    def get_topics_summary(self) -> Dict[str, int]:
-        """Obtiene resumen de temas disponibles"""
-        try:
-            # Hacer búsqueda amplia para obtener muestra de documentos
-            sample_docs = self.vector_store.similarity_search("matemáticas álgebra", k=50)
-            
-            topics_count = {}
-            for doc in sample_docs:
-                topic = doc.metadata.get("topic", "unknown")
-                topics_count[topic] = topics_count.get(topic, 0) + 1
-            
-            return topics_count
-        except:
-            return {"vectores": 3, "matrices": 3, "sistemas": 2, "espacios_vectoriales": 2}
\ No newline at end of file
+                conditions.append({"level": {"$lte": level}})
+            where = conditions[0] if len(conditions) == 1 else {"$and": conditions}
+            return self.vector_store.similarity_search_by_vector(query_vector, k=k, filter=where)
+        
+        # Sin vector basta con leer los documentos por id: no hay llamada de embeddings
+        selected = ids[:k]
+        data = self.vector_store.get(ids=selected, include=["documents", "metadatas"])
+        by_id = {
+            doc_id: Document(page_content=content, metadata=metadata or {})
+            for doc_id, content, metadata in zip(data["ids"], data["documents"], data["metadatas"])
+        }
+        return [by_id[doc_id] for doc_id in selected if doc_id in by_id]
@@ -0,0 +1,28 @@
+"""Configuración común de pytest: las cachés persistentes van a un directorio temporal"""
+
+import sys
+import os
+
+import pytest
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import settings
+
+
+@pytest.fixture(autouse=True)
+def isolated_caches(tmp_path, monkeypatch):
+    """Cada test usa sus propias cachés de respuestas y embeddings (nada queda en ./cache)"""
+    import agents.response_cache as response_cache
+    import rag.embedding_cache as embedding_cache
+
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_PATH", str(tmp_path / "responses.sqlite3"))
+    monkeypatch.setattr(settings, "EMBEDDING_CACHE_PATH", str(tmp_path / "embeddings.sqlite3"))
+    monkeypatch.setattr(response_cache, "_response_cache", None)
+    monkeypatch.setattr(embedding_cache, "_caches", {})
+    yield
+    if response_cache._response_cache is not None and response_cache._response_cache.store is not None:
+        response_cache._response_cache.store.close()
+    for cache in embedding_cache._caches.values():
+        cache.close()
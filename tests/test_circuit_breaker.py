@@ -0,0 +1,116 @@
+"""Test del circuit breaker de embeddings y del fallback a palabras clave"""
+
+import sys
+import os
+import time
+import asyncio
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag.circuit_breaker import CircuitBreaker, CircuitOpenError
+from config.settings import settings
+
+
+async def _fail():
+    raise ConnectionError("sin red")
+
+
+async def _ok():
+    return "ok"
+
+
+def test_breaker_opens_and_recovers():
+    """closed -> open tras N fallos -> half_open con una sola prueba -> closed"""
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=0.05)
+
+    for _ in range(2):
+        try:
+            asyncio.run(breaker.call(_fail))
+        except ConnectionError:
+            pass
+    assert breaker.state == CircuitBreaker.OPEN
+
+    try:
+        asyncio.run(breaker.call(_ok))
+        assert False, "el circuito abierto no debe dejar pasar llamadas"
+    except CircuitOpenError:
+        pass
+
+    assert not breaker.is_available()
+    time.sleep(0.06)
+    assert breaker.is_available() and breaker.is_available()  # consultar no reserva la prueba
+    assert breaker.allow_request()
+    assert not breaker.is_available()
+    assert not breaker.allow_request()  # solo una prueba en half_open
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    print("✅ Circuit breaker: apertura, prueba half-open y recuperación")
+
+
+def test_breaker_times_out_slow_calls():
+    """Una llamada más lenta que call_timeout cuenta como fallo"""
+    breaker = CircuitBreaker("lento", failure_threshold=1, call_timeout=0.05)
+
+    async def slow():
+        await asyncio.sleep(1)
+
+    try:
+        asyncio.run(breaker.call(slow))
+    except asyncio.TimeoutError:
+        pass
+    assert breaker.state == CircuitBreaker.OPEN
+    print("✅ Timeout por llamada abre el circuito")
+
+
+def test_sync_call_respects_explicit_timeout():
+    """call_sync con timeout deja de esperar a un cliente colgado y cuenta el fallo"""
+    breaker = CircuitBreaker("sync", failure_threshold=1)
+    start = time.perf_counter()
+    try:
+        breaker.call_sync(time.sleep, 1, timeout=0.05)
+        assert False, "debió vencer el timeout"
+    except TimeoutError:
+        pass
+    assert time.perf_counter() - start < 0.5
+    assert breaker.state == CircuitBreaker.OPEN
+    print("✅ call_sync con timeout explícito")
+
+
+class _FailingEmbeddings:
+    def __init__(self):
+        self.calls = 0
+
+    async def aembed_query(self, text):
+        self.calls += 1
+        raise ConnectionError("API caída")
+
+
+def test_hybrid_falls_back_to_keywords_per_query():
+    """Con embeddings caídos cada consulta devuelve BM25 y, abierto el circuito, ni se intentan"""
+    from rag.hybrid_store import HybridRAGManager
+
+    previous = settings.HYBRID_RETRIEVAL_MODE
+    settings.HYBRID_RETRIEVAL_MODE = "vector"
+    try:
+        rag = HybridRAGManager()
+        rag.use_embeddings = True
+        rag.vector_store = object()
+        rag.embeddings = _FailingEmbeddings()
+        rag.embedding_breaker = CircuitBreaker("embeddings", failure_threshold=2, reset_timeout=60)
+
+        for _ in range(4):
+            results = asyncio.run(rag.similarity_search("producto punto", k=2))
+            assert results and results[0].metadata["topic"] == "producto_punto"
+    finally:
+        settings.HYBRID_RETRIEVAL_MODE = previous
+
+    assert rag.embeddings.calls == 2
+    print("✅ Fallback a palabras clave sin esperar a la API caída")
+
+
+if __name__ == "__main__":
+    test_breaker_opens_and_recovers()
+    test_breaker_times_out_slow_calls()
+    test_sync_call_respects_explicit_timeout()
+    test_hybrid_falls_back_to_keywords_per_query()
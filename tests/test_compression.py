@@ -0,0 +1,71 @@
+"""Test de la compresión extractiva del contexto"""
+
+import sys
+import os
+import asyncio
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.documents import Document
+from rag.compression import ExtractiveCompressor, split_sentences, estimate_tokens
+from rag.seed_content import get_initial_documents
+from config.settings import settings
+
+
+def test_split_keeps_formulas_intact():
+    """Las listas numeradas, decimales y fórmulas LaTeX no se parten"""
+    text = """Las operaciones incluyen:
+    1. Suma: u + v = (u₁ + v₁, u₂ + v₂)
+    El valor es 3.5 aproximadamente. La norma es $||v|| = \\sqrt{x^2 + y^2}. $ Fin de la idea.
+    $$A = \\begin{pmatrix} a & b \\\\
+    c & d \\end{pmatrix}$$"""
+    sentences = split_sentences(text)
+    assert "1. Suma: u + v = (u₁ + v₁, u₂ + v₂)" in sentences
+    assert "El valor es 3.5 aproximadamente." in sentences
+    assert "La norma es $||v|| = \\sqrt{x^2 + y^2}. $ Fin de la idea." in sentences
+    assert sentences[-1].startswith("$$A =") and sentences[-1].endswith("$$")
+    print("✅ División en oraciones sin cortar fórmulas")
+
+
+def test_compressor_keeps_relevant_sentences_within_budget():
+    """Se elige la oración del determinante y se respeta el presupuesto de tokens"""
+    documents = get_initial_documents()
+    compressor = ExtractiveCompressor(max_tokens=40, scorer="bm25")
+    context = compressor.compress("¿cómo calculo el determinante de una matriz 2×2?", documents)
+
+    assert "det(A) = ad - bc para A = [[a,b],[c,d]]." in context
+    assert estimate_tokens(context) <= 40 + 2
+    assert "perpendiculares" not in context
+    print(f"✅ Contexto comprimido a ~{estimate_tokens(context)} tokens")
+
+
+def test_retriever_uses_extractive_mode_without_llm():
+    """En modo extractivo el recuperador no hace la llamada de resumen al LLM"""
+    from agents.retriever_agent import RetrieverAgent
+
+    class CountingLLM:
+        calls = 0
+
+        async def ainvoke(self, messages):
+            CountingLLM.calls += 1
+            raise RuntimeError("no debería llamarse")
+
+    previous = settings.CONTEXT_COMPRESSION_MODE
+    settings.CONTEXT_COMPRESSION_MODE = "extractive"
+    try:
+        agent = RetrieverAgent(CountingLLM(), vector_store_manager=None)
+        documents = [Document(page_content="El producto punto es u·v = u₁v₁ + u₂v₂. Es un escalar.")]
+        content = asyncio.run(agent._process_retrieved_content(documents, {"level": 2}, query="producto punto"))
+    finally:
+        settings.CONTEXT_COMPRESSION_MODE = previous
+
+    assert "u·v = u₁v₁ + u₂v₂" in content
+    assert CountingLLM.calls == 0
+    print("✅ Recuperador sin llamada de resumen al LLM")
+
+
+if __name__ == "__main__":
+    test_split_keeps_formulas_intact()
+    test_compressor_keeps_relevant_sentences_within_budget()
+    test_retriever_uses_extractive_mode_without_llm()
@@ -0,0 +1,111 @@
+"""Test de la caché persistente de embeddings"""
+
+import sys
+import os
+import asyncio
+import tempfile
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.embeddings import Embeddings
+from rag.embedding_cache import EmbeddingCache, CachedEmbeddings, make_cache_key
+
+
+class CountingEmbeddings(Embeddings):
+    """Embeddings deterministas que cuentan cuántos textos se calcularon"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += len(texts)
+        return [[float(len(text)), 1.0, 0.5] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_cache_avoids_recomputation():
+    """Textos repetidos (incluso con otros espacios) no vuelven a calcularse"""
+    with tempfile.TemporaryDirectory() as tmp:
+        base = CountingEmbeddings()
+        cache = EmbeddingCache(os.path.join(tmp, "emb.sqlite3"), max_bytes=1024 * 1024)
+        embeddings = CachedEmbeddings(base, cache, "test-model")
+
+        first = embeddings.embed_documents(["un vector", "una matriz", "un vector"])
+        assert base.calls == 2
+        second = embeddings.embed_documents(["  un   vector ", "una matriz"])
+        assert base.calls == 2
+        assert second[0] == first[0]
+
+        query = asyncio.run(embeddings.aembed_query("una matriz"))
+        assert query == first[1]
+        assert base.calls == 2
+        cache.close()
+        print(f"✅ Caché evitó recalcular: {base.calls} llamadas reales")
+
+
+def test_cache_persists_between_instances():
+    """Una nueva instancia sobre el mismo archivo reutiliza los embeddings"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "emb.sqlite3")
+        cache = EmbeddingCache(path, max_bytes=1024 * 1024)
+        CachedEmbeddings(CountingEmbeddings(), cache, "test-model").embed_query("producto punto")
+        cache.close()
+
+        base = CountingEmbeddings()
+        cache = EmbeddingCache(path, max_bytes=1024 * 1024)
+        CachedEmbeddings(base, cache, "test-model").embed_query("producto punto")
+        assert base.calls == 0
+
+        # Otro modelo usa otra clave
+        assert make_cache_key("otro", "producto punto") != make_cache_key("test-model", "producto punto")
+        cache.close()
+        print("✅ Caché persistente entre reinicios")
+
+
+def test_cache_lru_eviction():
+    """Se expulsan las entradas con acceso más antiguo al superar el límite"""
+    with tempfile.TemporaryDirectory() as tmp:
+        # Cada vector de 3 float32 ocupa 12 bytes: caben 3 entradas
+        cache = EmbeddingCache(os.path.join(tmp, "emb.sqlite3"), max_bytes=36)
+        cache.put_many("m", {"a": [1, 2, 3]})
+        cache.put_many("m", {"b": [1, 2, 3]})
+        cache.put_many("m", {"c": [1, 2, 3]})
+        cache.get_many(["a"])  # "a" pasa a ser la más reciente
+        cache.put_many("m", {"d": [1, 2, 3]})
+
+        remaining = cache.get_many(["a", "b", "c", "d"])
+        assert "b" not in remaining
+        assert "a" in remaining and "d" in remaining
+        assert cache.get_stats()["bytes"] <= 36
+        cache.close()
+        print("✅ Expulsión LRU correcta")
+
+
+def test_cache_hits_do_not_write():
+    """Los aciertos solo leen; el último acceso se escribe en lote al guardar"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = EmbeddingCache(os.path.join(tmp, "emb.sqlite3"), max_bytes=1024 * 1024)
+        cache.put_many("m", {"a": [1, 2, 3], "b": [4, 5, 6]})
+        statements = []
+        cache._conn.set_trace_callback(statements.append)
+
+        for _ in range(5):
+            assert len(cache.get_many(["a", "b"])) == 2
+        assert all(statement.startswith("SELECT") for statement in statements)
+
+        statements.clear()
+        cache.put_many("m", {"c": [7, 8, 9]})
+        updates = [statement for statement in statements if statement.startswith("UPDATE")]
+        assert len(updates) == 2 and statements.count("COMMIT") == 1
+        cache.close()
+        print("✅ Aciertos sin escrituras: último acceso volcado en lote")
+
+
+if __name__ == "__main__":
+    test_cache_avoids_recomputation()
+    test_cache_persists_between_instances()
+    test_cache_lru_eviction()
+    test_cache_hits_do_not_write()
@@ -0,0 +1,66 @@
+"""Test del clasificador local de interacciones y del fallback al LLM del coordinador"""
+
+import sys
+import os
+import asyncio
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.coordinator_agent import CoordinatorAgent
+from agents.interaction_classifier import INTERACTION_TYPES, extract_features, get_interaction_classifier
+from tests.test_response_cache import CountingLLM
+
+
+def test_classifies_unseen_inputs_with_confidence():
+    """Entradas que no están en los ejemplos de entrenamiento se clasifican con confianza"""
+    classifier = get_interaction_classifier()
+    cases = {
+        "¿Qué es una matriz identidad?": "question",
+        "Buenos días!": "greeting",
+        "Dame ejemplos de vectores": "examples_request",
+        "¿Cómo se calcula el determinante?": "procedure_request",
+        "Explícame el producto punto": "explanation_request",
+        "resuelve el sistema 2x + y = 5": "calculation_request",
+        "me salió 7": "answer",
+        "gracias!": "statement",
+    }
+    for text, expected in cases.items():
+        label, confidence = classifier.classify(text)
+        assert label == expected, (text, label)
+        assert label in INTERACTION_TYPES and 0.6 <= confidence <= 1.0
+    assert "re:vector_literal" in extract_features("el resultado es (4, 6)")
+    print("✅ Clasificador: tipos correctos con confianza alta")
+
+
+def test_greeting_with_request_is_not_a_greeting():
+    """Un saludo seguido de un pedido sobre un tema se clasifica por el pedido"""
+    classifier = get_interaction_classifier()
+    label, _ = classifier.classify("Buenos días, necesito ayuda con matrices")
+    assert label != "greeting"
+    assert classifier.classify("Hola, buenos días")[0] == "greeting"
+    print("✅ Clasificador: saludo con pedido no recibe la plantilla de saludo")
+
+
+def test_coordinator_calls_llm_only_when_unsure():
+    """Con confianza suficiente no hay llamada al LLM; si es baja, se consulta y se valida"""
+    llm = CountingLLM()
+    coordinator = CoordinatorAgent(llm)
+    coordinator.response_cache = None
+
+    assert asyncio.run(coordinator._classify_interaction("¿Qué es un vector?")) == "question"
+    assert llm.calls == 0
+
+    # Una entrada ambigua consulta al LLM; una categoría inválida cae a la predicción local
+    ambiguous = "¿Me puedes ayudar con vectores?"
+    local_type, confidence = get_interaction_classifier().classify(ambiguous)
+    assert confidence < 0.6
+    assert asyncio.run(coordinator._classify_interaction(ambiguous)) == local_type
+    assert llm.calls == 1
+    print("✅ Coordinador: el LLM solo clasifica entradas dudosas")
+
+
+if __name__ == "__main__":
+    test_classifies_unseen_inputs_with_confidence()
+    test_greeting_with_request_is_not_a_greeting()
+    test_coordinator_calls_llm_only_when_unsure()
@@ -0,0 +1,200 @@
+"""Test de la búsqueda por palabras clave (BM25)"""
+
+import sys
+import os
+import time
+import asyncio
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.documents import Document
+from rag.bm25 import BM25Index
+from rag.fusion import reciprocal_rank_fusion
+from config.settings import settings
+from utils.text_analysis import analyze, fold
+from utils.fuzzy_match import TrigramIndex
+
+
+def _docs():
+    return [
+        Document(page_content="Un vector tiene magnitud y dirección", metadata={"level": 1}),
+        Document(page_content="La matriz identidad tiene unos en la diagonal", metadata={"level": 2}),
+        Document(page_content="El determinante de una matriz 2x2 es ad - bc", metadata={"level": 3}),
+        Document(page_content="Una matriz es un arreglo de números; una matriz cuadrada tiene "
+                              "igual número de filas y columnas", metadata={"level": 2}),
+    ]
+
+
+def test_spanish_analyzer():
+    """Acentos, stopwords, letras sueltas y variantes morfológicas se normalizan igual"""
+    assert fold("Eliminación Gaussiana") == "eliminacion gaussiana"
+    assert analyze("A es a la matriz B") == ["matriz"]
+    assert analyze("¿Qué es la eliminación gaussiana?") == analyze("eliminacion de Gauss")
+    assert analyze("matrices ortogonales") == analyze("matriz ortogonal")
+    print("✅ Analizador en español")
+
+
+def test_bm25_ranking_and_filters():
+    """BM25 ordena por relevancia, respeta el filtro y no devuelve documentos sin términos"""
+    index = BM25Index()
+    index.add(_docs())
+
+    results = index.search("determinante de una matriz", k=3)
+    assert results[0][0].page_content.startswith("El determinante")
+    assert all(score > 0 for _, score in results)
+
+    filtered = index.search("determinante matriz", k=3, predicate=lambda d: d.metadata["level"] <= 2)
+    assert filtered and all(doc.metadata["level"] <= 2 for doc, _ in filtered)
+
+    assert index.search("a", k=3) == []
+    assert index.search("¿Qué es el DETERMINANTE?", k=1)[0][0].page_content.startswith("El determinante")
+    assert index.search("polinomio característico", k=3) == []
+    print("✅ BM25: ranking, filtro por nivel y sin falsos positivos")
+
+
+def test_reciprocal_rank_fusion_dedupes_by_content():
+    """RRF premia lo que aparece en ambas listas y fusiona duplicados por contenido"""
+    a, b, c = _docs()[:3]
+    duplicate = Document(page_content="  La matriz identidad tiene unos   en la diagonal", metadata={})
+    fused = reciprocal_rank_fusion([[a, b], [duplicate, c]], k=60)
+    assert [doc.page_content for doc in fused] == [b.page_content, a.page_content, c.page_content]
+    assert fused[0] is b
+    print("✅ RRF con deduplicación por contenido")
+
+
+class _SlowEmbeddings:
+    async def aembed_query(self, text):
+        await asyncio.sleep(1.0)
+        return [0.0]
+
+
+def test_fused_search_respects_latency_budget():
+    """Si la rama vectorial excede el presupuesto, se devuelven los resultados BM25"""
+    from rag.hybrid_store import HybridRAGManager
+
+    rag = HybridRAGManager()
+    rag.use_embeddings = True
+    rag.vector_store = object()
+    rag.embeddings = _SlowEmbeddings()
+    previous = settings.HYBRID_VECTOR_BUDGET_MS
+    settings.HYBRID_VECTOR_BUDGET_MS = 100
+    try:
+        start = time.perf_counter()
+        results = asyncio.run(rag.similarity_search("producto punto perpendicular", k=2))
+        elapsed = time.perf_counter() - start
+    finally:
+        settings.HYBRID_VECTOR_BUDGET_MS = previous
+
+    assert elapsed < 0.5
+    assert results and results[0].metadata["topic"] == "producto_punto"
+    print(f"✅ Búsqueda fusionada dentro del presupuesto ({elapsed * 1000:.0f} ms)")
+
+
+def test_fused_search_survives_keyword_failure():
+    """Si falla la rama BM25 se esperan igual ambas ramas y se usan los resultados vectoriales"""
+    from rag.hybrid_store import HybridRAGManager
+
+    rag = HybridRAGManager()
+    vector_docs = _docs()[:2]
+    unhandled = []
+
+    async def vector_search(query, k, filter_level=None):
+        await asyncio.sleep(0.01)
+        return vector_docs
+
+    def broken_keyword_search(query, k, filter_level=None):
+        raise RuntimeError("índice corrupto")
+
+    rag._vector_search = vector_search
+    rag._simple_keyword_search = broken_keyword_search
+
+    async def run():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: unhandled.append(context))
+        return await rag._fused_search("producto punto", k=2)
+
+    results = asyncio.run(run())
+    assert [doc.page_content for doc in results] == [doc.page_content for doc in vector_docs]
+    assert not unhandled
+    print("✅ Búsqueda fusionada tolera una falla de BM25 sin tareas colgando")
+
+
+def test_keyword_corpus_ready_before_probe_and_swapped_whole():
+    """El índice de respaldo existe antes del hilo de prueba y cada cambio publica (documentos, índice) juntos"""
+    from rag.hybrid_store import HybridRAGManager
+
+    seen_at_probe = []
+
+    class RecordingManager(HybridRAGManager):
+        def _try_initialize_full_rag(self):
+            # Como si Chroma hubiera cargado: así se lanza el hilo de prueba
+            self.use_embeddings = True
+
+        def _probe_embeddings(self):
+            seen_at_probe.append(self._corpus)
+
+    rag = RecordingManager()
+    rag._probe_thread.join(timeout=5)
+    documents, keyword_index = seen_at_probe[0]
+    assert documents and len(keyword_index) == len(documents)
+
+    before = rag._corpus
+    rag.use_embeddings = False
+    rag.add_documents(_docs())
+    documents, keyword_index = rag._corpus
+    assert documents is not before[0] and keyword_index is not before[1]
+    assert len(before[0]) == len(before[1])
+    assert len(documents) == len(keyword_index) == len(before[0]) + len(_docs())
+    print("✅ Corpus de palabras clave listo antes de la prueba y publicado de una vez")
+
+
+def test_trigram_corrections():
+    """Los errores de tipeo se corrigen contra el vocabulario; lo desconocido no se fuerza"""
+    vocabulary = TrigramIndex(analyze("determinante matriz ortogonal transpuesta vector"))
+    assert vocabulary.correct_all(analyze("determinnte matris ortogonl")) == analyze("determinante matriz ortogonal")
+    assert vocabulary.correct("clima") is None
+
+    # La memoria de correcciones está acotada: un término nuevo expulsa al menos usado
+    bounded = TrigramIndex(analyze("determinante matriz"), cache_size=2)
+    for term in ("determinnte", "matris", "clima", "ortogonl"):
+        bounded.correct(term)
+    assert len(bounded._cache) == 2
+    assert bounded.correct("matris") == "matriz"
+
+    index = BM25Index()
+    index.add(_docs())
+    assert index.search("determinnte", k=1)[0][0].page_content.startswith("El determinante")
+    print("✅ Corrección de errores de tipeo con trigramas")
+
+
+def test_assessor_topic_tolerates_typos():
+    """Las palabras clave del evaluador reconocen acentos faltantes y errores de tipeo sin LLM"""
+    from agents.assessor_agent import AssessorAgent
+
+    assessor = AssessorAgent(llm=None)
+    assert asyncio.run(assessor._identify_specific_topic("¿Cómo calculo el determinnte?")) == "determinantes"
+    assert asyncio.run(assessor._identify_specific_topic("multiplicacion de matrises")) == "multiplicacion_matrices"
+    print("✅ Detección de tema tolerante a errores")
+
+
+def test_assessor_does_not_correct_ordinary_words():
+    """Palabras comunes no se "corrigen" hacia un tema ("respuesta" no es "resta")"""
+    from agents.assessor_agent import match_topic_keywords
+
+    assert match_topic_keywords("mi respuesta es 4") is None
+    assert match_topic_keywords("Las respuestas son 3 y 5") is None
+    # Aun sin la lista de palabras conocidas, la distancia de edición descarta el candidato
+    assert TrigramIndex(analyze("resta")).correct("respuest") is None
+    print("✅ Las palabras comunes no se confunden con temas")
+
+
+if __name__ == "__main__":
+    test_spanish_analyzer()
+    test_bm25_ranking_and_filters()
+    test_reciprocal_rank_fusion_dedupes_by_content()
+    test_fused_search_respects_latency_budget()
+    test_fused_search_survives_keyword_failure()
+    test_keyword_corpus_ready_before_probe_and_swapped_whole()
+    test_trigram_corrections()
+    test_assessor_topic_tolerates_typos()
+    test_assessor_does_not_correct_ordinary_words()
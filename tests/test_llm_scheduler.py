@@ -0,0 +1,177 @@
+"""Test del planificador de llamadas al LLM contra un servidor falso local"""
+
+import sys
+import os
+import json
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_openai import ChatOpenAI
+from agents.base_agent import BaseAgent
+from rag.embedding_cache import ScheduledEmbeddings
+from utils.llm_scheduler import BACKGROUND, INTERACTIVE, LLMScheduler, TokenBucket
+
+
+class _RateLimitedHandler(BaseHTTPRequestHandler):
+    """Responde 429 las primeras `rate_limited` veces y luego una respuesta de chat válida"""
+
+    rate_limited = 0
+    requests = 0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        type(self).requests += 1
+        if type(self).requests <= type(self).rate_limited:
+            body = {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}}
+            self._send(429, body, {"retry-after": "0"})
+            return
+        self._send(200, {
+            "id": "chatcmpl-test",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "modelo-test",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "Un vector tiene magnitud y dirección."},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 8, "total_tokens": 18}
+        })
+
+    def _send(self, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class _FakeProvider:
+    """Servidor HTTP local con la API de chat de OpenAI"""
+
+    def __init__(self, rate_limited):
+        self.handler = type("Handler", (_RateLimitedHandler,), {"rate_limited": rate_limited, "requests": 0})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    @property
+    def requests(self):
+        return self.handler.requests
+
+    def llm(self):
+        return ChatOpenAI(
+            api_key="sk-test",
+            base_url=f"http://127.0.0.1:{self.server.server_port}/v1",
+            model="modelo-test",
+            max_retries=0
+        )
+
+
+class EchoAgent(BaseAgent):
+    async def process(self, input_data):
+        return {}
+
+
+def _agent(llm, scheduler):
+    agent = EchoAgent("tutor", llm)
+    agent.response_cache = None
+    agent.scheduler = scheduler
+    return agent
+
+
+def test_retries_429_until_success():
+    """Dos 429 seguidos se reintentan con backoff y la tercera solicitud responde"""
+    with _FakeProvider(rate_limited=2) as provider:
+        scheduler = LLMScheduler(max_retries=3, base_delay=0.01, requests_per_minute=0, tokens_per_minute=0)
+        response = asyncio.run(_agent(provider.llm(), scheduler).generate_response("¿Qué es un vector?"))
+        assert response == "Un vector tiene magnitud y dirección."
+        assert provider.requests == 3
+        assert scheduler.get_stats()["retries"] == 2
+    print("✅ Planificador: 429 reintentados hasta obtener respuesta")
+
+
+def test_gives_up_after_max_retries():
+    """Agotados los reintentos el agente devuelve su mensaje de error habitual"""
+    with _FakeProvider(rate_limited=10) as provider:
+        scheduler = LLMScheduler(max_retries=1, base_delay=0.01, requests_per_minute=0, tokens_per_minute=0)
+        response = asyncio.run(_agent(provider.llm(), scheduler).generate_response("¿Qué es un vector?"))
+        assert response.startswith("Lo siento")
+        assert provider.requests == 2
+        assert scheduler.get_stats()["failures"] == 1
+    print("✅ Planificador: se rinde tras max_retries")
+
+
+def test_in_flight_limit_and_priority():
+    """Nunca hay más de max_in_flight llamadas; en la cola los turnos interactivos van primero"""
+    scheduler = LLMScheduler(max_in_flight=1, requests_per_minute=0, tokens_per_minute=0)
+    order = []
+    active = [0, 0]  # actuales, máximo observado
+
+    async def call(name):
+        active[0] += 1
+        active[1] = max(active[1], active[0])
+        await asyncio.sleep(0.01)
+        order.append(name)
+        active[0] -= 1
+
+    async def run():
+        first = asyncio.create_task(scheduler.run(call, "primera", priority=BACKGROUND))
+        await asyncio.sleep(0)
+        queued = [
+            asyncio.create_task(scheduler.run(call, "fondo", priority=BACKGROUND)),
+            asyncio.create_task(scheduler.run(call, "turno", priority=INTERACTIVE))
+        ]
+        await asyncio.gather(first, *queued)
+
+    asyncio.run(run())
+    assert order == ["primera", "turno", "fondo"]
+    assert active[1] == 1 and scheduler.get_stats()["in_flight"] == 0
+    print("✅ Planificador: límite de concurrencia y prioridad interactiva")
+
+
+def test_token_bucket_and_scheduled_embeddings():
+    """La cubeta hace esperar lo que falta para reponer; los embeddings también se reintentan"""
+    bucket = TokenBucket(60)  # 1 unidad por segundo
+    assert bucket.reserve(60) == 0.0
+    assert 0.9 < bucket.reserve(1) <= 1.0
+
+    class FlakyEmbeddings:
+        calls = 0
+
+        def embed_query(self, text):
+            self.calls += 1
+            if self.calls == 1:
+                raise ConnectionError("sin red")
+            return [1.0, 0.0]
+
+    flaky = FlakyEmbeddings()
+    scheduler = LLMScheduler(max_retries=2, base_delay=0.01, requests_per_minute=0, tokens_per_minute=0)
+    assert ScheduledEmbeddings(flaky, scheduler).embed_query("vector") == [1.0, 0.0]
+    assert flaky.calls == 2
+    print("✅ Planificador: TokenBucket y embeddings con reintento")
+
+
+if __name__ == "__main__":
+    test_retries_429_until_success()
+    test_gives_up_after_max_retries()
+    test_in_flight_limit_and_priority()
+    test_token_bucket_and_scheduled_embeddings()
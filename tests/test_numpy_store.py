@@ -0,0 +1,274 @@
+"""Test del backend NumPy de la base vectorial"""
+
+import sys
+import os
+import time
+import asyncio
+import hashlib
+import tempfile
+import numpy as np
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from rag.numpy_store import NumpyVectorStoreManager, IVFIndex
+from rag.index_file import MappedIndex, IndexFormatError, write_index
+from rag.similarity import normalize_rows
+from rag.seed_content import get_initial_documents
+
+
+class BagOfWordsEmbeddings(Embeddings):
+    """Embeddings locales deterministas (bolsa de palabras con hashing)"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        vectors = []
+        for text in texts:
+            vector = np.zeros(64)
+            for word in text.lower().split():
+                vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % 64] += 1.0
+            vectors.append(vector.tolist())
+        return vectors
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_numpy_store_seed_and_search():
+    """Se crea con el contenido inicial y filtra por nivel de forma exacta"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = NumpyVectorStoreManager(persist_directory=tmp, embeddings=BagOfWordsEmbeddings())
+        stats = store.get_collection_stats()
+        assert stats["count"] == 8
+        assert stats["backend"] == "numpy"
+
+        results = store.similarity_search("producto punto", k=3, filter_level=2)
+        assert len(results) == 3
+        assert all(doc.metadata["level"] <= 2 for doc in results)
+
+        topics = store.search_by_topic("vectores", level=2, k=2)
+        assert topics and all(doc.metadata["topic"] == "vectores" for doc in topics)
+        print(f"✅ Base NumPy: {stats['count']} documentos, búsqueda filtrada correcta")
+
+
+def test_numpy_store_persistence():
+    """Los documentos agregados sobreviven a una nueva instancia"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = NumpyVectorStoreManager(persist_directory=tmp, embeddings=BagOfWordsEmbeddings())
+        store.add_user_content("La traza es la suma de la diagonal", topic="matrices", level=2)
+
+        reloaded = NumpyVectorStoreManager(persist_directory=tmp, embeddings=BagOfWordsEmbeddings())
+        assert reloaded.get_collection_stats()["count"] == 9
+        assert reloaded.similarity_search("traza diagonal", k=1)[0].metadata["subtopic"] == "user_generated"
+        assert isinstance(reloaded.matrix, np.memmap)
+        print("✅ Persistencia en índice mapeado correcta")
+
+
+def test_query_cache_hits_and_invalidation():
+    """Consultas repetidas no vuelven al backend; escribir invalida la caché"""
+    with tempfile.TemporaryDirectory() as tmp:
+        embeddings = BagOfWordsEmbeddings()
+        store = NumpyVectorStoreManager(persist_directory=tmp, embeddings=embeddings)
+
+        first = store.similarity_search("¿Qué es un vector?", k=2)
+        calls = embeddings.calls
+        second = store.similarity_search("  ¿qué es un   vector? ", k=2)
+        assert embeddings.calls == calls
+        assert [d.page_content for d in first] == [d.page_content for d in second]
+
+        store.add_user_content("Un vector unitario tiene norma uno", topic="vectores", level=1)
+        store.similarity_search("¿Qué es un vector?", k=2)
+        assert embeddings.calls > calls + 1
+
+        cache_stats = store.get_collection_stats()["query_cache"]
+        assert cache_stats["hits"] == 1
+        assert cache_stats["generation"] >= 1
+        print(f"✅ Caché de consultas: {cache_stats}")
+
+
+def test_index_file_roundtrip():
+    """El índice se lee con memmap y respeta dtype, ids, niveles y metadatos"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.vmidx")
+        matrix = np.arange(12, dtype=np.float32).reshape(3, 4)
+        documents = [
+            Document(page_content=f"doc {i} ñ", metadata={"topic": "vectores", "level": i + 1})
+            for i in range(3)
+        ]
+        write_index(path, matrix, ["a", "b", "c"], documents, dtype="float16")
+
+        mapped = MappedIndex(path)
+        assert mapped.matrix.dtype == np.float16
+        assert np.allclose(mapped.matrix, matrix)
+        assert list(mapped.ids) == ["a", "b", "c"]
+        assert list(mapped.levels) == [1, 2, 3]
+        assert mapped.get_document(2).page_content == "doc 2 ñ"
+        assert len(mapped.documents) == 3
+
+        with open(path, "r+b") as f:
+            f.write(b"XXXX")
+        try:
+            MappedIndex(path)
+            assert False, "Debe rechazar archivos con cabecera inválida"
+        except IndexFormatError:
+            pass
+        print("✅ Formato de índice mapeado correcto")
+
+
+def test_ivf_matches_flat_when_probing_all_lists():
+    """Con nprobe = nlist el IVF devuelve lo mismo que la búsqueda exacta"""
+    rng = np.random.default_rng(3)
+    matrix = normalize_rows(rng.normal(size=(400, 16)))
+    ivf = IVFIndex(nlist=8, nprobe=8)
+    ivf.train(matrix)
+
+    query = normalize_rows(rng.normal(size=16))[0]
+    candidates = ivf.candidate_rows(query)
+    assert sorted(candidates.tolist()) == list(range(400))
+
+    ivf.nprobe = 2
+    assert len(ivf.candidate_rows(query)) < 400
+    print("✅ IVF sondea particiones correctamente")
+
+
+def test_level_partitions_match_filtered_scan():
+    """Las particiones por nivel son bloques contiguos y dan el mismo top-k que filtrar todo"""
+    rng = np.random.default_rng(5)
+    words = [f"palabra{i}" for i in range(40)]
+    documents = [
+        Document(page_content=" ".join(rng.choice(words, size=6)), metadata={"level": int(rng.integers(1, 6))})
+        for _ in range(120)
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        store = NumpyVectorStoreManager(persist_directory=tmp, embeddings=BagOfWordsEmbeddings())
+        store.add_documents(documents)
+        assert all(isinstance(rows, slice) for rows in store._partitions.values())
+        assert np.all(store.levels[:-1] <= store.levels[1:])
+
+        matrix = normalize_rows(np.asarray(store.matrix))
+        for level in (1, 3, 4):
+            query = normalize_rows(rng.normal(size=64))[0]
+            scores = matrix @ query
+            scores[store.levels > level] = -np.inf
+            expected = np.argsort(-scores, kind="stable")[:5].tolist()
+            assert [row for row, _ in store._search_rows(query, 5, filter_level=level)] == expected
+        print(f"✅ Particiones por nivel: {len(store._partitions)} bloques, top-k exacto")
+
+
+def test_metadata_catalog_tracks_writes():
+    """El catálogo se actualiza en altas y bajas, se persiste y no usa embeddings"""
+    with tempfile.TemporaryDirectory() as tmp:
+        embeddings = BagOfWordsEmbeddings()
+        store = NumpyVectorStoreManager(persist_directory=tmp, embeddings=embeddings)
+        base_topics = store.get_topics_summary()
+        assert sum(base_topics.values()) == 8
+
+        store.add_user_content("La traza es la suma de la diagonal", topic="matrices", level=2)
+        calls = embeddings.calls
+        topics = store.get_topics_summary()
+        stats = store.get_collection_stats()
+        assert embeddings.calls == calls
+        assert topics["matrices"] == base_topics["matrices"] + 1
+        assert stats["count"] == 9 and sum(stats["levels"].values()) == 9
+
+        # Las filas quedan ordenadas por nivel: se busca la agregada por contenido
+        added = next(doc_id for doc_id, doc in zip(store.ids, store.documents) if "traza" in doc.page_content)
+        store.delete_documents([added])
+        assert store.get_topics_summary() == base_topics
+
+        # Sin el archivo del catálogo se reconstruye desde el índice
+        os.remove(os.path.join(tmp, NumpyVectorStoreManager.CATALOG_FILE))
+        reloaded = NumpyVectorStoreManager(persist_directory=tmp, embeddings=embeddings)
+        assert reloaded.get_topics_summary() == base_topics
+        print(f"✅ Catálogo de metadatos: {reloaded.get_topics_summary()}")
+
+
+def test_search_by_topic_uses_metadata_index():
+    """La búsqueda por tema filtra exactamente y sin embeddings salvo para ordenar"""
+    with tempfile.TemporaryDirectory() as tmp:
+        embeddings = BagOfWordsEmbeddings()
+        store = NumpyVectorStoreManager(persist_directory=tmp, embeddings=embeddings)
+        calls = embeddings.calls
+
+        docs = store.search_by_topic("matrices", k=5)
+        assert len(docs) == 2 and all(doc.metadata["topic"] == "matrices" for doc in docs)
+        docs = store.search_by_topic("vectores", level=2, k=5)
+        assert [doc.metadata["level"] for doc in docs] == [2, 1]
+        assert embeddings.calls == calls
+
+        ranked = store.search_by_topic("matrices", k=1, query="determinante inversa")
+        assert len(ranked) == 1 and ranked[0].metadata["subtopic"] == "determinante"
+        assert embeddings.calls == calls + 1
+        print("✅ search_by_topic servido desde el índice de metadatos")
+
+
+def test_ingestion_is_idempotent():
+    """Ids por contenido: recargar no duplica ni recalcula; cambiar metadatos reemplaza"""
+    with tempfile.TemporaryDirectory() as tmp:
+        embeddings = BagOfWordsEmbeddings()
+        store = NumpyVectorStoreManager(persist_directory=tmp, embeddings=embeddings)
+        seed = get_initial_documents()
+        calls = embeddings.calls
+
+        store.add_documents(seed)
+        assert embeddings.calls == calls and len(store.ids) == 8
+
+        changed = Document(page_content=seed[0].page_content, metadata={**seed[0].metadata, "level": 2})
+        store.add_documents([changed])
+        assert len(store.ids) == 8
+        assert store.get_collection_stats()["levels"].get(1, 0) == 0
+
+        reloaded = NumpyVectorStoreManager(persist_directory=tmp, embeddings=embeddings)
+        assert list(reloaded.ids) == list(store.ids)
+        print("✅ Ingesta idempotente con ids deterministas")
+
+
+class SlowAsyncEmbeddings(BagOfWordsEmbeddings):
+    """Simula la latencia de red solo en el cliente async"""
+
+    async def aembed_query(self, text):
+        await asyncio.sleep(0.2)
+        return self.embed_query(text)
+
+
+def test_async_search_overlaps_io():
+    """asimilarity_search coincide con la versión sync y las consultas concurrentes se solapan"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = NumpyVectorStoreManager(persist_directory=tmp, embeddings=SlowAsyncEmbeddings())
+        queries = ["producto punto", "determinante", "espacio vectorial", "suma de vectores", "matriz"]
+
+        async def run():
+            start = time.perf_counter()
+            results = await asyncio.gather(*(store.asimilarity_search(q, k=2) for q in queries))
+            return results, time.perf_counter() - start
+
+        results, elapsed = asyncio.run(run())
+        assert elapsed < 0.2 * len(queries) / 2
+        # Sin la caché de consultas la versión sync recalcula el ranking en vez de repetirlo
+        store._invalidate_query_cache()
+        for query, docs in zip(queries, results):
+            expected = store.similarity_search(query, k=2)
+            assert [d.page_content for d in docs] == [d.page_content for d in expected]
+        assert store.get_query_cache_stats().get("hits", 0) == 0
+
+        topic_docs = asyncio.run(store.asearch_by_topic("vectores", level=2, k=5))
+        assert [doc.metadata["level"] for doc in topic_docs] == [2, 1]
+        print(f"✅ Búsqueda async: {len(queries)} consultas en {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    test_numpy_store_seed_and_search()
+    test_numpy_store_persistence()
+    test_query_cache_hits_and_invalidation()
+    test_index_file_roundtrip()
+    test_ivf_matches_flat_when_probing_all_lists()
+    test_level_partitions_match_filtered_scan()
+    test_metadata_catalog_tracks_writes()
+    test_search_by_topic_uses_metadata_index()
+    test_ingestion_is_idempotent()
+    test_async_search_overlaps_io()
@@ -0,0 +1,125 @@
+"""Test de la caché de respuestas del LLM"""
+
+import sys
+import os
+import time
+import asyncio
+import tempfile
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.base_agent import BaseAgent
+from agents.response_cache import ResponseCache, make_response_key
+from utils.llm_scheduler import LLMScheduler
+
+
+class _Reply:
+    def __init__(self, content):
+        self.content = content
+
+
+class CountingLLM:
+    """LLM falso que cuenta las llamadas; puede fallar a pedido"""
+
+    def __init__(self, temperature=0.3, fail=False):
+        self.model_name = "modelo-test"
+        self.temperature = temperature
+        self.fail = fail
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("sin red")
+        return _Reply(f"respuesta {self.calls}")
+
+
+class EchoAgent(BaseAgent):
+    async def process(self, input_data):
+        return {}
+
+
+def _agent(agent_type, llm, cache):
+    agent = EchoAgent(agent_type, llm)
+    agent.response_cache = cache
+    agent.scheduler = LLMScheduler(max_retries=0)
+    return agent
+
+
+def test_repeated_prompt_skips_llm_and_survives_restart():
+    """El mismo prompt se sirve de memoria y, con la memoria vacía, de SQLite"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "responses.sqlite3")
+        llm = CountingLLM()
+        agent = _agent("assessor", llm, ResponseCache(path))
+
+        first = asyncio.run(agent.generate_response("¿Qué es una matriz?"))
+        second = asyncio.run(agent.generate_response("¿Qué es   una matriz?"))
+        assert first == second and llm.calls == 1
+
+        restarted = _agent("assessor", llm, ResponseCache(path))
+        assert asyncio.run(restarted.generate_response("¿Qué es una matriz?")) == first
+        assert llm.calls == 1 and restarted.response_cache.store_hits == 1
+        restarted.response_cache.store.close()
+        agent.response_cache.store.close()
+    print("✅ Caché de respuestas: memoria y SQLite evitan llamadas repetidas")
+
+
+def test_key_and_opt_in_rules():
+    """La clave depende de la temperatura; el tutor solo cachea si la llamada lo pide"""
+    assert make_response_key("a", "m", 0.3, "s", "p") != make_response_key("a", "m", 0.7, "s", "p")
+
+    cache = ResponseCache(None)
+    tutor_llm = CountingLLM(temperature=0.8)
+    tutor = _agent("tutor", tutor_llm, cache)
+    asyncio.run(tutor.generate_response("Explica vectores"))
+    asyncio.run(tutor.generate_response("Explica vectores"))
+    assert tutor_llm.calls == 2
+
+    asyncio.run(tutor.generate_response("Saludo", use_cache=True))
+    asyncio.run(tutor.generate_response("Saludo", use_cache=True))
+    assert tutor_llm.calls == 3
+
+    failing = CountingLLM(fail=True)
+    assessor = _agent("assessor", failing, cache)
+    asyncio.run(assessor.generate_response("Evalúa"))
+    asyncio.run(assessor.generate_response("Evalúa"))
+    assert failing.calls == 2  # los errores no se cachean
+    print("✅ Caché de respuestas: opt-in por agente y por llamada")
+
+
+def test_ttl_expires_in_both_tiers():
+    """Las entradas vencidas no se devuelven ni desde memoria ni desde SQLite"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(os.path.join(tmp, "responses.sqlite3"), ttl=0.05)
+        cache.set("clave", "assessor", "valor")
+        assert cache.get("clave") == "valor"
+        time.sleep(0.06)
+        assert cache.get("clave") is None
+        cache.store.close()
+    print("✅ Caché de respuestas: TTL en memoria y en SQLite")
+
+
+def test_store_hit_keeps_remaining_ttl():
+    """Un acierto de SQLite pasa a memoria con la vida que le queda, no con el TTL completo"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "responses.sqlite3")
+        ResponseCache(path, ttl=0.2).set("clave", "assessor", "valor")
+        time.sleep(0.12)
+
+        # Nueva instancia (memoria vacía): la respuesta sale de SQLite
+        cache = ResponseCache(path, ttl=0.2)
+        assert asyncio.run(cache.aget("clave")) == "valor"
+        assert cache.store_hits == 1
+        time.sleep(0.1)
+        assert cache.get("clave") is None
+        cache.store.close()
+    print("✅ Caché de respuestas: la promoción a memoria respeta el vencimiento original")
+
+
+if __name__ == "__main__":
+    test_repeated_prompt_skips_llm_and_survives_restart()
+    test_key_and_opt_in_rules()
+    test_ttl_expires_in_both_tiers()
+    test_store_hit_keeps_remaining_ttl()
@@ -0,0 +1,201 @@
+"""Test del pipeline de recuperación por etapas"""
+
+import sys
+import os
+import asyncio
+import tempfile
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.documents import Document
+from rag.numpy_store import NumpyVectorStoreManager
+from rag.retrieval import (
+    RetrievalPipeline, RetrievalStage, CandidateStage, DiversityStage, ContextPackingStage,
+    create_default_pipeline
+)
+from tests.test_numpy_store import BagOfWordsEmbeddings
+
+
+def test_pipeline_trace_and_cache_hits():
+    """Cada etapa queda medida y la segunda consulta igual es un acierto de caché"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = NumpyVectorStoreManager(persist_directory=tmp, embeddings=BagOfWordsEmbeddings())
+        pipeline = create_default_pipeline(store)
+
+        first = asyncio.run(pipeline.run("producto punto de vectores", topic="producto_punto", level=3, k=3))
+        second = asyncio.run(pipeline.run("producto punto de vectores", topic="producto_punto", level=3, k=3))
+
+        stages = [entry["stage"] for entry in first["trace"]]
+        assert stages == ["rewrite", "candidates", "filter", "rerank", "dedup", "diversity", "pack"]
+        assert 0 < len(first["documents"]) <= 3
+        assert all(doc.metadata["level"] <= 3 for doc in first["documents"])
+        assert first["documents"][0].metadata["topic"] == "producto_punto"
+        assert first["context_text"]
+
+        assert first["trace"][1]["cache_hit"] is False
+        assert second["trace"][1]["cache_hit"] is True
+        stats = pipeline.get_stats()["candidates"]
+        assert stats["calls"] == 2 and stats["cache_hits"] == 1
+        print("✅ Pipeline: traza por etapa y acierto de caché en la consulta repetida")
+
+
+class _StaticStore:
+    """Store mínimo: siempre devuelve los mismos candidatos (con un duplicado)"""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+
+    async def asimilarity_search(self, query, k=None, filter_level=None):
+        self.queries.append(query)
+        return list(self.docs)
+
+
+class _UpperRewrite(RetrievalStage):
+    name = "rewrite"
+
+    async def run(self, state):
+        state["query"] = state["student_input"].upper()
+        return state
+
+
+def test_pipeline_swaps_and_disables_stages():
+    """Se puede reemplazar una etapa y omitirla según el tipo de interacción"""
+    docs = [
+        Document(page_content="Una matriz es un arreglo", metadata={"topic": "matrices", "level": 1}),
+        Document(page_content="Una  matriz es un arreglo", metadata={"topic": "matrices", "level": 1}),
+        Document(page_content="Los autovalores cumplen Av = λv", metadata={"topic": "autovalores", "level": 5}),
+    ]
+    store = _StaticStore(docs)
+    pipeline = create_default_pipeline(store)
+    pipeline.disabled_stages = {"answer": ["rewrite", "rerank"]}
+    pipeline.replace("rewrite", _UpperRewrite())
+
+    result = asyncio.run(pipeline.run("que es una matriz", level=3))
+    assert store.queries[-1] == "QUE ES UNA MATRIZ"
+    # filtro de nivel y deduplicación de contenido
+    assert len(result["documents"]) == 1
+
+    result = asyncio.run(pipeline.run("que es una matriz", level=3, interaction_type="answer"))
+    assert store.queries[-1] == "que es una matriz"
+    assert "rerank" not in [entry["stage"] for entry in result["trace"]]
+    print("✅ Pipeline: etapas intercambiables y desactivables por tipo de interacción")
+
+
+class _FixedEmbeddings:
+    """Vectores fijos por texto (los dos primeros documentos son casi iguales)"""
+
+    VECTORS = {
+        "query": [1.0, 0.2, 0.0],
+        "Un vector tiene magnitud y dirección": [1.0, 0.2, 0.0],
+        "Un vector tiene magnitud y sentido": [1.0, 0.25, 0.02],
+        "La suma de vectores es componente a componente": [0.6, 0.0, 0.8],
+    }
+
+    async def aembed_query(self, text):
+        return self.VECTORS["query"]
+
+    async def aembed_documents(self, texts):
+        return [self.VECTORS[text] for text in texts]
+
+
+def test_diversity_stage_skips_near_duplicates():
+    """Con MMR el presupuesto de documentos no se gasta en contenido casi repetido"""
+    contents = list(_FixedEmbeddings.VECTORS)[1:]
+    store = _StaticStore([Document(page_content=text, metadata={"level": 1}) for text in contents])
+    store.embeddings = _FixedEmbeddings()
+    pipeline = create_default_pipeline(store)
+    pipeline.replace("diversity", DiversityStage(store.embeddings, lambda_mult=0.3))
+    pipeline.replace("pack", ContextPackingStage(max_documents=2))
+
+    result = asyncio.run(pipeline.run("query", level=3, interaction_type="answer"))
+    assert [doc.page_content for doc in result["documents"]] == [contents[0], contents[2]]
+    print("✅ Diversidad MMR: se descarta el casi-duplicado")
+
+
+def test_diversity_stage_uses_stored_vectors_and_own_relevance():
+    """Los vectores salen del store (sin re-embeber) y cada candidato usa su propio coseno"""
+    contents = list(_FixedEmbeddings.VECTORS)[1:]
+    embedded = []
+
+    class CountingEmbeddings(_FixedEmbeddings):
+        async def aembed_documents(self, texts):
+            embedded.extend(texts)
+            return await super().aembed_documents(texts)
+
+    # El store devuelve el menos relevante primero; sin peso del orden decide el coseno de cada uno
+    store = _StaticStore([Document(page_content=text, metadata={"level": 1}) for text in reversed(contents)])
+    store.embeddings = CountingEmbeddings()
+    store.stored_vectors = lambda docs: [_FixedEmbeddings.VECTORS[doc.page_content] for doc in docs]
+    pipeline = RetrievalPipeline([
+        CandidateStage(store), DiversityStage(store.embeddings, lambda_mult=0.3, rank_weight=0.0),
+        ContextPackingStage(max_documents=2)
+    ])
+
+    result = asyncio.run(pipeline.run("query", level=3))
+    assert [doc.page_content for doc in result["documents"]] == [contents[0], contents[2]]
+    assert embedded == []
+    print("✅ Diversidad MMR: vectores del store y relevancia real")
+
+
+class _RankingEmbeddings:
+    """El coseno favorece a los autovalores; BM25 al único documento con "producto punto" """
+
+    VECTORS = {
+        "Los autovalores de una matriz cumplen Av = λv": [0.95, 0.31, 0.0],
+        "Un vector tiene magnitud y dirección": [0.9, 0.0, 0.43],
+        "El producto punto multiplica componente a componente y suma": [0.85, -0.5, 0.15],
+        "La matriz identidad tiene unos en la diagonal": [0.8, 0.6, 0.0],
+    }
+
+    async def aembed_query(self, text):
+        return [1.0, 0.0, 0.0]
+
+    async def aembed_documents(self, texts):
+        return [self.VECTORS[text] for text in texts]
+
+
+def test_diversity_stage_keeps_rerank_order():
+    """El orden del rerank léxico cambia los documentos que se empaquetan"""
+    contents = list(_RankingEmbeddings.VECTORS)
+    store = _StaticStore([Document(page_content=text, metadata={"level": 1}) for text in contents])
+    store.embeddings = _RankingEmbeddings()
+    store.stored_vectors = lambda docs: [_RankingEmbeddings.VECTORS[doc.page_content] for doc in docs]
+    pipeline = create_default_pipeline(store)
+    pipeline.replace("pack", ContextPackingStage(max_documents=2))
+
+    with_rerank = asyncio.run(pipeline.run("producto punto", level=3))
+    pipeline.disabled_stages = {"question": ["rerank"]}
+    without_rerank = asyncio.run(pipeline.run("producto punto", level=3))
+
+    packed = [doc.page_content for doc in with_rerank["documents"]]
+    assert packed[0] == contents[2]
+    assert contents[2] not in [doc.page_content for doc in without_rerank["documents"]]
+    print("✅ Diversidad MMR: la relevancia respeta el orden del rerank")
+
+
+def test_pipeline_survives_failing_stage():
+    """Una etapa que falla no corta la recuperación"""
+
+    class Broken(RetrievalStage):
+        name = "broken"
+
+        async def run(self, state):
+            raise RuntimeError("falla")
+
+    store = _StaticStore([Document(page_content="Vectores", metadata={"level": 1})])
+    pipeline = RetrievalPipeline(create_default_pipeline(store).stages, disabled_stages={})
+    pipeline.stages.insert(2, Broken())
+    result = asyncio.run(pipeline.run("vectores"))
+    assert len(result["documents"]) == 1
+    print("✅ Pipeline: una etapa con error no interrumpe la recuperación")
+
+
+if __name__ == "__main__":
+    test_pipeline_trace_and_cache_hits()
+    test_pipeline_swaps_and_disables_stages()
+    test_diversity_stage_skips_near_duplicates()
+    test_diversity_stage_uses_stored_vectors_and_own_relevance()
+    test_diversity_stage_keeps_rerank_order()
+    test_pipeline_survives_failing_stage()
@@ -0,0 +1,116 @@
+"""Test de la caché semántica de turnos del workflow"""
+
+import sys
+import os
+import asyncio
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from workflow.semantic_cache import SemanticTurnCache, level_band
+from tests.test_numpy_store import BagOfWordsEmbeddings
+
+
+class _FakeGraph:
+    """Grafo falso: cuenta ejecuciones y devuelve un turno completo"""
+
+    def __init__(self, interaction_type="question", level=3):
+        self.interaction_type = interaction_type
+        self.level = level
+        self.calls = 0
+
+    async def ainvoke(self, state):
+        self.calls += 1
+        return {
+            **state,
+            "context": {"interaction_type": self.interaction_type},
+            "assessment": {"level": self.level, "topic": "producto_punto"},
+            "final_response": f"respuesta {self.calls}"
+        }
+
+
+def _workflow(graph):
+    from workflow.langgraph_flow import VectorMentorWorkflow
+    workflow = VectorMentorWorkflow()
+    workflow.workflow = graph
+    workflow.turn_cache = SemanticTurnCache(BagOfWordsEmbeddings(), threshold=0.75)
+    return workflow
+
+
+def test_turn_cache_matches_topic_band_and_quality():
+    """Se exige similitud, mismo tema y banda de nivel, y calidad aceptable"""
+    cache = SemanticTurnCache(BagOfWordsEmbeddings(), threshold=0.8, max_entries=2)
+    vector = asyncio.run(cache.embed("que es el producto punto"))
+    entry_id = cache.add(vector, "que es el producto punto", "producto_punto", 3, {"response": "r"})
+
+    paraphrase = asyncio.run(cache.embed("que es el producto punto ?"))
+    assert cache.lookup(paraphrase, "producto_punto", 3)["result"] == {"response": "r"}
+    assert cache.lookup(paraphrase, "matrices", 3) is None
+    assert level_band(5) != level_band(3) and cache.lookup(paraphrase, "producto_punto", 5) is None
+
+    cache.set_quality(entry_id, False)
+    assert cache.lookup(paraphrase, "producto_punto", 3) is None
+
+    # Al superar max_entries se expulsa la menos usada
+    for text in ("vectores", "matrices"):
+        cache.add(asyncio.run(cache.embed(text)), text, None, 3, {})
+    assert len(cache.entries) == 2 and all(entry["id"] != entry_id for entry in cache.entries)
+
+    # Sin tema detectado no se comparte ninguna respuesta, aunque el input sea idéntico
+    assert cache.lookup(asyncio.run(cache.embed("vectores")), None, 3) is None
+    print(f"✅ Caché semántica: {cache.get_stats()}")
+
+
+def test_workflow_serves_paraphrase_without_graph():
+    """La segunda formulación de la misma pregunta no ejecuta el grafo"""
+    graph = _FakeGraph()
+    workflow = _workflow(graph)
+
+    first = asyncio.run(workflow.process_student_input("¿Qué es el producto punto?"))
+    second = asyncio.run(workflow.process_student_input("¿qué es el producto punto"))
+    assert graph.calls == 1
+    assert second["mode"] == "semantic_cache" and second["response"] == first["response"]
+    assert len(workflow.conversation_history) == 1  # el grafo falso no registra su turno
+
+    workflow.rate_response(second["turn_cache_id"], False)
+    asyncio.run(workflow.process_student_input("¿qué es el producto punto"))
+    assert graph.calls == 2
+    print("✅ Workflow: paráfrasis servida desde la caché semántica")
+
+
+def test_workflow_stores_turn_under_lookup_level():
+    """El turno se guarda con la banda con que se buscó, no con el nivel que evaluó el grafo"""
+    graph = _FakeGraph(level=5)
+    workflow = _workflow(graph)
+
+    asyncio.run(workflow.process_student_input("¿Qué es el producto punto?"))
+    assert workflow.turn_cache.entries[0]["band"] == level_band(3)
+    second = asyncio.run(workflow.process_student_input("¿qué es el producto punto"))
+    assert graph.calls == 1 and second["mode"] == "semantic_cache"
+
+    # Con otro nivel (otra banda) la respuesta guardada ya no sirve
+    workflow.student_progress["current_level"] = 5
+    asyncio.run(workflow.process_student_input("¿qué es el producto punto"))
+    assert graph.calls == 2
+
+    # Sin tema detectado el turno no se guarda
+    asyncio.run(workflow.process_student_input("¿me ayudas con esto?"))
+    assert all(entry["topic"] is not None for entry in workflow.turn_cache.entries)
+    print("✅ Workflow: misma banda al buscar y al guardar, y nada sin tema")
+
+
+def test_workflow_does_not_cache_answers():
+    """Las respuestas a ejercicios dependen del contexto: nunca se cachean"""
+    graph = _FakeGraph(interaction_type="answer")
+    workflow = _workflow(graph)
+    asyncio.run(workflow.process_student_input("el producto punto es 11"))
+    asyncio.run(workflow.process_student_input("el producto punto es 11"))
+    assert graph.calls == 2 and not workflow.turn_cache.entries
+    print("✅ Workflow: respuestas a ejercicios fuera de la caché")
+
+
+if __name__ == "__main__":
+    test_turn_cache_matches_topic_band_and_quality()
+    test_workflow_serves_paraphrase_without_graph()
+    test_workflow_stores_turn_under_lookup_level()
+    test_workflow_does_not_cache_answers()
@@ -0,0 +1,166 @@
+"""Test del motor de similaridad vectorizado"""
+
+import sys
+import os
+import tempfile
+import numpy as np
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag.similarity import (
+    SimilarityIndex, normalize_rows, top_k_indices,
+    iter_similarity_blocks, similarity_statistics, mmr_select
+)
+
+
+def _reference_top_k(query, candidates, k):
+    """Implementación de referencia con bucle (equivalente a la versión anterior)"""
+    scores = []
+    for i, candidate in enumerate(candidates):
+        denom = np.linalg.norm(query) * np.linalg.norm(candidate)
+        scores.append((i, float(np.dot(query, candidate) / denom) if denom else 0.0))
+    scores.sort(key=lambda x: x[1], reverse=True)
+    return scores[:k]
+
+
+def test_normalize_rows():
+    """Las filas quedan con norma 1 y las filas nulas en cero"""
+    matrix = normalize_rows([[3.0, 4.0], [0.0, 0.0]])
+    assert matrix.dtype == np.float32
+    assert np.allclose(matrix[0], [0.6, 0.8])
+    assert np.allclose(matrix[1], [0.0, 0.0])
+    print("✅ Normalización correcta")
+
+
+def test_top_k_matches_reference():
+    """El top-k vectorizado coincide con el cálculo por pares"""
+    rng = np.random.default_rng(0)
+    candidates = rng.normal(size=(500, 32))
+    query = rng.normal(size=32)
+
+    index = SimilarityIndex(candidates)
+    results = index.search(query, k=10)
+    expected = _reference_top_k(query, candidates, 10)
+
+    assert [i for i, _ in results] == [i for i, _ in expected]
+    assert np.allclose([s for _, s in results], [s for _, s in expected], atol=1e-5)
+    print(f"✅ Top-k coincide con referencia: {len(results)} resultados")
+
+
+def test_batch_and_threshold():
+    """Un lote de queries devuelve un resultado por query y respeta el umbral"""
+    index = SimilarityIndex([[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]])
+    results = index.search_batch([[1.0, 0.0], [0.0, 1.0]], k=3, threshold=0.5)
+
+    assert len(results) == 2
+    assert [i for i, _ in results[0]] == [0, 2]
+    assert [i for i, _ in results[1]] == [1, 2]
+    print("✅ Búsqueda por lotes con umbral correcta")
+
+
+def test_top_k_indices_edge_cases():
+    """k mayor que el número de candidatos y k = 0"""
+    scores = np.array([0.1, 0.9, 0.5])
+    assert list(top_k_indices(scores, 10)) == [1, 2, 0]
+    assert len(top_k_indices(scores, 0)) == 0
+    assert SimilarityIndex().search([1.0, 0.0], k=3) == []
+    print("✅ Casos límite correctos")
+
+
+def test_similarity_blocks_cover_full_matrix():
+    """Los bloques reconstruyen la matriz de Gram completa"""
+    rng = np.random.default_rng(1)
+    embeddings = rng.normal(size=(37, 8))
+    normalized = normalize_rows(embeddings)
+
+    full = np.zeros((37, 37), dtype=np.float32)
+    for row_start, col_start, block in iter_similarity_blocks(embeddings, block_size=10):
+        full[row_start:row_start + block.shape[0], col_start:col_start + block.shape[1]] = block
+
+    assert np.allclose(full, normalized @ normalized.T, atol=1e-5)
+    print("✅ Bloques cubren la matriz completa")
+
+
+def test_batch_similarity_matrix_returns_array():
+    """La matriz de EmbeddingManager es un array float32 (listas solo a pedido) y admite un memmap"""
+    from rag.embeddings import EmbeddingManager
+
+    manager = EmbeddingManager.__new__(EmbeddingManager)  # sin cliente: no hace falta la API
+    embeddings = np.random.default_rng(3).normal(size=(30, 8))
+    normalized = normalize_rows(embeddings)
+
+    matrix = manager.batch_similarity_matrix(embeddings)
+    assert isinstance(matrix, np.ndarray) and matrix.dtype == np.float32
+    assert np.allclose(matrix, normalized @ normalized.T, atol=1e-5)
+    assert manager.batch_similarity_matrix(embeddings, as_list=True)[0][0] == 1.0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out = np.lib.format.open_memmap(os.path.join(tmp, "sim.npy"), mode="w+", dtype=np.float32, shape=(30, 30))
+        assert manager.batch_similarity_matrix(embeddings, out=out) is out
+        assert np.allclose(out, matrix)
+        del out
+    print("✅ Matriz de similaridad como array o memmap")
+
+
+def test_similarity_statistics_exact_and_sampled():
+    """Estadísticas online exactas coinciden con el cálculo directo; el muestreo se aproxima"""
+    rng = np.random.default_rng(2)
+    embeddings = rng.normal(size=(120, 16)) + 0.5
+    normalized = normalize_rows(embeddings).astype(np.float64)
+    gram = normalized @ normalized.T
+    pairs = gram[np.triu_indices(120, k=1)]
+
+    exact = similarity_statistics(embeddings, block_size=25)
+    assert exact["method"] == "exact"
+    assert exact["pairs"] == pairs.size
+    assert abs(exact["mean"] - pairs.mean()) < 1e-5
+    assert abs(exact["std"] - pairs.std()) < 1e-4
+
+    sampled = similarity_statistics(embeddings, sample_pairs=5000)
+    assert sampled["method"] == "sampled"
+    assert abs(sampled["mean"] - pairs.mean()) < 0.02
+    print(f"✅ Similaridad media exacta {exact['mean']:.3f}, muestreada {sampled['mean']:.3f}")
+
+
+def _reference_mmr(query, candidates, k, lambda_mult):
+    """MMR con bucles, recalculando la redundancia en cada paso"""
+    def cos(a, b):
+        return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+    selected = []
+    remaining = list(range(len(candidates)))
+    while remaining and len(selected) < k:
+        best = max(remaining, key=lambda i: lambda_mult * cos(query, candidates[i]) - (1 - lambda_mult) * max(
+            (cos(candidates[i], candidates[j]) for j in selected), default=0.0))
+        selected.append(best)
+        remaining.remove(best)
+    return selected
+
+
+def test_mmr_prefers_diverse_candidates():
+    """Un casi-duplicado del primero se relega; coincide con la versión con bucles"""
+    query = np.array([1.0, 0.2, 0.0])
+    candidates = np.array([
+        [1.0, 0.2, 0.0],    # el más relevante
+        [1.0, 0.25, 0.02],  # casi idéntico al anterior
+        [0.7, 0.0, 0.7],    # algo menos relevante pero distinto
+    ])
+    assert mmr_select(query, candidates, 2, lambda_mult=1.0) == [0, 1]
+    assert mmr_select(query, candidates, 2, lambda_mult=0.3) == [0, 2]
+
+    rng = np.random.default_rng(3)
+    query, candidates = rng.normal(size=8), rng.normal(size=(30, 8))
+    assert mmr_select(query, candidates, 10, 0.6) == _reference_mmr(query, candidates, 10, 0.6)
+    assert mmr_select(query, candidates[:0], 3) == []
+    print("✅ MMR vectorizado coincide con la referencia y diversifica")
+
+
+if __name__ == "__main__":
+    test_normalize_rows()
+    test_top_k_matches_reference()
+    test_batch_and_threshold()
+    test_top_k_indices_edge_cases()
+    test_similarity_blocks_cover_full_matrix()
+    test_batch_similarity_matrix_returns_array()
+    test_similarity_statistics_exact_and_sampled()
+    test_mmr_prefers_diverse_candidates()
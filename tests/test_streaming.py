@@ -0,0 +1,129 @@
+"""Test del streaming de respuestas: agente, formateador incremental y workflow"""
+
+import sys
+import os
+import asyncio
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.response_cache import ResponseCache
+from agents.tutor_agent import TutorAgent
+from utils.math_formatter import IncrementalMathFormatter, math_is_balanced
+
+
+class _Chunk:
+    def __init__(self, content):
+        self.content = content
+
+
+class StreamingLLM:
+    """LLM falso que entrega una respuesta fija en fragmentos"""
+
+    def __init__(self, chunks, fail_after=None):
+        self.model_name = "modelo-test"
+        self.temperature = 0.7
+        self.chunks = chunks
+        self.fail_after = fail_after
+        self.calls = 0
+
+    async def astream(self, messages):
+        self.calls += 1
+        for i, chunk in enumerate(self.chunks):
+            if self.fail_after is not None and i == self.fail_after:
+                raise ConnectionError("sin red")
+            yield _Chunk(chunk)
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        return _Chunk("".join(self.chunks))
+
+
+async def _collect(stream):
+    return [token async for token in stream]
+
+
+def test_agent_astream_yields_chunks_and_caches():
+    """Los fragmentos llegan en orden; con caché la segunda vez no se llama al LLM"""
+    llm = StreamingLLM(["Hola, ", "soy ", "VectorMentor"])
+    tutor = TutorAgent(llm)
+    tutor.response_cache = ResponseCache(None)
+
+    tokens = asyncio.run(_collect(tutor.astream("Saluda", use_cache=True)))
+    assert tokens == ["Hola, ", "soy ", "VectorMentor"]
+    assert asyncio.run(_collect(tutor.astream("Saluda", use_cache=True))) == ["Hola, soy VectorMentor"]
+    assert llm.calls == 1
+
+    # Un error a mitad de la respuesta la corta sin agregar el mensaje de error
+    broken = TutorAgent(StreamingLLM(["uno ", "dos"], fail_after=1))
+    broken.response_cache = None
+    assert asyncio.run(_collect(broken.astream("Explica"))) == ["uno "]
+    print("✅ Streaming: BaseAgent.astream entrega fragmentos y usa la caché")
+
+
+def test_incremental_formatter_never_splits_formulas():
+    """Solo se libera texto hasta un salto de línea con todas las fórmulas cerradas"""
+    assert math_is_balanced("$a$ y \\(b\\)") and not math_is_balanced("sea $x")
+    assert not math_is_balanced("\\begin{pmatrix} 1 & 2")
+
+    formatter = IncrementalMathFormatter(lambda text: text.strip())
+    assert formatter.feed("El producto $A") == ""
+    assert formatter.feed(" \\cdot\n B$ vale:\n") == "El producto $A \\cdot\n B$ vale:\n"
+    assert formatter.feed("$$\\begin{pmatrix} 1 \\\\\n") == ""
+    assert formatter.feed(" 2 \\end{pmatrix}$$\nFin") == "$$\\begin{pmatrix} 1 \\\\\n 2 \\end{pmatrix}$$\n"
+    assert formatter.flush() == "Fin"
+    print("✅ Streaming: el formateador incremental no parte fórmulas")
+
+
+class _Agent:
+    def __init__(self, **methods):
+        self.__dict__.update(methods)
+
+
+def test_workflow_stream_matches_final_response():
+    """Los tokens del workflow forman exactamente la respuesta final"""
+    from workflow.langgraph_flow import VectorMentorWorkflow
+
+    class _PrepareGraph:
+        async def ainvoke(self, state):
+            return {
+                **state,
+                "context": {"student_input": state["student_input"], "interaction_type": "question"},
+                "assessment": {"level": 2, "topic": "vectores"},
+                "retrieved_content": "Un vector tiene magnitud y dirección."
+            }
+
+    async def synthesize_response(state):
+        return state["tutor_response"] + f"\n\n{state['practice_exercise']}"
+
+    async def practice(topic, level, interaction_type):
+        return "Ejercicio: suma (1, 2) + (3, 4)"
+
+    tutor = TutorAgent(StreamingLLM(["Un vector ", "es una flecha."]))
+    tutor.response_cache = None
+    tutor._generate_practice_exercise = practice
+
+    workflow = VectorMentorWorkflow()
+    workflow.prepare_workflow = _PrepareGraph()
+    workflow.agents = {
+        "tutor": tutor,
+        "coordinator": _Agent(synthesize_response=synthesize_response)
+    }
+
+    async def run():
+        return [event async for event in workflow.astream_student_input("¿Qué es un vector?")]
+
+    events = asyncio.run(run())
+    tokens = "".join(event["content"] for event in events if event["type"] == "token")
+    final = events[-1]
+    assert final["type"] == "final" and final["result"]["mode"] == "workflow_complete"
+    assert tokens == final["result"]["response"]
+    assert final["result"]["response"].startswith("Un vector es una flecha.")
+    assert len(workflow.conversation_history) == 1
+    print("✅ Streaming: el workflow transmite la respuesta del tutor")
+
+
+if __name__ == "__main__":
+    test_agent_astream_yields_chunks_and_caches()
+    test_incremental_formatter_never_splits_formulas()
+    test_workflow_stream_matches_final_response()
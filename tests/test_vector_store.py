@@ -0,0 +1,47 @@
+"""Test del VectorStoreManager sobre Chroma (embeddings locales, sin red)"""
+
+import sys
+import os
+import tempfile
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag.vector_store import VectorStoreManager
+from tests.test_numpy_store import BagOfWordsEmbeddings
+
+
+def _count_queries(store):
+    """Envuelve la búsqueda de Chroma para registrar cada consulta con su filtro"""
+    calls = []
+    search = store.vector_store.similarity_search_by_vector
+
+    def counting(*args, **kwargs):
+        calls.append(kwargs.get("filter"))
+        return search(*args, **kwargs)
+
+    store.vector_store.similarity_search_by_vector = counting
+    return calls
+
+
+def test_level_filter_is_one_query():
+    """Un filtro de nivel es una sola consulta a Chroma y se aplica aunque falte el catálogo"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = VectorStoreManager(persist_directory=tmp, embeddings=BagOfWordsEmbeddings())
+        calls = _count_queries(store)
+
+        docs = store.similarity_search("vectores y matrices", k=5, filter_level=2)
+        assert docs and all(doc.metadata["level"] <= 2 for doc in docs)
+        assert len(calls) == 1 and calls[0] is not None
+
+        # Catálogo vacío (reconstrucción fallida o base en memoria): se filtra igual
+        store.catalog.clear()
+        store._invalidate_query_cache()
+        docs = store.similarity_search("vectores y matrices", k=5, filter_level=2)
+        assert docs and all(doc.metadata["level"] <= 2 for doc in docs)
+        assert calls[-1] == {"level": {"$lte": 2}}
+        print("✅ Chroma: filtro de nivel en una sola consulta, también sin catálogo")
+
+
+if __name__ == "__main__":
+    test_level_filter_is_one_query()
@@ -0,0 +1,43 @@
+"""Pool de hilos acotado para sacar del event loop el trabajo bloqueante (SQLite, NumPy)"""
+
+import atexit
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from config.settings import settings
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Pool compartido por el proceso, con RETRIEVAL_MAX_WORKERS hilos como máximo"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.RETRIEVAL_MAX_WORKERS,
+                    thread_name_prefix="retrieval"
+                )
+    return _executor
+
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Ejecuta una función bloqueante en el pool sin detener el event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_executor():
+    """Cierra el pool (se registra con atexit)"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+            _executor = None
+
+
+atexit.register(shutdown_executor)
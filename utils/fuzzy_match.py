@@ -0,0 +1,110 @@
+"""Índice de trigramas para corregir errores de tipeo contra un vocabulario conocido"""
+
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from utils.cache import TTLCache
+
+_MISSING = object()
+
+
+def trigrams(term: str) -> Set[str]:
+    """Trigramas con relleno, para que inicio y fin de palabra pesen ("matriz" -> "  m", " ma", ...)"""
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Distancia de Levenshtein; corta en limit + 1 apenas se sabe que lo supera"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ch_a in enumerate(a, 1):
+        current = [i]
+        for j, ch_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ch_a != ch_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class TrigramIndex:
+    """Postings trigrama -> términos; las últimas cache_size correcciones se memorizan (LRU)
+    hasta el próximo alta.
+
+    Los trigramas solo proponen candidatos: una corrección además debe tener longitud
+    parecida y estar a lo sumo a max_edits ediciones. Las palabras de known_words son
+    válidas aunque no estén en el vocabulario y nunca se corrigen ("respuesta" no es "resta").
+    """
+
+    def __init__(self, terms: Iterable[str] = (), min_similarity: float = 0.45, min_length: int = 4,
+                 max_edits: int = 2, known_words: Iterable[str] = (), cache_size: int = 2048):
+        self.min_similarity = min_similarity
+        self.min_length = min_length
+        self.max_edits = max_edits
+        self.known_words = frozenset(known_words)
+        self._terms: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._grams: List[Set[str]] = []
+        self._postings: Dict[str, List[int]] = {}
+        # Acotada: en un proceso largo cada término distinto (con sus errores) no queda para siempre
+        self._cache = TTLCache(maxsize=cache_size)
+        self.add(terms)
+
+    def __contains__(self, term: str) -> bool:
+        return term in self._terms
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def add(self, terms: Iterable[str]):
+        """Agrega términos nuevos al vocabulario"""
+        added = False
+        for term in terms:
+            if term in self._terms:
+                continue
+            term_id = len(self._grams)
+            grams = trigrams(term)
+            self._terms[term] = term_id
+            self._names.append(term)
+            self._grams.append(grams)
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(term_id)
+            added = True
+        if added:
+            self._cache.clear()
+
+    def candidates(self, term: str, limit: int = 3) -> List[Tuple[str, float]]:
+        """Términos del vocabulario más parecidos (similitud de Jaccard sobre trigramas)"""
+        query_grams = trigrams(term)
+        overlaps = Counter()
+        for gram in query_grams:
+            overlaps.update(self._postings.get(gram, ()))
+
+        scored = []
+        for term_id, overlap in overlaps.items():
+            name = self._names[term_id]
+            if abs(len(name) - len(term)) > self.max_edits:
+                continue
+            similarity = overlap / (len(query_grams) + len(self._grams[term_id]) - overlap)
+            if similarity >= self.min_similarity and edit_distance(term, name, self.max_edits) <= self.max_edits:
+                scored.append((name, similarity))
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:limit]
+
+    def correct(self, term: str) -> Optional[str]:
+        """El término si es conocido, su mejor corrección, o None si no hay candidato"""
+        if term in self._terms:
+            return term
+        if len(term) < self.min_length or term in self.known_words:
+            return None
+        corrected = self._cache.get(term, _MISSING)
+        if corrected is _MISSING:
+            best = self.candidates(term, limit=1)
+            corrected = best[0][0] if best else None
+            self._cache.set(term, corrected)
+        return corrected
+
+    def correct_all(self, terms: List[str]) -> List[str]:
+        """Corrige cada término desconocido; los que no tienen candidato se dejan igual"""
+        return [self.correct(term) or term for term in terms]
@@ -0,0 +1,282 @@
+"""Planificador de llamadas al proveedor del LLM - Concurrencia, límites por minuto y reintentos"""
+
+import math
+import time
+import heapq
+import random
+import asyncio
+import itertools
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+from config.settings import settings
+
+# Prioridades: los turnos del estudiante pasan antes que el trabajo de fondo (carga de contenido)
+INTERACTIVE = 0
+BACKGROUND = 1
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = {"APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError"}
+
+
+def estimate_tokens(text: str) -> int:
+    """Aproximación de tokens (~4 caracteres por token) sin depender de un tokenizador remoto"""
+    return max(1, math.ceil(len(text) / 4))
+
+
+def status_code(error: Exception) -> Optional[int]:
+    """Código HTTP de un error del cliente (openai / httpx), si lo tiene"""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Límite de tasa, error transitorio del servidor o fallo de red"""
+    status = status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return isinstance(error, (ConnectionError, TimeoutError, asyncio.TimeoutError)) \
+        or type(error).__name__ in RETRYABLE_ERRORS
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Segundos indicados por el servidor en la cabecera Retry-After (si vino)"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Cubeta que se rellena a `per_minute` unidades por minuto; <= 0 la desactiva.
+
+    reserve() descuenta de inmediato (el saldo puede quedar negativo) y devuelve cuánto
+    debe esperar quien reservó, de modo que las reservas se atienden en orden de llegada.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.rate = self.capacity / 60.0
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        if self.capacity <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Una sola solicitud nunca puede pedir más que la capacidad completa
+            self.tokens -= min(amount, self.capacity)
+            return max(0.0, -self.tokens / self.rate)
+
+
+class _Waiter:
+    __slots__ = ("wake", "granted", "cancelled")
+
+    def __init__(self, wake: Callable[[], None]):
+        self.wake = wake
+        self.granted = False
+        self.cancelled = False
+
+
+class LLMScheduler:
+    """Único punto de paso hacia el proveedor, compartido por todo el proceso.
+
+    - Como máximo `max_in_flight` solicitudes a la vez; las que esperan se atienden por
+      prioridad (INTERACTIVE antes que BACKGROUND) y luego por orden de llegada.
+    - Cubetas de solicitudes y de tokens por minuto (RPM / TPM).
+    - Reintentos con backoff exponencial y jitter completo, respetando Retry-After.
+
+    Funciona desde varios event loops e hilos (Streamlit ejecuta asyncio.run por sesión).
+    """
+
+    def __init__(self, max_in_flight: int = None, requests_per_minute: float = None,
+                 tokens_per_minute: float = None, max_retries: int = None,
+                 base_delay: float = None, max_delay: float = None):
+        self.max_in_flight = max_in_flight or settings.LLM_MAX_IN_FLIGHT
+        self.requests = TokenBucket(settings.LLM_REQUESTS_PER_MINUTE if requests_per_minute is None
+                                    else requests_per_minute)
+        self.tokens = TokenBucket(settings.LLM_TOKENS_PER_MINUTE if tokens_per_minute is None
+                                  else tokens_per_minute)
+        self.max_retries = settings.LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.base_delay = settings.LLM_RETRY_BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = settings.LLM_RETRY_MAX_DELAY if max_delay is None else max_delay
+
+        self.in_flight = 0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "retries": 0, "rate_limited": 0, "failures": 0, "queued": 0, "wait_ms": 0.0}
+
+    # --- Cupos de concurrencia ---
+
+    def _try_acquire(self, priority: int, wake: Callable[[], None]) -> Optional[_Waiter]:
+        """Toma un cupo libre (devuelve None) o se encola y devuelve el turno de espera"""
+        with self._lock:
+            if self.in_flight < self.max_in_flight and not self._waiters:
+                self.in_flight += 1
+                return None
+            waiter = _Waiter(wake)
+            heapq.heappush(self._waiters, (priority, next(self._sequence), waiter))
+            self.stats["queued"] += 1
+            return waiter
+
+    def _release(self):
+        """Cede el cupo al siguiente en espera, o lo libera si no hay nadie"""
+        with self._lock:
+            while self._waiters:
+                _, _, waiter = heapq.heappop(self._waiters)
+                if not waiter.cancelled:
+                    waiter.granted = True
+                    waiter.wake()
+                    return
+            self.in_flight -= 1
+
+    async def _acquire(self, priority: int):
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+
+        waiter = self._try_acquire(priority, wake)
+        if waiter is None:
+            return
+        try:
+            await granted
+        except asyncio.CancelledError:
+            with self._lock:
+                handed_over = waiter.granted
+                waiter.cancelled = True
+            if handed_over:
+                self._release()
+            raise
+
+    def _acquire_sync(self, priority: int):
+        event = threading.Event()
+        if self._try_acquire(priority, event.set) is not None:
+            event.wait()
+
+    # --- Límites por minuto y reintentos ---
+
+    def _rate_wait(self, tokens: int) -> float:
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        if wait > 0:
+            self.stats["rate_limited"] += 1
+            self.stats["wait_ms"] += wait * 1000
+        return wait
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """Jitter completo sobre base * 2^intento, nunca menos de lo que pida el servidor"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        return max(delay, retry_after(error) or 0.0)
+
+    def _should_retry(self, attempt: int, error: BaseException) -> bool:
+        if attempt < self.max_retries and is_retryable(error):
+            self.stats["retries"] += 1
+            return True
+        self.stats["failures"] += 1
+        return False
+
+    async def run(self, func: Callable[..., Awaitable[Any]], *args, priority: int = INTERACTIVE,
+                  tokens: int = 0, **kwargs) -> Any:
+        """Ejecuta una corrutina del proveedor bajo los límites, reintentando errores transitorios"""
+        self.stats["calls"] += 1
+        attempt = 0
+        while True:
+            await self._acquire(priority)
+            try:
+                wait = self._rate_wait(tokens)
+                if wait:
+                    await asyncio.sleep(wait)
+                return await func(*args, **kwargs)
+            except Exception as e:
+                if not self._should_retry(attempt, e):
+                    raise
+                delay = self._backoff(attempt, e)
+            finally:
+                self._release()
+            # El cupo se libera mientras se espera el reintento
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def run_sync(self, func: Callable[..., Any], *args, priority: int = INTERACTIVE,
+                 tokens: int = 0, **kwargs) -> Any:
+        """Versión sincrónica de run() (sondeo de arranque, carga de contenido)"""
+        self.stats["calls"] += 1
+        attempt = 0
+        while True:
+            self._acquire_sync(priority)
+            try:
+                wait = self._rate_wait(tokens)
+                if wait:
+                    time.sleep(wait)
+                return func(*args, **kwargs)
+            except Exception as e:
+                if not self._should_retry(attempt, e):
+                    raise
+                delay = self._backoff(attempt, e)
+            finally:
+                self._release()
+            time.sleep(delay)
+            attempt += 1
+
+    async def stream(self, factory: Callable[[], AsyncIterator[Any]], priority: int = INTERACTIVE,
+                     tokens: int = 0) -> AsyncIterator[Any]:
+        """Transmite una respuesta ocupando un cupo hasta el final.
+
+        Solo se reintenta si el error llega antes del primer fragmento: después ya se
+        mostró parte de la respuesta y repetirla la duplicaría.
+        """
+        self.stats["calls"] += 1
+        attempt = 0
+        while True:
+            started = False
+            await self._acquire(priority)
+            try:
+                wait = self._rate_wait(tokens)
+                if wait:
+                    await asyncio.sleep(wait)
+                async for chunk in factory():
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                if started or not self._should_retry(attempt, e):
+                    raise
+                delay = self._backoff(attempt, e)
+            finally:
+                self._release()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waiting = sum(1 for _, _, waiter in self._waiters if not waiter.cancelled)
+            return {
+                **self.stats,
+                "wait_ms": round(self.stats["wait_ms"], 1),
+                "in_flight": self.in_flight,
+                "waiting": waiting,
+                "max_in_flight": self.max_in_flight
+            }
+
+
+# Un solo planificador por proceso: los límites del proveedor son por cuenta, no por agente
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler()
+        return _scheduler
@@ -119,6 +119,48 @@ def format_tutor_response(response: str) -> str:
     renderer = CLIRenderer()
     return renderer.render_response(response)
 
+def math_is_balanced(text: str) -> bool:
+    """True si no queda ninguna fórmula abierta ($, $$, \\( \\), \\[ \\], \\begin/\\end)"""
+    if text.count('\\(') != text.count('\\)') or text.count('\\[') != text.count('\\]'):
+        return False
+    if text.count('\\begin{') != text.count('\\end{'):
+        return False
+    # Los $ escapados (\$) no abren fórmulas
+    return len(re.findall(r'(?<!\\)\$', text)) % 2 == 0
+
+class IncrementalMathFormatter:
+    """Aplica un formateador a un texto que llega por fragmentos sin partir fórmulas.
+
+    Acumula los fragmentos y solo libera hasta el último salto de línea en el que todas
+    las fórmulas están cerradas; el resto espera al siguiente fragmento o a flush().
+    """
+
+    def __init__(self, formatter=format_tutor_response):
+        self.formatter = formatter
+        self.pending = ""
+
+    def feed(self, token: str) -> str:
+        """Agrega un fragmento y devuelve el texto formateado que ya puede mostrarse"""
+        self.pending += token
+        cut = self.pending.rfind('\n')
+        while cut != -1 and not math_is_balanced(self.pending[:cut]):
+            cut = self.pending.rfind('\n', 0, cut)
+        if cut == -1:
+            return ""
+
+        ready, self.pending = self.pending[:cut + 1], self.pending[cut + 1:]
+        return self._format(ready)
+
+    def flush(self) -> str:
+        """Formatea lo que quede pendiente al terminar la respuesta"""
+        ready, self.pending = self.pending, ""
+        return self._format(ready) if ready else ""
+
+    def _format(self, text: str) -> str:
+        formatted = self.formatter(text)
+        # Los formateadores recortan espacios: se conserva el salto de línea del corte
+        return formatted + "\n" if text.endswith("\n") else formatted
+
 # Test de ejemplo
 if __name__ == "__main__":
     test_response = """**🤖 VectorMentor:**1. **Definición clara y precisa:** El producto matricial es una operación que se realiza entre dos matrices para obtener una nueva matriz. Para que esto sea posible, el número de columnas de la primera matriz debe ser igual al número de filas de la segunda matriz.
@@ -0,0 +1,79 @@
+"""Análisis de texto en español compartido por indexación y consulta.
+
+Pipeline: plegado Unicode (minúsculas, sin acentos) -> tokens alfanuméricos ->
+sin stopwords -> stemming ligero. Así "¿Qué es la eliminación gaussiana?" produce
+["elimin", "gauss"], igual que "eliminacion de Gauss".
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import FrozenSet, Iterable, List
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_VOWELS = frozenset("aeiou")
+
+SPANISH_STOPWORDS: FrozenSet[str] = frozenset("""
+    a al algo algunas algunos ante antes como con contra cual cuales cuando cuanto de del desde
+    donde durante e el ella ellas ellos en entre era eran es esa esas ese eso esos esta estas
+    este esto estos fue fueron ha hay hasta la las le les lo los mas me mi mis mucho muchos muy
+    nada ni no nos nosotros o otra otras otro otros para pero poco por porque puedo puedes que
+    quien quienes se sea ser si sin sobre son su sus tambien tanto te tu tus un una unas uno unos
+    y ya yo
+""".split())
+
+# Sufijos derivativos/flexivos, del más largo al más corto
+_SUFFIXES = (
+    "amientos", "imientos", "amiento", "imiento", "aciones", "uciones",
+    "acion", "icion", "ucion", "mente", "idad", "cion",
+    "iana", "iano", "ial", "al", "ar", "er", "ir", "a", "o", "e",
+)
+_MIN_STEM = 3
+
+
+def fold(text: str) -> str:
+    """Minúsculas y sin diacríticos ("Eliminación" -> "eliminacion")"""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+@lru_cache(maxsize=65536)
+def stem(token: str) -> str:
+    """Stemming ligero: plural y un sufijo ("matrices" -> "matriz", "gaussiana" -> "gauss")"""
+    if len(token) > 4 and token.endswith("ces"):
+        token = token[:-3] + "z"
+    elif len(token) > 4 and token.endswith("es") and token[-3] not in _VOWELS:
+        token = token[:-2]
+    elif len(token) > 3 and token.endswith("s") and token[-2] != "s":
+        token = token[:-1]
+
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= _MIN_STEM:
+            return token[:-len(suffix)]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokens plegados, sin stopwords ni letras sueltas (los dígitos se conservan)"""
+    return [
+        token for token in _TOKEN_RE.findall(fold(text))
+        if token not in SPANISH_STOPWORDS and (len(token) > 1 or token.isdigit())
+    ]
+
+
+def analyze(text: str) -> List[str]:
+    """Términos normalizados de un texto: una sola pasada, stems memoizados"""
+    return [stem(token) for token in tokenize(text)]
+
+
+def analyze_terms(texts: Iterable[str]) -> FrozenSet[str]:
+    """Conjunto de términos de varias palabras clave, para precalcular vocabularios"""
+    return frozenset(term for text in texts for term in analyze(text))
+
+
+def contains_phrase(terms: List[str], phrase: List[str]) -> bool:
+    """True si la secuencia de términos contiene la frase (ya analizada) de forma contigua"""
+    if not phrase:
+        return False
+    n = len(phrase)
+    return any(terms[i:i + n] == phrase for i in range(len(terms) - n + 1))
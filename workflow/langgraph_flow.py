@@ -1,14 +1,17 @@
 """Definición del flujo de trabajo con LangGraph - CORREGIDO"""
 
-from typing import Dict, Any, TypedDict
+from typing import Dict, Any, AsyncIterator, Optional, TypedDict
 from langgraph.graph import StateGraph, END
 from langchain_openai import ChatOpenAI
 from agents.coordinator_agent import CoordinatorAgent
-from agents.assessor_agent import AssessorAgent
+from agents.assessor_agent import AssessorAgent, match_topic_keywords
 from agents.retriever_agent import RetrieverAgent
 from agents.tutor_agent import TutorAgent
-from rag.vector_store import VectorStoreManager
+from agents.interaction_classifier import get_interaction_classifier
+from rag.store_factory import get_vector_store_manager
 from config.settings import settings
+from utils.llm_scheduler import get_llm_scheduler
+from .semantic_cache import SemanticTurnCache
 
 # Definir el estado del workflow
 class WorkflowState(TypedDict):
@@ -30,7 +33,9 @@ class VectorMentorWorkflow:
         self.llm = None
         self.agents = {}
         self.workflow = None
+        self.prepare_workflow = None  # Mismo grafo sin tutor ni síntesis (para streaming)
         self.vector_manager = None
+        self.turn_cache = None  # Caché semántica de turnos (paráfrasis de la misma pregunta)
         self.conversation_history = []  # ← AGREGADO: Historial centralizado
         self.student_progress = {       # ← AGREGADO: Progreso del estudiante
             "current_level": 3,
@@ -46,11 +51,12 @@ class VectorMentorWorkflow:
         self.llm = ChatOpenAI(
             api_key=settings.OPENAI_API_KEY,
             model=settings.LLM_MODEL,
-            temperature=0.7
+            temperature=0.7,
+            max_retries=0  # Los reintentos los hace el planificador compartido (utils.llm_scheduler)
         )
         
-        # Inicializar vector store (sin await - no es async)
-        self.vector_manager = VectorStoreManager()
+        # Vector store compartido del proceso (sin await - no es async)
+        self.vector_manager = get_vector_store_manager()
         
         # Inicializar agentes
         self.agents = {
@@ -60,6 +66,11 @@ class VectorMentorWorkflow:
             "tutor": TutorAgent(self.llm)
         }
         
+        # Caché semántica de turnos: usa el mismo cliente de embeddings (con caché) del RAG
+        embeddings = getattr(self.vector_manager, "embeddings", None)
+        if settings.TURN_CACHE_ENABLED and embeddings is not None:
+            self.turn_cache = SemanticTurnCache(embeddings)
+        
         # Crear workflow con LangGraph
         self._create_workflow()
         
@@ -67,16 +78,24 @@ class VectorMentorWorkflow:
     
     def _create_workflow(self):
         """Crea el workflow usando LangGraph con sintaxis correcta"""
+        self.workflow = self._build_graph(with_tutor=True)
+        # En streaming el tutor y la síntesis se ejecutan fuera del grafo
+        self.prepare_workflow = self._build_graph(with_tutor=False)
+    
+    def _build_graph(self, with_tutor: bool):
+        """Compila el grafo completo, o solo coordinador → evaluador → recuperador"""
         
         # Definir el grafo de estados con TypedDict
         workflow = StateGraph(WorkflowState)
+        after_context = "tutor" if with_tutor else END
         
         # Agregar nodos (agentes)
         workflow.add_node("coordinator", self._coordinator_node)
         workflow.add_node("assessor", self._assessor_node)
         workflow.add_node("retriever", self._retriever_node)
-        workflow.add_node("tutor", self._tutor_node)
-        workflow.add_node("synthesizer", self._synthesizer_node)
+        if with_tutor:
+            workflow.add_node("tutor", self._tutor_node)
+            workflow.add_node("synthesizer", self._synthesizer_node)
         
         # Definir flujo con condiciones
         workflow.set_entry_point("coordinator")
@@ -96,16 +115,17 @@ class VectorMentorWorkflow:
             self._route_after_assessor,
             {
                 "retrieve": "retriever",
-                "skip_retrieve": "tutor"
+                "skip_retrieve": after_context
             }
         )
         
-        workflow.add_edge("retriever", "tutor")
-        workflow.add_edge("tutor", "synthesizer")
-        workflow.add_edge("synthesizer", END)
+        workflow.add_edge("retriever", after_context)
+        if with_tutor:
+            workflow.add_edge("tutor", "synthesizer")
+            workflow.add_edge("synthesizer", END)
         
         # Compilar workflow
-        self.workflow = workflow.compile()
+        return workflow.compile()
     
     def _route_after_coordinator(self, state: WorkflowState) -> str:
         """Determina si necesita evaluación"""
@@ -194,27 +214,10 @@ class VectorMentorWorkflow:
         """Nodo del tutor - RESPUESTA ADAPTADA AL NIVEL"""
         try:
             if state.get("needs_tutoring", True):
-                # Adaptar respuesta según evaluación automática
-                assessment = state.get("assessment", {})
-                level = assessment.get("level", 3)
-                gaps = assessment.get("gaps", [])
-                
-                # Preparar contexto adaptado para el tutor
-                tutor_context = state["context"].copy()
-                tutor_context.update({
-                    "evaluated_level": level,
-                    "knowledge_gaps": gaps,
-                    "difficulty_adaptation": self._get_difficulty_adaptation(level),
-                    "student_progress": self.student_progress
-                })
-                
-                result = await self.agents["tutor"].process({
-                    **state,
-                    "context": tutor_context
-                })
+                result = await self.agents["tutor"].process(self._tutor_input(state))
                 state.update(result)
                 
-                print(f"🎓 Respuesta tutorial adaptada al nivel {level}")
+                print(f"🎓 Respuesta tutorial adaptada al nivel {state.get('assessment', {}).get('level', 3)}")
                 
             return state
         except Exception as e:
@@ -222,6 +225,20 @@ class VectorMentorWorkflow:
             state["tutor_response"] = "Error generando respuesta tutorial"
             return state
     
+    def _tutor_input(self, state: WorkflowState) -> Dict[str, Any]:
+        """Estado con el contexto adaptado a la evaluación automática, para el tutor"""
+        assessment = state.get("assessment", {})
+        level = assessment.get("level", 3)
+        
+        tutor_context = state["context"].copy()
+        tutor_context.update({
+            "evaluated_level": level,
+            "knowledge_gaps": assessment.get("gaps", []),
+            "difficulty_adaptation": self._get_difficulty_adaptation(level),
+            "student_progress": self.student_progress
+        })
+        return {**state, "context": tutor_context}
+    
     async def _synthesizer_node(self, state: WorkflowState) -> WorkflowState:
         """Nodo sintetizador final"""
         try:
@@ -238,21 +255,9 @@ class VectorMentorWorkflow:
             return state
     
     def _detect_interaction_type(self, student_input: str) -> str:
-        """Detecta el tipo de interacción del estudiante"""
-        input_lower = student_input.lower()
-        
-        if any(word in input_lower for word in ["qué es", "define", "definición", "concepto"]):
-            return "definition_request"
-        elif any(word in input_lower for word in ["cómo", "pasos", "procedimiento", "método"]):
-            return "procedure_request"
-        elif any(word in input_lower for word in ["ejemplo", "ejemplos", "muestra", "demuestra"]):
-            return "examples_request"
-        elif any(word in input_lower for word in ["calcula", "resuelve", "encuentra"]):
-            return "calculation_request"
-        elif "?" in student_input:
-            return "question"
-        else:
-            return "statement"
+        """Detecta el tipo de interacción del estudiante (mismo clasificador local que el coordinador)"""
+        interaction_type, _ = get_interaction_classifier().classify(student_input)
+        return interaction_type
     
     def _update_student_progress(self, assessment: Dict[str, Any]):
         """NUEVO: Actualiza automáticamente el progreso del estudiante"""
@@ -344,10 +349,8 @@ class VectorMentorWorkflow:
         if len(self.conversation_history) > 20:
             self.conversation_history = self.conversation_history[-20:]
     
-    async def process_student_input(self, student_input: str) -> Dict[str, Any]:
-        """Procesa input del estudiante a través del workflow - MEJORADO"""
-        
-        initial_state = WorkflowState(
+    def _initial_state(self, student_input: str) -> WorkflowState:
+        return WorkflowState(
             student_input=student_input,
             context={},
             assessment={},
@@ -359,28 +362,150 @@ class VectorMentorWorkflow:
             needs_retrieval=True,
             needs_tutoring=True
         )
+    
+    async def _lookup_turn_cache(self, student_input: str):
+        """(clave del turno, turno cacheado); la clave es None si el turno no usa la caché.
+        
+        La clave guarda el vector, el tema y el nivel con que se buscó: el turno se guarda
+        después con esos mismos valores, aunque la evaluación cambie el nivel del estudiante.
+        """
+        if self.turn_cache is None or \
+                self._detect_interaction_type(student_input) in settings.TURN_CACHE_SKIP_TYPES:
+            return None, None
+        try:
+            turn_key = {
+                "vector": await self.turn_cache.embed(student_input),
+                "topic": match_topic_keywords(student_input),
+                "level": self.student_progress["current_level"]
+            }
+            cached = self.turn_cache.lookup(turn_key["vector"], turn_key["topic"], turn_key["level"])
+            return turn_key, cached
+        except Exception as e:
+            print(f"⚠️ Caché semántica no disponible: {e}")
+            return None, None
+    
+    def _build_response(self, student_input: str, turn_key: Optional[Dict[str, Any]],
+                        result: Dict[str, Any]) -> Dict[str, Any]:
+        """Respuesta completa con evaluación a partir del estado final del grafo"""
+        response = {
+            "response": result.get("final_response", "Lo siento, no pude procesar tu solicitud."),
+            "assessment": result.get("assessment", {"level": 3, "topic": "algebra"}),
+            "practice_exercise": result.get("practice_exercise", ""),
+            "mode": "workflow_complete",
+            "student_progress": self.student_progress.copy()
+        }
+        if turn_key is not None:
+            response["turn_cache_id"] = self._remember_turn(student_input, turn_key, result, response)
+        return response
+    
+    def _error_response(self, error: Exception) -> Dict[str, Any]:
+        print(f"Error en workflow: {error}")
+        return {
+            "response": f"Ha ocurrido un error en VectorMentor: {str(error)}",
+            "assessment": {"level": 3, "topic": "error"},
+            "practice_exercise": "",
+            "mode": "error"
+        }
+    
+    async def process_student_input(self, student_input: str) -> Dict[str, Any]:
+        """Procesa input del estudiante a través del workflow - MEJORADO"""
+        
+        # Caché semántica: una paráfrasis de una pregunta ya respondida no recorre el grafo
+        turn_key, cached = await self._lookup_turn_cache(student_input)
+        if cached is not None:
+            return self._serve_cached_turn(student_input, cached)
         
         try:
             # Ejecutar workflow
-            result = await self.workflow.ainvoke(initial_state)
+            result = await self.workflow.ainvoke(self._initial_state(student_input))
             
             # RETORNAR RESPUESTA COMPLETA CON EVALUACIÓN
-            return {
-                "response": result.get("final_response", "Lo siento, no pude procesar tu solicitud."),
-                "assessment": result.get("assessment", {"level": 3, "topic": "algebra"}),
-                "practice_exercise": result.get("practice_exercise", ""),
-                "mode": "workflow_complete",
-                "student_progress": self.student_progress.copy()
-            }
+            return self._build_response(student_input, turn_key, result)
             
         except Exception as e:
-            print(f"Error en workflow: {e}")
-            return {
-                "response": f"Ha ocurrido un error en VectorMentor: {str(e)}",
-                "assessment": {"level": 3, "topic": "error"},
-                "practice_exercise": "",
-                "mode": "error"
-            }
+            return self._error_response(e)
+    
+    async def astream_student_input(self, student_input: str) -> AsyncIterator[Dict[str, Any]]:
+        """Como process_student_input, pero la respuesta del tutor llega por fragmentos.
+        
+        Emite eventos {"type": "token", "content": ...} a medida que el LLM genera el texto y,
+        al terminar, un único {"type": "final", "result": ...} con el mismo formato que
+        process_student_input. La concatenación de los tokens es la respuesta final.
+        """
+        turn_key, cached = await self._lookup_turn_cache(student_input)
+        if cached is not None:
+            result = self._serve_cached_turn(student_input, cached)
+            yield {"type": "token", "content": result["response"]}
+            yield {"type": "final", "result": result}
+            return
+        
+        streamed = False
+        try:
+            # Coordinador, evaluador y recuperador en el grafo; el tutor se transmite aparte
+            state = await self.prepare_workflow.ainvoke(self._initial_state(student_input))
+            
+            if state.get("needs_tutoring", True):
+                tutor = self.agents["tutor"]
+                tutor_input = self._tutor_input(state)
+                chunks = []
+                async for token in tutor.astream_response(tutor_input):
+                    chunks.append(token)
+                    streamed = True
+                    yield {"type": "token", "content": token}
+                state["tutor_response"] = "".join(chunks).strip()
+                
+                assessment = state.get("assessment", {})
+                state["practice_exercise"] = await tutor._generate_practice_exercise(
+                    assessment.get("topic", ""), assessment.get("level", 3),
+                    tutor_input["context"].get("interaction_type", "question")
+                )
+                if state["practice_exercise"]:
+                    streamed = True
+                    yield {"type": "token", "content": f"\n\n{state['practice_exercise']}"}
+            
+            state = await self._synthesizer_node(state)
+            if not streamed:
+                yield {"type": "token", "content": state["final_response"]}
+            yield {"type": "final", "result": self._build_response(student_input, turn_key, state)}
+            
+        except Exception as e:
+            error = self._error_response(e)
+            yield {"type": "token", "content": ("\n\n" if streamed else "") + error["response"]}
+            yield {"type": "final", "result": error}
+    
+    def _remember_turn(self, student_input: str, turn_key: Dict[str, Any], result: Dict[str, Any],
+                       response: Dict[str, Any]):
+        """Guarda el turno en la caché semántica salvo respuestas a ejercicios, con error o sin tema"""
+        interaction_type = result.get("context", {}).get("interaction_type", "")
+        if interaction_type in settings.TURN_CACHE_SKIP_TYPES or response["assessment"].get("topic") == "error" \
+                or not result.get("final_response") or turn_key["topic"] is None:
+            return None
+        return self.turn_cache.add(
+            turn_key["vector"], student_input, turn_key["topic"], turn_key["level"], dict(response)
+        )
+    
+    def _serve_cached_turn(self, student_input: str, cached: Dict[str, Any]) -> Dict[str, Any]:
+        """Respuesta de un turno anterior; se registra en el historial como un turno más"""
+        response = {
+            **cached["result"],
+            "mode": "semantic_cache",
+            "turn_cache_id": cached["id"],
+            "student_progress": self.student_progress.copy()
+        }
+        self.student_progress["total_interactions"] += 1
+        self._add_to_history({
+            "student_input": student_input,
+            "assessment": response["assessment"],
+            "final_response": response["response"]
+        })
+        print(f"♻️ Respuesta reutilizada (similitud {cached['similarity']:.2f})")
+        return response
+    
+    def rate_response(self, turn_cache_id: int, good: bool) -> bool:
+        """Marca la calidad de una respuesta cacheada; las malas no se vuelven a servir"""
+        if self.turn_cache is None or turn_cache_id is None:
+            return False
+        return self.turn_cache.set_quality(turn_cache_id, good)
     
     def get_system_stats(self) -> Dict[str, Any]:
         """Obtiene estadísticas del sistema - MEJORADO CON DATOS REALES"""
@@ -398,6 +523,8 @@ class VectorMentorWorkflow:
                 "agents_active": len(self.agents),
                 "llm_model": settings.LLM_MODEL,
                 "rag_system": vector_stats,
+                "turn_cache": self.turn_cache.get_stats() if self.turn_cache is not None else {},
+                "llm_scheduler": get_llm_scheduler().get_stats(),
                 "student_progress": {
                     "total_interactions": self.student_progress["total_interactions"],
                     "current_level": self.student_progress["current_level"],
@@ -0,0 +1,125 @@
+"""Caché semántica de turnos completos - Reutiliza respuestas a paráfrasis de la misma pregunta"""
+
+import time
+import threading
+from typing import Any, Dict, List, Optional
+import numpy as np
+from config.settings import settings
+from rag.similarity import normalize_rows
+
+
+def level_band(level: int) -> str:
+    """Banda de nivel: una respuesta solo se reutiliza para estudiantes de nivel parecido"""
+    if level <= 2:
+        return "basico"
+    if level >= 4:
+        return "avanzado"
+    return "intermedio"
+
+
+class SemanticTurnCache:
+    """Entradas (embedding del input, tema, banda, resultado) buscadas por producto matricial.
+
+    Solo se sirve una entrada si supera el umbral de similitud, coincide en tema (conocido:
+    sin tema no se reutiliza nada) y banda, no venció y su indicador de calidad sigue en True. Al llenarse se expulsa la menos usada.
+    """
+
+    def __init__(self, embeddings, threshold: float = None, max_entries: int = None, ttl: float = None):
+        self.embeddings = embeddings
+        self.threshold = settings.TURN_CACHE_THRESHOLD if threshold is None else threshold
+        self.max_entries = max_entries or settings.TURN_CACHE_MAX_ENTRIES
+        self.ttl = settings.TURN_CACHE_TTL if ttl is None else ttl
+        self.entries: List[Dict[str, Any]] = []
+        self.matrix = np.empty((0, 0), dtype=np.float32)
+        self.hits = 0
+        self.misses = 0
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Embedding normalizado del input (una sola vez por turno)"""
+        vector = await self.embeddings.aembed_query(text)
+        return normalize_rows(vector)[0]
+
+    def _expire(self):
+        if not self.ttl:
+            return
+        now = time.time()
+        keep = [i for i, entry in enumerate(self.entries) if now - entry["created_at"] < self.ttl]
+        if len(keep) != len(self.entries):
+            self.entries = [self.entries[i] for i in keep]
+            self.matrix = self.matrix[keep]
+
+    def lookup(self, vector: np.ndarray, topic: Optional[str], level: int) -> Optional[Dict[str, Any]]:
+        """Entrada más parecida que cumpla umbral, tema, banda y calidad (o None)"""
+        with self._lock:
+            self._expire()
+            if not self.entries or topic is None:
+                self.misses += 1
+                return None
+
+            band = level_band(level)
+            scores = self.matrix @ vector
+            for i in np.argsort(-scores, kind="stable"):
+                if scores[i] < self.threshold:
+                    break
+                entry = self.entries[i]
+                if entry["quality"] and entry["topic"] == topic and entry["band"] == band:
+                    entry["hits"] += 1
+                    entry["last_used"] = time.time()
+                    self.hits += 1
+                    return {**entry, "similarity": float(scores[i])}
+            self.misses += 1
+            return None
+
+    def add(self, vector: np.ndarray, student_input: str, topic: Optional[str], level: int,
+            result: Dict[str, Any], quality: bool = True) -> int:
+        """Guarda un turno servido; devuelve su id para poder marcar la calidad después"""
+        with self._lock:
+            self._expire()
+            if len(self.entries) >= self.max_entries:
+                lru = min(range(len(self.entries)), key=lambda i: self.entries[i]["last_used"])
+                del self.entries[lru]
+                self.matrix = np.delete(self.matrix, lru, axis=0)
+
+            entry_id = self._next_id
+            self._next_id += 1
+            now = time.time()
+            self.entries.append({
+                "id": entry_id,
+                "student_input": student_input,
+                "topic": topic,
+                "band": level_band(level),
+                "result": result,
+                "quality": quality,
+                "hits": 0,
+                "created_at": now,
+                "last_used": now
+            })
+            row = vector.reshape(1, -1).astype(np.float32)
+            self.matrix = np.vstack([self.matrix, row]) if len(self.matrix) else row
+            return entry_id
+
+    def set_quality(self, entry_id: int, quality: bool) -> bool:
+        """Marca una entrada como buena o mala; las malas dejan de servirse"""
+        with self._lock:
+            for entry in self.entries:
+                if entry["id"] == entry_id:
+                    entry["quality"] = quality
+                    return True
+        return False
+
+    def clear(self):
+        with self._lock:
+            self.entries = []
+            self.matrix = np.empty((0, 0), dtype=np.float32)
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0
+        }